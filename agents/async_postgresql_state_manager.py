@@ -0,0 +1,423 @@
+"""
+Async PostgreSQL State Management
+
+Non-blocking counterpart of PostgreSQLStateManager for async front ends (web servers, websocket
+chat), built on psycopg 3:
+- One AsyncConnectionPool per process shared by every session, so many concurrent chat
+  sessions are served from one event loop
+- The same API as PostgreSQLStateManager (session/agent context, conversation messages,
+  rolling summary, audit trail), with every method awaitable
+- Multi-statement operations run in pipeline mode: the writes and their audit rows of one
+  update go to the server in a single round trip
+
+Requires the optional dependency: pip install "psycopg[binary,pool]"
+Pool size: STATE_ASYNC_POOL_MIN_SIZE / STATE_ASYNC_POOL_MAX_SIZE.
+"""
+
+import os
+import json
+import asyncio
+import logging
+from dataclasses import asdict
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+try:
+    from psycopg.rows import dict_row
+    from psycopg.types.json import Jsonb
+    from psycopg.conninfo import make_conninfo
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:
+    AsyncConnectionPool = None
+
+from .postgresql_state_manager import SessionContext, AgentContext, AGENT_LIST_TABLES, agent_list_change, json_serial
+from utils.schema_migrations import schema_migrator
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional["AsyncConnectionPool"] = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_async_pool() -> "AsyncConnectionPool":
+    """Open the process-wide async connection pool on first use"""
+    global _pool
+    if AsyncConnectionPool is None:
+        raise ImportError('AsyncPostgreSQLStateManager requires psycopg 3: pip install "psycopg[binary,pool]"')
+    async with _pool_lock:
+        if _pool is None:
+            conninfo = make_conninfo(
+                host=os.getenv('POSTGRES_HOST') or os.getenv('DB_HOST'),
+                port=os.getenv('POSTGRES_PORT') or os.getenv('DB_PORT', 5432),
+                dbname=os.getenv('POSTGRES_DB') or os.getenv('DB_NAME'),
+                user=os.getenv('POSTGRES_USER') or os.getenv('DB_USER'),
+                password=os.getenv('POSTGRES_PASSWORD') or os.getenv('DB_PASSWORD')
+            )
+            pool = AsyncConnectionPool(
+                conninfo,
+                min_size=int(os.getenv('STATE_ASYNC_POOL_MIN_SIZE', '1')),
+                max_size=int(os.getenv('STATE_ASYNC_POOL_MAX_SIZE', '10')),
+                kwargs={"row_factory": dict_row},
+                open=False
+            )
+            await pool.open()
+            _pool = pool
+    return _pool
+
+
+async def close_async_pool() -> None:
+    """Close the shared pool (call on application shutdown)"""
+    global _pool
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+
+
+def _jsonb(value: Any) -> Optional["Jsonb"]:
+    return Jsonb(value, dumps=partial(json.dumps, default=json_serial)) if value is not None else None
+
+
+class AsyncPostgreSQLStateManager:
+    """
+    Async PostgreSQL-backed state management with the PostgreSQLStateManager API.
+
+    Create with: state_manager = await AsyncPostgreSQLStateManager.create(session_id)
+    """
+
+    def __init__(self, session_id: str, pool: "AsyncConnectionPool"):
+        self.session_id = session_id
+        self.pool = pool
+
+    @classmethod
+    async def create(cls, session_id: str) -> "AsyncPostgreSQLStateManager":
+        """Verify the schema, open the shared pool and initialize the session"""
+        await asyncio.to_thread(schema_migrator.ensure_current)
+        manager = cls(session_id, await get_async_pool())
+        await manager._initialize_session()
+        return manager
+
+    async def _initialize_session(self):
+        """Initialize session state if it doesn't exist"""
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                cursor = await conn.execute("""
+                    INSERT INTO session_states (session_id, session_context, agent_context)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (session_id) DO NOTHING
+                    RETURNING session_id
+                """, (
+                    self.session_id,
+                    _jsonb(asdict(SessionContext(session_id=self.session_id))),
+                    _jsonb(AgentContext().document())
+                ))
+                if await cursor.fetchone():
+                    await self._insert_audit(conn, [self._audit_row("CREATE", "session", None, {"session_id": self.session_id})])
+
+    def _audit_row(self, change_type: str, change_path: str, old_value: Any, new_value: Any,
+                   agent: Optional[str] = None) -> tuple:
+        return (self.session_id, change_type, change_path, _jsonb(old_value), _jsonb(new_value), agent)
+
+    @staticmethod
+    async def _insert_audit(conn, rows: List[tuple]):
+        if not rows:
+            return
+        async with conn.cursor() as cursor:
+            await cursor.executemany("""
+                INSERT INTO state_audit_log
+                (session_id, change_type, change_path, old_value, new_value, agent_name)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, rows)
+
+    async def _select_for_update(self, conn, column: str) -> Dict[str, Any]:
+        cursor = await conn.execute(
+            f"SELECT {column} FROM session_states WHERE session_id = %s FOR UPDATE",
+            (self.session_id,)
+        )
+        row = await cursor.fetchone()
+        if not row:
+            raise ValueError(f"Session {self.session_id} not found")
+        return row[column]
+
+    async def _select_agent_context(self, conn, for_update: bool = False) -> Optional[AgentContext]:
+        """agent_context document plus its list fields from their append-only tables"""
+        cursor = await conn.execute(f"""
+            SELECT s.agent_context,
+                   (SELECT COALESCE(jsonb_agg(m.message ORDER BY m.id), '[]')
+                    FROM agent_context_messages m WHERE m.session_id = s.session_id) AS agent_messages,
+                   (SELECT COALESCE(jsonb_agg(p.message_id ORDER BY p.processed_at, p.message_id), '[]')
+                    FROM processed_workflow_messages p WHERE p.session_id = s.session_id) AS processed_workflow_messages
+            FROM session_states s
+            WHERE s.session_id = %s{" FOR UPDATE OF s" if for_update else ""}
+        """, (self.session_id,))
+        row = await cursor.fetchone()
+        if not row:
+            return None
+        agent_dict = {key: value for key, value in row['agent_context'].items() if key not in AGENT_LIST_TABLES}
+        return AgentContext(
+            agent_messages=row['agent_messages'],
+            processed_workflow_messages=row['processed_workflow_messages'],
+            **agent_dict
+        )
+
+    async def _write_context(self, conn, column: str, changed: Dict[str, Any], audit_rows: List[tuple],
+                             list_ops: Optional[List[tuple]] = None):
+        """Field-level jsonb_set UPDATE, list appends and audit rows in one pipelined round trip"""
+        async with conn.pipeline():
+            if changed:
+                expression, params = column, []
+                for name, value in changed.items():
+                    expression = f"jsonb_set({expression}, %s, %s)"
+                    # JSON null rather than SQL NULL, which would null the whole document
+                    params.extend([[name], _jsonb(value) if value is not None else Jsonb(None)])
+                await conn.execute(
+                    f"UPDATE session_states SET {column} = {expression} WHERE session_id = %s",
+                    (*params, self.session_id)
+                )
+            for field_name, operation, items in list_ops or []:
+                table, item_column = AGENT_LIST_TABLES[field_name]
+                if operation == "replace":
+                    await conn.execute(f"DELETE FROM {table} WHERE session_id = %s", (self.session_id,))
+                if not items:
+                    continue
+                async with conn.cursor() as cursor:
+                    if field_name == "processed_workflow_messages":
+                        await cursor.executemany(
+                            f"INSERT INTO {table} (session_id, {item_column}) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                            [(self.session_id, str(item)) for item in items]
+                        )
+                    else:
+                        await cursor.executemany(
+                            f"INSERT INTO {table} (session_id, {item_column}) VALUES (%s, %s)",
+                            [(self.session_id, _jsonb(item)) for item in items]
+                        )
+            await self._insert_audit(conn, audit_rows)
+
+    async def get_session_context(self) -> Optional[SessionContext]:
+        """Get current session context"""
+        try:
+            async with self.pool.connection() as conn:
+                cursor = await conn.execute(
+                    "SELECT session_context FROM session_states WHERE session_id = %s",
+                    (self.session_id,)
+                )
+                row = await cursor.fetchone()
+            if not row:
+                return None
+            session_data = row['session_context']
+            session_data.setdefault('session_id', self.session_id)
+            return SessionContext(**session_data)
+        except Exception as e:
+            logger.error(f"Failed to get session context: {e}")
+            return None
+
+    async def update_session_context(self, agent: str = "System", **kwargs) -> SessionContext:
+        """Update session context with validation and audit"""
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                session_data = await self._select_for_update(conn, "session_context")
+                session_data.setdefault('session_id', self.session_id)
+                current_context = SessionContext(**session_data)
+
+                audit_rows = []
+                changed = {}
+                for key, value in kwargs.items():
+                    if hasattr(current_context, key):
+                        audit_rows.append(self._audit_row("UPDATE", f"session.{key}", getattr(current_context, key), value, agent))
+                        setattr(current_context, key, value)
+                        changed[key] = value
+
+                current_context.last_updated = datetime.now(timezone.utc).isoformat()
+                changed["last_updated"] = current_context.last_updated
+                if not current_context.validate():
+                    raise ValueError(f"Invalid session context update: {'; '.join(current_context.validation_errors())}")
+
+                await self._write_context(conn, "session_context", changed, audit_rows)
+        return current_context
+
+    async def get_agent_context(self) -> Optional[AgentContext]:
+        """Get current agent context"""
+        try:
+            async with self.pool.connection() as conn:
+                return await self._select_agent_context(conn)
+        except Exception as e:
+            logger.error(f"Failed to get agent context: {e}")
+            return None
+
+    async def update_agent_context(self, agent: str, **kwargs) -> AgentContext:
+        """Update agent context with audit"""
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                current_context = await self._select_agent_context(conn, for_update=True)
+                if current_context is None:
+                    raise ValueError(f"Session {self.session_id} not found")
+
+                audit_rows = []
+                changed = {}
+                list_ops = []
+                if "current_agent" in kwargs and kwargs["current_agent"] != current_context.current_agent:
+                    current_context.last_agent_switch = datetime.now(timezone.utc).isoformat()
+                    changed["last_agent_switch"] = current_context.last_agent_switch
+                    audit_rows.append(self._audit_row(
+                        "AGENT_SWITCH", "agent.current_agent", current_context.current_agent, kwargs["current_agent"], agent
+                    ))
+
+                for key, value in kwargs.items():
+                    if not hasattr(current_context, key):
+                        continue
+                    old_value = getattr(current_context, key)
+                    if key in AGENT_LIST_TABLES:
+                        # Lists are appended to (or replaced in) their own table; audit only the change
+                        change = agent_list_change(key, old_value, value)
+                        setattr(current_context, key, list(value or []))
+                        if change:
+                            operation, items = change
+                            list_ops.append((key, operation, items))
+                            audit_rows.append(self._audit_row(
+                                "UPDATE", f"agent.{key}",
+                                {"count": len(old_value)} if operation == "replace" else None,
+                                {operation: items}, agent
+                            ))
+                        continue
+                    if key != "current_agent":  # Already audited above
+                        audit_rows.append(self._audit_row("UPDATE", f"agent.{key}", old_value, value, agent))
+                    setattr(current_context, key, value)
+                    changed[key] = value
+
+                await self._write_context(conn, "agent_context", changed, audit_rows, list_ops)
+        return current_context
+
+    async def add_conversation_message(self,
+                                       role: str,
+                                       content: str,
+                                       agent: Optional[str] = None,
+                                       metadata: Optional[Dict[str, Any]] = None,
+                                       tool_calls: Optional[List[Dict[str, Any]]] = None) -> int:
+        """Add message to conversation history; returns its message_order"""
+        return (await self.add_conversation_messages([{
+            "role": role,
+            "content": content,
+            "metadata": metadata,
+            "tool_calls": tool_calls
+        }], agent))[0]
+
+    async def add_conversation_messages(self, messages: List[Dict[str, Any]], agent: Optional[str] = None) -> List[int]:
+        """Append several messages and their audit rows in one pipelined transaction"""
+        if not messages:
+            return []
+
+        records = [
+            {
+                "position": position,
+                "role": message["role"],
+                "content": message["content"],
+                "metadata": message.get("metadata") or {},
+                "agent": message.get("agent", agent),
+                "tool_calls": message.get("tool_calls") or []
+            }
+            for position, message in enumerate(messages, start=1)
+        ]
+        audit_rows = [
+            self._audit_row(
+                "CONVERSATION_UPDATE", "conversation.message", None,
+                {"role": record["role"], "content": record["content"][:100] + "..." if len(record["content"]) > 100 else record["content"]},
+                record["agent"]
+            )
+            for record in records
+        ]
+
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                async with conn.pipeline():
+                    cursor = await conn.execute("""
+                        WITH next_order AS (
+                            UPDATE session_states
+                            SET last_message_order = last_message_order + %(count)s
+                            WHERE session_id = %(session_id)s
+                            RETURNING last_message_order - %(count)s AS base_order
+                        )
+                        INSERT INTO conversation_messages
+                        (session_id, message_role, message_content, message_metadata, agent_name, tool_calls, message_order)
+                        SELECT %(session_id)s, m.role, m.content, m.metadata, m.agent, m.tool_calls,
+                               next_order.base_order + m.position
+                        FROM next_order, jsonb_to_recordset(%(messages)s)
+                             AS m(position INTEGER, role TEXT, content TEXT, metadata JSONB, agent TEXT, tool_calls JSONB)
+                        RETURNING message_order
+                    """, {"count": len(records), "session_id": self.session_id, "messages": _jsonb(records)})
+                    await self._insert_audit(conn, audit_rows)
+                    inserted = await cursor.fetchall()
+
+                if len(inserted) != len(records):
+                    raise ValueError(f"Session {self.session_id} not found")
+
+        return sorted(row["message_order"] for row in inserted)
+
+    async def get_conversation_history(self, limit: Optional[int] = 10, after_order: int = 0) -> List[Dict[str, Any]]:
+        """Get recent conversation history (limit=None for every message after after_order)"""
+        try:
+            async with self.pool.connection() as conn:
+                cursor = await conn.execute("""
+                    SELECT message_role, message_content, message_metadata,
+                           agent_name, tool_calls, created_at, message_order
+                    FROM conversation_messages
+                    WHERE session_id = %s AND message_order > %s
+                    ORDER BY message_order DESC
+                    LIMIT %s
+                """, (self.session_id, after_order, limit))
+                messages = await cursor.fetchall()
+            return list(reversed(messages))  # Return in chronological order
+        except Exception as e:
+            logger.error(f"Failed to get conversation history: {e}")
+            return []
+
+    async def get_conversation_summary(self) -> Dict[str, Any]:
+        """Get the rolling summary of older conversation turns ({} if none yet)"""
+        try:
+            async with self.pool.connection() as conn:
+                cursor = await conn.execute("""
+                    SELECT conversation_metadata -> 'rolling_summary' AS rolling_summary
+                    FROM session_states WHERE session_id = %s
+                """, (self.session_id,))
+                row = await cursor.fetchone()
+            return (row and row['rolling_summary']) or {}
+        except Exception as e:
+            logger.error(f"Failed to get conversation summary: {e}")
+            return {}
+
+    async def update_conversation_summary(self, summary: str, through_message_order: int, agent: str = "System"):
+        """Store the rolling summary covering all messages up to through_message_order"""
+        rolling_summary = {
+            "text": summary,
+            "through_message_order": through_message_order,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                async with conn.pipeline():
+                    await conn.execute("""
+                        UPDATE session_states
+                        SET conversation_metadata = jsonb_set(COALESCE(conversation_metadata, '{}'), '{rolling_summary}', %s)
+                        WHERE session_id = %s
+                    """, (_jsonb(rolling_summary), self.session_id))
+                    await self._insert_audit(conn, [self._audit_row(
+                        "CONVERSATION_UPDATE", "conversation.rolling_summary", None,
+                        {"through_message_order": through_message_order, "length": len(summary)}, agent
+                    )])
+
+    async def get_audit_trail(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get recent state changes for debugging and monitoring"""
+        try:
+            async with self.pool.connection() as conn:
+                cursor = await conn.execute("""
+                    SELECT change_type, change_path, old_value, new_value,
+                           agent_name, change_timestamp, correlation_id
+                    FROM state_audit_log
+                    WHERE session_id = %s
+                    ORDER BY change_timestamp DESC
+                    LIMIT %s
+                """, (self.session_id, limit))
+                return await cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Failed to get audit trail: {e}")
+            return []
@@ -10,6 +10,8 @@ import sys
 # Add config path to imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.gitlab_agent_mapping import GitLabAgentMapping
+from prompts.prompt_registry import prompt_registry
+from utils.session_registry import session_registry
 
 
 class BaseAgent(ABC):
@@ -72,7 +74,12 @@ class BaseAgent(ABC):
                 self.log("Warning: KnowledgeBaseSetContext tool not available")
                 return {"success": False, "error": "KnowledgeBaseSetContext tool not available"}
             
-            result = set_context_tool._run(knowledge_base_id=knowledge_base_id)
+            # Agents share one lookup per KB through the session registry
+            result = session_registry.get_kb_context(
+                knowledge_base_id,
+                lambda: set_context_tool._run(knowledge_base_id=knowledge_base_id),
+                force_refresh=force_refresh
+            )
             
             if result.get("success"):
                 # Store the context information
@@ -326,9 +333,14 @@ Current Knowledge Base Context:
         print(f"[{timestamp}] [{self.name}] [{level}] {message}")
         
     def get_system_message(self) -> BaseMessage:
-        """Get the system message for this agent"""
+        """Get the system message for this agent.
+
+        The static system prompt comes first and the timestamp last, so the prefix is identical
+        on every call and can be served from the provider's prompt cache.
+        """
         current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        full_prompt = f"Current date and time: {current_time}\n\n{self.system_prompt}"
+        prompt_registry.register_static_prefix(self.name, self.system_prompt)
+        full_prompt = f"{self.system_prompt}\n\nCurrent date and time: {current_time}"
         return HumanMessage(content=full_prompt)
     
     def get_messages_with_history(self, state: AgentState, current_user_message: str = None) -> List[BaseMessage]:
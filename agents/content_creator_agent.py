@@ -2,6 +2,8 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 import os
 import re
+import json
+import time
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
 from langchain_openai import AzureChatOpenAI
 from .base_agent import BaseAgent
@@ -10,7 +12,15 @@ from tools.knowledge_base_tools import KnowledgeBaseTools
 from tools.gitlab_tools import GitLabTools
 from prompts.knowledge_base_prompts import prompts as kb_prompts
 from prompts.multi_agent_prompts import prompts as ma_prompts
-from prompts.foundational_prompts import AgentSpecificFoundations
+from prompts.prompt_registry import prompt_registry
+from utils.graceful_shutdown import shutdown_coordinator
+from utils.work_checkpoint_store import work_checkpoint_store, WorkCheckpoint, WorkCheckpointStore
+from utils.llm_gateway import llm_gateway
+from utils.llm_usage_ledger import usage_ledger
+from utils.tool_executor import ToolCallExecutor, ToolCallResult
+from models.tool_result import ToolResult
+from utils.batch_drafting import BatchDraftingEngine, DraftTask
+from operations.knowledge_base_operations import KnowledgeBaseOperations
 
 # Ensure environment variables are loaded for database connectivity
 from dotenv import load_dotenv
@@ -34,7 +44,7 @@ class ContentCreatorAgent(BaseAgent):
     
     def __init__(self, llm: AzureChatOpenAI):
         # Use foundational prompt for consistency with other agents
-        foundational_prompt = AgentSpecificFoundations.content_creation_foundation()
+        foundational_prompt = prompt_registry.get("content_creation_foundation")
         specialized_prompt = self._get_creation_prompt()
         gitlab_integration_prompt = self._create_gitlab_integration_prompt()
         
@@ -58,6 +68,16 @@ class ContentCreatorAgent(BaseAgent):
         
         # Bind tools to LLM
         self.llm_with_tools = llm.bind_tools(self.tools)
+        
+        # Runs independent tool calls from one response concurrently (name → tool lookup built once)
+        self.tool_executor = ToolCallExecutor(self.tools)
+        
+        # Stream article generation and persist each article as soon as its tool call is complete
+        self.streaming_enabled = os.getenv('CONTENT_CREATOR_STREAMING', 'true').lower() in ('1', 'true', 'yes', 'on')
+        
+        # Hierarchy depth built per work item: 1 = Level 1 categories only, 3 = categories → subcategories → articles
+        self.build_out_depth = int(os.getenv('CONTENT_CREATOR_BUILD_OUT_DEPTH', '1'))
+        self.batch_drafting = BatchDraftingEngine(self.llm_with_tools)
     
     def _get_agent_identity_prompt(self) -> str:
         """Create agent identity prompt with GitLab awareness"""
@@ -1134,8 +1154,22 @@ When creating content, leverage GitLab's collaborative features to ensure alignm
             
             self.log(f"Creating content for Knowledge Base ID: {kb_id} (Context: {state.get('knowledge_base_name', 'Unknown')})")
             
+            # Load (or start) the checkpoint that lets an interrupted run resume this work item
+            checkpoint = work_checkpoint_store.load_or_create(
+                WorkCheckpointStore.gitlab_issue_key(project_id, issue_id), self.name
+            )
+            if checkpoint is None:
+                error_msg = f"Work item {issue_title} is already being run by another swarm process"
+                self.log(error_msg, "WARNING")
+                return {
+                    "success": False,
+                    "error": error_msg,
+                    "work_item_id": issue_id,
+                    "project_id": project_id
+                }
+            
             # Add progress update to GitLab
-            progress_comment = f"""Content Creation Started
+            progress_comment = f"""Content Creation {'Resumed' if checkpoint.has_generated_tool_calls() else 'Started'}
 
 Agent: ContentCreatorAgent
 Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
@@ -1147,11 +1181,43 @@ Creating comprehensive articles for this knowledge base...
             self._add_work_progress_update(project_id, issue_id, progress_comment)
             
             # Execute content creation using clean method that trusts the LLM to use tools
-            creation_result = self._execute_article_creation(kb_id, issue_title, issue_description)
+            with usage_ledger.scope(kb_id=kb_id):
+                creation_result = self._execute_article_creation(kb_id, issue_title, issue_description, checkpoint)
+            
+            if creation_result.get("cancelled"):
+                completed_calls = len(checkpoint.completed_call_ids)
+                self.log(f"🛑 Work item paused at checkpoint ({completed_calls}/{len(checkpoint.tool_calls)} tool calls completed)")
+                
+                paused_comment = f"""⏸️ **Content Creation Paused**
+
+**Paused:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+**Reason:** Agent shutdown
+**Progress:** {completed_calls} of {len(checkpoint.tool_calls)} tool calls completed
+
+Progress has been checkpointed. The agent will resume from this point when it restarts.
+"""
+                self._add_work_progress_update(project_id, issue_id, paused_comment)
+                
+                return {
+                    "success": False,
+                    "cancelled": True,
+                    "error": creation_result.get("error"),
+                    "work_item_id": issue_id,
+                    "project_id": project_id,
+                    "kb_id": kb_id
+                }
             
             if creation_result.get("success", False):
                 articles_created = creation_result.get("articles_created", [])
                 
+                # Deeper levels are drafted level by level, all nodes of a level in one concurrent batch
+                if self.build_out_depth > 1:
+                    with usage_ledger.scope(kb_id=kb_id):
+                        build_out_result = self.build_out_knowledge_base(kb_id, self.build_out_depth)
+                    articles_created = articles_created + build_out_result.get("articles_created", [])
+                
+                checkpoint.complete()
+                
                 # Add completion comment to GitLab
                 completion_comment = f"""✅ **Content Creation Completed**
 
@@ -1182,6 +1248,7 @@ Creating comprehensive articles for this knowledge base...
             else:
                 error_msg = creation_result.get("error", "Unknown error during content creation")
                 self.log(f"❌ Content creation failed: {error_msg}")
+                checkpoint.mark_failed(error_msg)
                 
                 # Add error comment to GitLab
                 error_comment = f"""❌ **Content Creation Failed**
@@ -1278,10 +1345,18 @@ The content creation process encountered an error. Please review the logs for de
     # Dead code removed: _execute_article_creation_simple, _create_articles_with_guaranteed_tagging, 
     # _create_single_article_with_guaranteed_tags, _apply_mandatory_tags_and_return_list (manual processing)
 
-    def _execute_article_creation(self, kb_id: int, title: str, description: str) -> Dict[str, Any]:
-        """Execute article creation using LLM with tools directly - with model switching on failure"""
+    def _execute_article_creation(self, kb_id: int, title: str, description: str,
+                                  checkpoint: Optional[WorkCheckpoint] = None) -> Dict[str, Any]:
+        """Execute article creation using LLM with tools directly - with model switching on failure.
+
+        When a checkpoint with previously generated tool calls is supplied, LLM generation is skipped
+        and only the tool calls that have not completed yet are executed.
+        """
         try:
             self.log(f"Creating articles for KB {kb_id}: {title}")
+
+            if checkpoint is not None and checkpoint.has_generated_tool_calls():
+                return self._resume_article_creation_from_checkpoint(kb_id, checkpoint)
             
             # Set KB context
             self._set_kb_context_directly(kb_id)
@@ -1291,10 +1366,11 @@ The content creation process encountered an error. Please review the logs for de
             # Get existing articles to prevent duplicates
             existing_articles_info = self._get_existing_articles_for_duplicate_prevention(kb_id)
             
-            # Create clear, direct prompt for LLM with tools - referencing shared foundational standards
-            foundational_guidance = AgentSpecificFoundations.content_creation_foundation()
+            # Static instructions (foundational standards + Level 1 rules) form a stable, cached prefix;
+            # only the KB and work item details below change between calls
+            level1_instructions = prompt_registry.get("content_creator_level1_instructions")
             
-            user_request = f"""You are creating Level 1 category articles for Knowledge Base {kb_id}: {kb_name}
+            work_request = f"""You are creating Level 1 category articles for Knowledge Base {kb_id}: {kb_name}
 
 KNOWLEDGE BASE CONTEXT:
 - Name: {kb_name}
@@ -1305,23 +1381,11 @@ DESCRIPTION: {description}
 
 {existing_articles_info}
 
-{foundational_guidance}
-
-HIERARCHY LEVEL: Level 1 (Categories)
-Follow foundational guidance for Level 1 articles:
-- Simple categorical overviews with broad topic organization  
-- Short titles (2-4 words)
-- 300-500 words of broad topic introduction
-- Introductory tone, categorical organization, general concepts
-
-SPECIFIC INSTRUCTIONS:
-- Use the KnowledgeBaseInsertArticle tool for each article  
-- Set parent_id=null for all Level 1 categories
-- Apply appropriate tags using KnowledgeBaseInsertTag and KnowledgeBaseAddTagToArticle tools
-- Follow the Smart Category Expansion Logic from the foundational standards above
-
 Start creating Level 1 category articles now using the available tools."""
 
+            # Backup model path takes a single input string
+            user_request = f"{level1_instructions}\n\n{work_request}"
+
             # Try with primary model first
             primary_model_name = getattr(self.llm, 'azure_deployment', 'primary_model')
             primary_endpoint = getattr(self.llm, 'azure_endpoint', 'unknown_endpoint')
@@ -1332,12 +1396,35 @@ Start creating Level 1 category articles now using the available tools."""
             self.log(f"   Endpoint: {primary_endpoint}")
             self.log(f"   API Version: {primary_api_version}")
             
+            # Health-based routing: skip the primary while the gateway has it cooling down after failures
+            if llm_gateway.route("primary", "backup") == "backup":
+                self.log(f"🔀 Primary model {primary_model_name} is unhealthy - routing directly to backup model")
+                return self._switch_to_backup_model(user_request, kb_id)
+            
+            # Budget-based degradation: over its token budget the agent drafts on the cheaper backup deployment
+            if usage_ledger.preferred_role("primary", self.name) != "primary":
+                self.log(f"💰 Token budget exceeded ({usage_ledger.over_budget(self.name)}) - degrading to backup model")
+                return self._switch_to_backup_model(user_request, kb_id)
+            
+            # Article calls already executed while the response was still streaming (call id → result)
+            streamed_results: Dict[str, ToolCallResult] = {}
+            
             try:
-                messages = [HumanMessage(content=user_request)]
-                response = self.llm_with_tools.invoke(messages)
+                messages = prompt_registry.build_messages(level1_instructions, work_request)
+                if self.streaming_enabled:
+                    response = self._stream_article_generation(messages, checkpoint, streamed_results)
+                else:
+                    response = self.llm_with_tools.invoke(messages)
+                
+                # Persist the generated tool calls so an interrupted run can resume without regenerating
+                if checkpoint is not None and getattr(response, 'tool_calls', None):
+                    checkpoint.record_generation(response.tool_calls, model=primary_model_name)
                 
                 # Check if tools were called and execute them
-                tool_execution_result = self._execute_tool_calls(response, kb_id)
+                tool_execution_result = self._execute_tool_calls(response, kb_id, checkpoint, streamed_results)
+                
+                if tool_execution_result.get("cancelled"):
+                    return tool_execution_result
                 
                 if tool_execution_result["success"]:
                     self.log(f"✅ {primary_model_name} model successfully executed tools - created {tool_execution_result['articles_created']} articles")
@@ -1373,6 +1460,12 @@ Start creating Level 1 category articles now using the available tools."""
                 elif "500" in error_msg or "502" in error_msg or "503" in error_msg:
                     self.log(f"🔍 Server Error Detected: {error_msg}")
                 
+                # Articles persisted before the stream failed must not be created again by the backup model
+                streamed_titles = [created.title for created in map(self._created_article, streamed_results.values()) if created]
+                if streamed_titles:
+                    self.log(f"📝 {len(streamed_titles)} article(s) were persisted before the failure - excluding them from the backup run")
+                    user_request += "\n\nALREADY CREATED IN THIS RUN (do not create again): " + ", ".join(streamed_titles)
+                
                 self.log(f"🔄 Switching to backup model due to primary model failure")
                 return self._switch_to_backup_model(user_request, kb_id)
                 
@@ -1383,8 +1476,193 @@ Start creating Level 1 category articles now using the available tools."""
                 "error": f"Article creation failed: {str(e)}"
             }
 
-    def _execute_tool_calls(self, response, kb_id: int) -> Dict[str, Any]:
-        """Execute the tool calls from the LLM response and return results"""
+    def build_out_knowledge_base(self, kb_id: int, max_depth: int = 3) -> Dict[str, Any]:
+        """Draft Level 2 and deeper content for every childless node, one concurrent batch per level.
+
+        All parents of a level are independent, so their generations run together through
+        BatchDraftingEngine (capped at the deployment's concurrency limit) and wall-clock time grows with
+        tree depth rather than node count. Tool calls from each draft are then executed as usual.
+        """
+        level_instructions = {
+            2: ("content_creator_level2_instructions", "PARENT CATEGORY"),
+            3: ("content_creator_level3_instructions", "PARENT SUBCATEGORY"),
+        }
+        articles_created: List[Dict[str, Any]] = []
+        failed_drafts = 0
+        
+        try:
+            self._set_kb_context_directly(kb_id)
+            kb_name = self.kb_context.get('knowledge_base_name', 'Unknown')
+            kb_description = self.kb_context.get('knowledge_base_description', '')
+            kb_ops = KnowledgeBaseOperations()
+            
+            hierarchy = kb_ops.get_article_hierarchy(str(kb_id))
+            parents = [article for article in hierarchy if article.get('parent_id') is None]
+            
+            for level in range(2, max_depth + 1):
+                if not parents or shutdown_coordinator.is_shutdown_requested():
+                    break
+                instructions_name, parent_label = level_instructions[min(level, 3)]
+                instructions = prompt_registry.get(instructions_name)
+                
+                # Parents that already have children were built out earlier - leave them alone
+                with_children = {article.get('parent_id') for article in hierarchy}
+                tasks = []
+                for parent in parents:
+                    if parent['id'] in with_children:
+                        continue
+                    work_request = f"""You are creating Level {level} content for Knowledge Base {kb_id}: {kb_name}
+
+KNOWLEDGE BASE CONTEXT:
+- Name: {kb_name}
+- Description: {kb_description}
+
+{parent_label}: {parent['title']}
+{parent_label} ID: {parent['id']}
+
+Start creating Level {level} articles now using the available tools."""
+                    tasks.append(DraftTask(key=str(parent['id']), messages=prompt_registry.build_messages(instructions, work_request),
+                                           context=parent))
+                
+                if tasks:
+                    self.log(f"🧱 Drafting Level {level} for {len(tasks)} parent(s) in one batch "
+                             f"(max concurrency {self.batch_drafting.max_concurrency})")
+                for draft in self.batch_drafting.draft(tasks):
+                    if not draft.success:
+                        failed_drafts += 1
+                        self.log(f"⚠️ Level {level} draft for '{draft.task.context.get('title')}' failed: {draft.error}")
+                        continue
+                    tool_execution_result = self._execute_tool_calls(draft.response, kb_id)
+                    articles_created.extend(tool_execution_result.get("articles_created_list", []))
+                
+                # Next level hangs off the children of this level's parents
+                parent_ids = {parent['id'] for parent in parents}
+                hierarchy = kb_ops.get_article_hierarchy(str(kb_id))
+                parents = [article for article in hierarchy if article.get('parent_id') in parent_ids]
+            
+            self.log(f"✅ Build-out of KB {kb_id} to depth {max_depth}: {len(articles_created)} articles created, {failed_drafts} drafts failed")
+            return {"success": failed_drafts == 0, "articles_created": articles_created, "failed_drafts": failed_drafts}
+            
+        except Exception as e:
+            self.log(f"❌ Knowledge base build-out failed: {str(e)}")
+            return {"success": False, "articles_created": articles_created, "failed_drafts": failed_drafts, "error": str(e)}
+
+    def _stream_article_generation(self, messages: List[BaseMessage], checkpoint: Optional[WorkCheckpoint],
+                                   streamed_results: Dict[str, ToolCallResult]) -> AIMessage:
+        """Stream the LLM response, executing each KnowledgeBaseInsertArticle call as soon as it is complete.
+
+        Tool calls arrive one after another, so a call is complete once a chunk for a later call shows up
+        (or the stream ends). Executed calls are added to streamed_results; everything else in the
+        returned message is left for _execute_tool_calls.
+        """
+        started = time.time()
+        accumulated = None
+        dispatched = set()
+        
+        for chunk in self.llm_with_tools.stream(messages):
+            accumulated = chunk if accumulated is None else accumulated + chunk
+            chunk_indexes = [call_chunk.get("index") for call_chunk in chunk.tool_call_chunks or []
+                             if call_chunk.get("index") is not None]
+            if chunk_indexes:
+                self._persist_streamed_articles(accumulated, max(chunk_indexes), dispatched, checkpoint, streamed_results, started)
+        
+        if accumulated is None:
+            return AIMessage(content="")
+        self._persist_streamed_articles(accumulated, None, dispatched, checkpoint, streamed_results, started)
+        return accumulated
+
+    def _persist_streamed_articles(self, accumulated, current_index: Optional[int], dispatched: set,
+                                   checkpoint: Optional[WorkCheckpoint], streamed_results: Dict[str, ToolCallResult],
+                                   started: float) -> None:
+        """Execute completed article-insert calls (those before current_index; all when None)"""
+        for call_chunk in accumulated.tool_call_chunks or []:
+            index = call_chunk.get("index")
+            if index in dispatched or (current_index is not None and index >= current_index):
+                continue
+            dispatched.add(index)
+            
+            # Only article inserts are independent of other calls; the rest runs after the stream ends
+            if call_chunk.get("name") != "KnowledgeBaseInsertArticle" or shutdown_coordinator.is_shutdown_requested():
+                continue
+            try:
+                args = json.loads(call_chunk.get("args") or "{}")
+            except json.JSONDecodeError:
+                continue  # Reported as an invalid tool call by _execute_tool_calls
+            
+            tool_call = {"name": call_chunk["name"], "args": args, "id": call_chunk.get("id") or f"call_{index}"}
+            call_result = self.tool_executor.execute([tool_call]).results[0]
+            streamed_results[call_result.call_id] = call_result
+            
+            if self._record_tool_result(call_result, checkpoint) and len(streamed_results) == 1:
+                self.log(f"⏱️ First article persisted {time.time() - started:.1f}s after the request (streaming)")
+
+    def _resume_article_creation_from_checkpoint(self, kb_id: int, checkpoint: WorkCheckpoint) -> Dict[str, Any]:
+        """Finish an interrupted work item using the tool calls saved in its checkpoint"""
+        model_used = checkpoint.data.get("model") or getattr(self.llm, 'azure_deployment', 'primary_model')
+        remaining = len(checkpoint.tool_calls) - len(checkpoint.completed_call_ids)
+        self.log(f"♻️ Resuming {checkpoint.work_key} from checkpoint - {remaining} of {len(checkpoint.tool_calls)} tool calls remaining, skipping LLM generation")
+        
+        self._set_kb_context_directly(kb_id)
+        response = AIMessage(content="", tool_calls=checkpoint.tool_calls)
+        tool_execution_result = self._execute_tool_calls(response, kb_id, checkpoint)
+        
+        if tool_execution_result.get("cancelled"):
+            return tool_execution_result
+        
+        return {
+            "success": tool_execution_result["success"],
+            "response": response,
+            "method": "resumed_from_checkpoint",
+            "model_used": model_used,
+            "articles_created": tool_execution_result.get("articles_created_list", []),
+            "execution_details": tool_execution_result,
+            "error": tool_execution_result.get("error")
+        }
+
+    @staticmethod
+    def _tool_call_succeeded(call_result: ToolCallResult) -> bool:
+        """The call ran and, for write tools, reported a non-failed status"""
+        if not call_result.success:
+            return False
+        return not isinstance(call_result.result, ToolResult.WriteModel) or call_result.result.success
+
+    @staticmethod
+    def _created_article(call_result: ToolCallResult) -> Optional[ToolResult.WriteModel]:
+        """Typed result of a KnowledgeBaseInsertArticle call that created an article, else None"""
+        result = call_result.result
+        if isinstance(result, ToolResult.WriteModel) and result.entity_type == "article" and result.status == ToolResult.CREATED:
+            return result
+        return None
+
+    def _record_tool_result(self, call_result: ToolCallResult, checkpoint: Optional[WorkCheckpoint]) -> Optional[ToolResult.WriteModel]:
+        """Log a finished call and record it on the checkpoint; returns the created article, if any"""
+        if not self._tool_call_succeeded(call_result):
+            error = call_result.result.error if isinstance(call_result.result, ToolResult.WriteModel) else call_result.error
+            self.log(f"❌ Tool execution failed for {call_result.tool_name}: {error}")
+            return None
+        
+        created = self._created_article(call_result)
+        if created:
+            self.log(f"✅ Article created successfully: {created.title} (ID: {created.id}, {created.duration_ms:.0f}ms)")
+        
+        if checkpoint is not None:
+            checkpoint.record_call_completed(call_result.call_id, {
+                "tool_name": call_result.tool_name,
+                "article_created": created is not None,
+                "article_id": created.id if created else None,
+                "title": created.title if created else None
+            })
+        return created
+
+    def _execute_tool_calls(self, response, kb_id: int, checkpoint: Optional[WorkCheckpoint] = None,
+                            streamed_results: Optional[Dict[str, ToolCallResult]] = None) -> Dict[str, Any]:
+        """Execute the tool calls from the LLM response and return results.
+
+        Completed calls are recorded on the checkpoint (when given) and skipped on resume. A requested
+        shutdown is honoured between execution waves so work stops at a consistent, resumable point.
+        Calls already executed while streaming (streamed_results) are not run again but are reported.
+        """
+        streamed_results = streamed_results or {}
         try:
             articles_created_count = 0
             articles_created_list = []
@@ -1397,68 +1675,72 @@ Start creating Level 1 category articles now using the available tools."""
             
             self.log(f"✅ Found {len(response.tool_calls)} tool calls to execute")
             
-            # Execute each tool call
-            for i, tool_call in enumerate(response.tool_calls):
-                try:
-                    tool_name = tool_call["name"]
-                    tool_args = tool_call["args"]
-                    
-                    self.log(f"Executing tool call {i+1}: {tool_name}")
-                    
-                    # Find the tool by name
-                    tool_instance = None
-                    for tool in self.tools:
-                        if tool.name == tool_name:
-                            tool_instance = tool
-                            break
-                    
-                    if not tool_instance:
-                        self.log(f"❌ Tool {tool_name} not found in available tools")
-                        continue
-                    
-                    # Execute the tool
-                    tool_result = tool_instance.run(tool_args)
-                    
-                    # Check if this was a KnowledgeBaseInsertArticle call
-                    if tool_name == "KnowledgeBaseInsertArticle":
-                        if "successfully created" in str(tool_result).lower() or "article created" in str(tool_result).lower():
-                            articles_created_count += 1
-                            
-                            # Try to extract article info from the result
-                            article_info = {
-                                "title": tool_args.get("article", {}).get("title", "Unknown Title"),
-                                "id": None,  # Would need to extract from tool result
-                                "created": True
-                            }
-                            articles_created_list.append(article_info)
-                            self.log(f"✅ Article created successfully: {article_info['title']}")
-                        else:
-                            self.log(f"⚠️ KnowledgeBaseInsertArticle execution may have failed: {tool_result}")
-                    
-                    execution_results.append({
-                        "tool_name": tool_name,
-                        "tool_args": tool_args,
-                        "result": tool_result,
-                        "success": True
-                    })
-                    
-                except Exception as tool_error:
-                    self.log(f"❌ Tool execution failed for {tool_call.get('name', 'unknown')}: {str(tool_error)}")
-                    execution_results.append({
-                        "tool_name": tool_call.get("name", "unknown"),
-                        "tool_args": tool_call.get("args", {}),
-                        "result": str(tool_error),
-                        "success": False
+            if checkpoint is not None:
+                # Articles created before an interruption still count towards this work item
+                for call_id, result_summary in checkpoint.data.get("results", {}).items():
+                    if result_summary.get("article_created") and call_id not in streamed_results:
+                        articles_created_count += 1
+                        articles_created_list.append({"title": result_summary.get("title", "Unknown Title"),
+                                                      "id": result_summary.get("article_id"), "created": True})
+            
+            def skip(call_id: str) -> bool:
+                return call_id in streamed_results or (checkpoint is not None and checkpoint.is_call_completed(call_id))
+            
+            # Independent calls run concurrently; dependent ones (tag association after tag/article creation)
+            # wait for the earlier wave. A requested shutdown is honoured between waves.
+            report = self.tool_executor.execute(
+                response.tool_calls,
+                skip=skip,
+                should_stop=shutdown_coordinator.is_shutdown_requested,
+                on_result=lambda call_result: self._record_tool_result(call_result, checkpoint)
+            )
+            self.log(f"Executed tool calls in {report.waves} wave(s) with up to {self.tool_executor.max_workers} workers")
+            
+            # Results in the original tool-call order
+            for call_result in report.results:
+                if call_result.skipped and call_result.call_id in streamed_results:
+                    call_result = streamed_results[call_result.call_id]
+                elif call_result.skipped:
+                    self.log(f"⏭️ Skipped tool call {call_result.index + 1}: {call_result.tool_name} (completed before interruption)")
+                    continue
+                if self.tool_executor.get_tool(call_result.tool_name) is None:
+                    continue
+                
+                created = self._created_article(call_result)
+                if created:
+                    articles_created_count += 1
+                    articles_created_list.append({
+                        "title": created.title,
+                        "id": created.id,
+                        "created": True
                     })
+                
+                execution_results.append({
+                    "tool_name": call_result.tool_name,
+                    "tool_args": call_result.tool_args,
+                    "result": call_result.result,
+                    "success": self._tool_call_succeeded(call_result)
+                })
             
-            # Final verification by checking database
+            if report.cancelled:
+                completed = sum(1 for call_result in report.results
+                                if not call_result.skipped or call_result.call_id in streamed_results)
+                self.log(f"🛑 Shutdown requested - stopping after {completed} of {len(response.tool_calls)} tool calls")
+                if checkpoint is not None:
+                    checkpoint.mark_interrupted(shutdown_coordinator.reason or "shutdown")
+                return {
+                    "success": False,
+                    "cancelled": True,
+                    "articles_created": articles_created_count,
+                    "articles_created_list": articles_created_list,
+                    "total_tool_calls": len(response.tool_calls),
+                    "execution_results": execution_results,
+                    "error": "Shutdown requested before all tool calls completed"
+                }
+            
+            # Typed tool results carry the new article IDs - no database re-check needed
             if articles_created_count > 0:
-                # Double-check with database verification
-                db_verified = self._verify_articles_in_database(kb_id)
-                if db_verified:
-                    self.log(f"✅ Database verification confirmed: {articles_created_count} articles created")
-                else:
-                    self.log(f"⚠️ Database verification failed despite tool execution success")
+                self.log(f"✅ {articles_created_count} articles created: IDs {[article['id'] for article in articles_created_list]}")
             
             return {
                 "success": articles_created_count > 0,
@@ -1518,79 +1800,6 @@ Start creating Level 1 category articles now using the available tools."""
             self.log(f"Warning: Could not check existing articles: {e}")
             return "EXISTING ARTICLES: Could not retrieve existing articles for duplicate checking."
 
-    def _verify_articles_in_database(self, kb_id: int) -> bool:
-        """Verify that articles were actually created in the database"""
-        try:
-            import psycopg2
-            from config.model_config import DATABASE_URL
-            
-            with psycopg2.connect(DATABASE_URL) as conn:
-                with conn.cursor() as cur:
-                    # Count articles created in the last 2 minutes for this KB
-                    cur.execute("""
-                        SELECT COUNT(*) FROM articles 
-                        WHERE knowledge_base_id = %s 
-                        AND created_at > NOW() - INTERVAL '2 minutes'
-                    """, (kb_id,))
-                    recent_count = cur.fetchone()[0]
-                    
-                    if recent_count > 0:
-                        self.log(f"✅ Database verification: {recent_count} recent articles found in KB {kb_id}")
-                        return True
-                    else:
-                        self.log(f"❌ Database verification: No recent articles found in KB {kb_id}")
-                        return False
-                        
-        except Exception as db_error:
-            self.log(f"❌ Database verification failed: {db_error}")
-            return False
-
-    def _verify_tool_usage(self, response) -> bool:
-        """Verify that the LLM actually used tools in its response"""
-        try:
-            # Check if response has tool calls or if articles were actually created
-            if hasattr(response, 'tool_calls') and response.tool_calls:
-                self.log(f"✅ Found {len(response.tool_calls)} tool calls in response")
-                return True
-            
-            # Alternative: Check if articles were actually created in KB by counting
-            # This is a more reliable verification than just assuming success
-            if hasattr(self, 'kb_context') and self.kb_context.get('knowledge_base_id'):
-                kb_id = self.kb_context['knowledge_base_id']
-                
-                # Quick database check to see if any articles were actually created
-                try:
-                    import psycopg2
-                    from config.model_config import DATABASE_URL
-                    
-                    with psycopg2.connect(DATABASE_URL) as conn:
-                        with conn.cursor() as cur:
-                            # Count articles created in the last minute for this KB
-                            cur.execute("""
-                                SELECT COUNT(*) FROM articles 
-                                WHERE knowledge_base_id = %s 
-                                AND created_at > NOW() - INTERVAL '1 minute'
-                            """, (kb_id,))
-                            recent_count = cur.fetchone()[0]
-                            
-                            if recent_count > 0:
-                                self.log(f"✅ Verified: {recent_count} articles created in KB {kb_id}")
-                                return True
-                            else:
-                                self.log(f"❌ No articles created in KB {kb_id} in the last minute")
-                                return False
-                                
-                except Exception as db_error:
-                    self.log(f"❌ Database verification failed: {db_error}")
-                    return False
-            
-            self.log("❌ No tool calls found and cannot verify article creation")
-            return False
-            
-        except Exception as e:
-            self.log(f"Error verifying tool usage: {e}")
-            return False
-
     def _switch_to_backup_model(self, user_request: str, kb_id: int) -> Dict[str, Any]:
         """Switch to backup model when primary model fails to use tools"""
         try:
@@ -1599,13 +1808,12 @@ Start creating Level 1 category articles now using the available tools."""
             
             # Import necessary components for backup model
             import os
-            from openai import AzureOpenAI
-            from langchain_openai import AzureChatOpenAI
             from langchain.agents import create_openai_tools_agent, AgentExecutor
             from langchain.prompts import ChatPromptTemplate
             
-            # Create backup model client using env variable
-            backup_model_name = os.getenv('OPENAI_API_BACKUP_MODEL_DEPLOYMENT_NAME', 'gpt-4o')
+            # Backup model client is pooled and pre-built by the LLM gateway
+            backup_llm = llm_gateway.get_llm("backup")
+            backup_model_name = llm_gateway.deployment_name("backup")
             backup_endpoint = os.getenv('OPENAI_API_ENDPOINT', 'unknown_endpoint')
             backup_api_version = os.getenv('OPENAI_API_VERSION', 'unknown_version')
             
@@ -1614,21 +1822,6 @@ Start creating Level 1 category articles now using the available tools."""
             self.log(f"   Backup Endpoint: {backup_endpoint}")
             self.log(f"   Backup API Version: {backup_api_version}")
             
-            backup_llm = AzureChatOpenAI(
-                azure_deployment=backup_model_name,
-                api_version=os.getenv('OPENAI_API_VERSION'),
-                azure_endpoint=os.getenv('OPENAI_API_ENDPOINT'),
-                api_key=os.getenv('OPENAI_API_KEY'),
-                temperature=0.1,
-                model_kwargs={"max_tokens": 4000}
-            )
-            
-            # Create agent with tools for backup model
-            tools = self.llm.bind_tools([
-                tool for tool in self.tools 
-                if hasattr(tool, 'name') and 'KnowledgeBase' in tool.name
-            ])
-            
             # Create a proper prompt for the backup model with agent_scratchpad
             backup_prompt = ChatPromptTemplate.from_messages([
                 ("system", "You are a content creation assistant. Use the KnowledgeBaseInsertArticle tool to create articles. ALWAYS use tools to create content."),
@@ -1638,7 +1831,7 @@ Start creating Level 1 category articles now using the available tools."""
             
             # Create agent executor with backup model
             agent = create_openai_tools_agent(backup_llm, self.tools, backup_prompt)
-            agent_executor = AgentExecutor(agent=agent, tools=self.tools, verbose=True)
+            agent_executor = AgentExecutor(agent=agent, tools=self.tools, verbose=True, return_intermediate_steps=True)
             
             # Execute with backup model
             self.log(f"🔧 Executing content creation with backup model...")
@@ -1674,13 +1867,17 @@ Start creating Level 1 category articles now using the available tools."""
                     "error_type": type(backup_error).__name__
                 }
             
-            # Verify backup model created articles
-            if self._verify_tool_usage_for_backup(kb_id):
-                self.log("✅ Backup model successfully created articles")
+            # Verify backup model created articles from the typed tool results it received
+            created_articles = [observation for _, observation in result.get("intermediate_steps", [])
+                                if isinstance(observation, ToolResult.WriteModel) and observation.entity_type == "article"
+                                and observation.status == ToolResult.CREATED]
+            if created_articles:
+                self.log(f"✅ Backup model successfully created {len(created_articles)} articles in KB {kb_id}")
                 return {
                     "success": True,
                     "model_used": backup_model_name,
                     "message": f"Content creation completed with backup model {backup_model_name}",
+                    "articles_created": [{"title": article.title, "id": article.id, "created": True} for article in created_articles],
                     "result": result
                 }
             else:
@@ -1716,33 +1913,6 @@ Start creating Level 1 category articles now using the available tools."""
                 "backup_model": backup_model_name
             }
 
-    def _verify_tool_usage_for_backup(self, kb_id: int) -> bool:
-        """Verify that the backup model actually created articles"""
-        try:
-            import psycopg2
-            from config.model_config import DATABASE_URL
-            
-            with psycopg2.connect(DATABASE_URL) as conn:
-                with conn.cursor() as cur:
-                    # Count articles created in the last 2 minutes for this KB
-                    cur.execute("""
-                        SELECT COUNT(*) FROM articles 
-                        WHERE knowledge_base_id = %s 
-                        AND created_at > NOW() - INTERVAL '2 minutes'
-                    """, (kb_id,))
-                    recent_count = cur.fetchone()[0]
-                    
-                    if recent_count > 0:
-                        self.log(f"✅ Backup model verification: {recent_count} articles created in KB {kb_id}")
-                        return True
-                    else:
-                        self.log(f"❌ Backup model verification: No articles created in KB {kb_id}")
-                        return False
-                        
-        except Exception as e:
-            self.log(f"❌ Backup model verification failed: {e}")
-            return False
-
     # Technical debt fallback methods removed - trusting the LLM to use tools properly
 
     def _get_project_id_from_kb(self, kb_id: int) -> Optional[int]:
@@ -9,7 +9,7 @@ from tools.knowledge_base_tools import KnowledgeBaseTools
 from tools.gitlab_tools import GitLabTools
 from prompts.knowledge_base_prompts import prompts as kb_prompts
 from prompts.multi_agent_prompts import prompts as ma_prompts
-from prompts.foundational_prompts import AgentSpecificFoundations
+from prompts.prompt_registry import prompt_registry
 
 # Ensure environment variables are loaded for database connectivity
 from dotenv import load_dotenv
@@ -25,7 +25,7 @@ class ContentManagementAgent(BaseAgent):
     
     def __init__(self, llm: AzureChatOpenAI):
         # Use shared foundational approach combined with specialized multi-agent prompts
-        foundational_prompt = AgentSpecificFoundations.content_management_foundation()
+        foundational_prompt = prompt_registry.get("content_management_foundation")
         specialized_prompt = ma_prompts.content_management_prompt()
         gitlab_integration_prompt = self._create_gitlab_integration_prompt()
         
@@ -8,7 +8,7 @@ from tools.knowledge_base_tools import KnowledgeBaseTools
 from tools.gitlab_tools import GitLabTools
 from prompts.knowledge_base_prompts import prompts as kb_prompts
 from prompts.multi_agent_prompts import prompts as ma_prompts
-from prompts.foundational_prompts import AgentSpecificFoundations
+from prompts.prompt_registry import prompt_registry
 
 # Ensure environment variables are loaded for database connectivity
 from dotenv import load_dotenv
@@ -34,7 +34,7 @@ class ContentPlannerAgent(BaseAgent):
     
     def __init__(self, llm: AzureChatOpenAI):
         # Use shared foundational approach combined with specialized planning prompts
-        foundational_prompt = AgentSpecificFoundations.content_planning_foundation()
+        foundational_prompt = prompt_registry.get("content_planning_foundation")
         specialized_prompt = self._get_planning_prompt()
         gitlab_integration_prompt = self._create_gitlab_integration_prompt()
         system_prompt = f"{foundational_prompt}\n\n{specialized_prompt}\n\n{gitlab_integration_prompt}"
@@ -8,7 +8,7 @@ from tools.knowledge_base_tools import KnowledgeBaseTools
 from tools.gitlab_tools import GitLabTools
 from prompts.knowledge_base_prompts import prompts as kb_prompts
 from prompts.multi_agent_prompts import prompts as ma_prompts
-from prompts.foundational_prompts import AgentSpecificFoundations
+from prompts.prompt_registry import prompt_registry
 
 
 class ContentRetrievalAgent(BaseAgent):
@@ -29,7 +29,7 @@ class ContentRetrievalAgent(BaseAgent):
     
     def __init__(self, llm: AzureChatOpenAI):
         # Use foundational prompt from AgentSpecificFoundations
-        foundational_prompt = AgentSpecificFoundations.content_retrieval_foundation()
+        foundational_prompt = prompt_registry.get("content_retrieval_foundation")
         specialized_prompt = self._get_retrieval_prompt()
         gitlab_integration_prompt = self._create_gitlab_integration_prompt()
         system_prompt = f"{foundational_prompt}\n\n{specialized_prompt}\n\n{gitlab_integration_prompt}"
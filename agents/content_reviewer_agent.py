@@ -8,7 +8,7 @@ from tools.knowledge_base_tools import KnowledgeBaseTools
 from tools.gitlab_tools import GitLabTools
 from prompts.knowledge_base_prompts import prompts as kb_prompts
 from prompts.multi_agent_prompts import prompts as ma_prompts
-from prompts.foundational_prompts import AgentSpecificFoundations
+from prompts.prompt_registry import prompt_registry
 
 
 class ContentReviewerAgent(BaseAgent):
@@ -28,7 +28,7 @@ class ContentReviewerAgent(BaseAgent):
     
     def __init__(self, llm: AzureChatOpenAI):
         # Use shared foundational approach combined with specialized review prompts
-        foundational_prompt = AgentSpecificFoundations.content_review_foundation()
+        foundational_prompt = prompt_registry.get("content_review_foundation")
         specialized_prompt = self._get_review_prompt()
         gitlab_integration_prompt = self._create_gitlab_integration_prompt()
         system_prompt = f"{foundational_prompt}\n\n{specialized_prompt}\n\n{gitlab_integration_prompt}"
@@ -15,7 +15,7 @@ from datetime import datetime
 warnings.filterwarnings('ignore', category=UserWarning, module='pydantic')
 
 from langchain_openai import AzureChatOpenAI
-from langchain.schema import HumanMessage, AIMessage
+from langchain.schema import HumanMessage, AIMessage, SystemMessage
 try:
     from langgraph.graph import StateGraph, END
 except ImportError:
@@ -46,11 +46,21 @@ from .postgresql_state_manager import PostgreSQLStateManager
 
 # Import existing operations
 from operations.knowledge_base_operations import KnowledgeBaseOperations
+from utils.cycle_profiler import cycle_profiler, ProfilerCallbackHandler
+from utils.llm_gateway import llm_gateway
+from utils.context_window import ConversationContextWindow
+from prompts.prompt_registry import prompt_registry, PromptStatsCallbackHandler
+from utils.llm_usage_ledger import usage_ledger
+from utils.session_registry import session_registry
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
+# Profiling and prompt-size stats for every gateway client; registered once per process rather than
+# per Orchestrator so session churn does not build new clients
+llm_gateway.add_callbacks([ProfilerCallbackHandler(cycle_profiler), PromptStatsCallbackHandler(prompt_registry)])
+
 class Orchestrator:
     """
     Multi-agent orchestrator with PostgreSQL-backed state management
@@ -61,22 +71,21 @@ class Orchestrator:
         
         print(f"🚀 Initializing Multi-Agent System (Session: {self.session_id[:8]}...)")
         
-        # Initialize PostgreSQL state manager
+        # Initialize PostgreSQL state manager (shared with any other front end attached to this session)
         try:
-            self.state_manager = PostgreSQLStateManager(self.session_id)
+            self.state_manager = session_registry.get_state_manager(self.session_id)
             print("✅ PostgreSQL state management initialized")
         except Exception as e:
             print(f"❌ Failed to initialize PostgreSQL state manager: {e}")
             print("💡 Please ensure PostgreSQL is running and properly configured")
             raise
         
-        # Initialize LLM
-        self.llm = AzureChatOpenAI(
-            azure_endpoint=os.getenv('OPENAI_API_ENDPOINT'),
-            azure_deployment=os.getenv('OPENAI_API_MODEL_DEPLOYMENT_NAME'),
-            api_version=os.getenv('OPENAI_API_VERSION'),
-            streaming=True
-        )
+        # Initialize LLM from the shared gateway; build the backup client now so failover stays off the critical path
+        self.llm = llm_gateway.get_llm("primary", streaming=True)
+        llm_gateway.warm_up(["backup"])
+        
+        # Token-budgeted history with a rolling summary of older turns
+        self.context_window = ConversationContextWindow(self.state_manager, llm_gateway.get_llm("primary"))
         
         # Initialize agents
         self.user_proxy = UserProxyAgent(self.llm)
@@ -264,20 +273,25 @@ class Orchestrator:
         
         return workflow.compile(checkpointer=self.memory)
     
+    def _process_attributed(self, agent, state: AgentState) -> AgentState:
+        """Run an agent node with its LLM usage attributed to the agent and current knowledge base"""
+        with usage_ledger.scope(agent=agent.name, kb_id=state.get("knowledge_base_id")):
+            return agent.process(state)
+    
     def _process_user_proxy(self, state: AgentState) -> AgentState:
         """Process UserProxy agent with simplified state management"""
         # Process with agent (no pre-sync to avoid deadlocks)
-        result_state = self.user_proxy.process(state)
+        result_state = self._process_attributed(self.user_proxy, state)
         return result_state
     
     def _process_supervisor(self, state: AgentState) -> AgentState:
         """Process Supervisor agent with simplified state management"""
-        result_state = self.supervisor.process(state)
+        result_state = self._process_attributed(self.supervisor, state)
         return result_state
     
     def _process_content_management(self, state: AgentState) -> AgentState:
         """Process ContentManagement agent with simplified state management"""
-        result_state = self.content_manager.process(state)
+        result_state = self._process_attributed(self.content_manager, state)
         return result_state
     
     def _route_from_user_proxy(self, state: AgentState) -> str:
@@ -390,37 +404,17 @@ class Orchestrator:
         else:
             current_message = AIMessage(content=content)
         
-        # Get conversation history from PostgreSQL (excluding the message we just added)
-        conversation_history = self.state_manager.get_conversation_history(limit=50)
-        
-        # Debug: Show conversation history being loaded
-        print(f"🔍 Loading {len(conversation_history)} messages from conversation history")
-        for i, msg in enumerate(conversation_history[-3:]):  # Show last 3 messages
-            role = msg['message_role']
-            content = msg['message_content'][:50] + "..." if len(msg['message_content']) > 50 else msg['message_content']
-            print(f"   {i+1}. {role}: {content}")
-        
-        # Convert PostgreSQL messages to LangChain format (excluding the current message we just added)
-        langchain_messages = []
-        for i, msg in enumerate(conversation_history):
-            # Skip the very last message (which is the current user input we just added)
-            if i < len(conversation_history) - 1:
-                msg_role = msg['message_role']
-                msg_content = msg['message_content']
-                
-                if msg_role == 'user':
-                    langchain_messages.append(HumanMessage(content=msg_content))
-                elif msg_role == 'assistant':
-                    langchain_messages.append(AIMessage(content=msg_content))
-        
-        # Add current message to history
-        langchain_messages.append(current_message)
+        # Recent turns within the token budget, older turns folded into the rolling summary
+        langchain_messages = self.context_window.build_messages(current_message)
+        window_stats = self.context_window.last_stats
+        print(f"🔍 Context window: {window_stats['history_messages']} recent messages "
+              f"(~{window_stats['history_tokens']} tokens) + summary (~{window_stats['summary_tokens']} tokens)")
         
         print(f"📋 Passing {len(langchain_messages)} messages to LangGraph agents")
         if len(langchain_messages) > 1:
             print(f"🔍 Previous messages in conversation:")
             for i, msg in enumerate(langchain_messages[:-1]):  # Don't show current message
-                msg_type = "👤 User" if isinstance(msg, HumanMessage) else "🤖 Assistant"
+                msg_type = "👤 User" if isinstance(msg, HumanMessage) else "📝 Summary" if isinstance(msg, SystemMessage) else "🤖 Assistant"
                 content_preview = msg.content[:60] + "..." if len(msg.content) > 60 else msg.content
                 print(f"   {i+1}. {msg_type}: {content_preview}")
         
@@ -429,7 +423,7 @@ class Orchestrator:
         
         # Create initial LangGraph state with full conversation history
         initial_state = {
-            "messages": langchain_messages,  # Full conversation history
+            "messages": langchain_messages,  # Summary + token-budgeted recent history
             "recursions": 0,  # Always reset recursions for new user message
             "current_agent": "UserProxy",
             "agent_messages": [],
@@ -486,6 +480,9 @@ class Orchestrator:
                     agent="System"
                 )
             
+            # Persist this turn's coalesced session/agent context writes
+            self.state_manager.flush()
+            
             # Print the response
             if last_message:
                 if hasattr(last_message, 'pretty_print'):
@@ -499,6 +496,7 @@ class Orchestrator:
             print(f"❌ Error processing message: {e}")
             self.state_manager.update_session_context(
                 agent="System",
+                durable=True,
                 conversation_state="error"
             )
             raise
@@ -515,8 +513,9 @@ class Orchestrator:
             
             print(f"🧹 Conversation state cleared (Old session: {old_session_id[:8]}..., New session: {self.session_id[:8]}...)")
             
-            # Create new state manager with new session ID
-            self.state_manager = PostgreSQLStateManager(self.session_id)
+            # Create new state manager with new session ID and move this orchestrator to it in the registry
+            self.state_manager = session_registry.get_state_manager(self.session_id)
+            session_registry.session_replaced(old_session_id, self.session_id)
             
             # Clear LangGraph memory with new session
             self.memory = MemorySaver()
@@ -541,7 +540,7 @@ class Orchestrator:
     def _process_content_planner(self, state: AgentState) -> AgentState:
         """Process ContentPlanner agent for strategic planning and structure design"""
         try:
-            return self.content_planner.process(state)
+            return self._process_attributed(self.content_planner, state)
         except Exception as e:
             print(f"❌ Error in ContentPlanner processing: {e}")
             state["error"] = str(e)
@@ -550,7 +549,7 @@ class Orchestrator:
     def _process_content_creator(self, state: AgentState) -> AgentState:
         """Process ContentCreator agent for expert content generation"""
         try:
-            return self.content_creator.process(state)
+            return self._process_attributed(self.content_creator, state)
         except Exception as e:
             print(f"❌ Error in ContentCreator processing: {e}")
             state["error"] = str(e)
@@ -559,7 +558,7 @@ class Orchestrator:
     def _process_content_reviewer(self, state: AgentState) -> AgentState:
         """Process ContentReviewer agent for quality assurance and optimization"""
         try:
-            return self.content_reviewer.process(state)
+            return self._process_attributed(self.content_reviewer, state)
         except Exception as e:
             print(f"❌ Error in ContentReviewer processing: {e}")
             state["error"] = str(e)
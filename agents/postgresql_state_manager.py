@@ -4,21 +4,42 @@ PostgreSQL-Based Robust State Management System
 This module provides a PostgreSQL-backed state management system that leverages
 your existing database infrastructure for superior performance, ACID transactions,
 and advanced JSON handling capabilities.
+
+Session and agent context are held in an in-process write-behind cache: reads are served
+from memory, updates mark the context dirty, and dirty contexts (with their audit entries)
+are coalesced into one pooled transaction by flush() - on a timer (STATE_FLUSH_INTERVAL_SECONDS),
+at the end of each turn, or immediately for durable=True updates. Set STATE_WRITE_BEHIND=false
+to flush on every update.
+
+Updates are written field by field with jsonb_set, and AgentContext's ever-growing lists
+(agent_messages, processed_workflow_messages) live in append-only tables, so the write volume
+of an update stays constant however long the session runs.
+
+Audit records are buffered per transaction and written with one multi-row INSERT at commit.
+With STATE_AUDIT_ASYNC=true they are handed to a background writer instead, taking audit
+writes off the request path entirely.
 """
 
 from typing import Dict, Any, Optional, List, Union
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, fields, asdict
 from datetime import datetime, timezone
+import copy
 import json
 import os
+import queue
+import atexit
 import psycopg2
-from psycopg2.extras import RealDictCursor, Json
+from psycopg2.extras import RealDictCursor, Json, execute_values
 import threading
 from enum import Enum
 from contextlib import contextmanager
 import logging
 from dotenv import load_dotenv
 
+from utils.database_manager import db_manager
+from utils.schema_migrations import schema_migrator
+from utils.state_retention import state_retention_manager
+
 class DateTimeAwareJSONEncoder(json.JSONEncoder):
     """Custom JSON encoder that handles datetime objects"""
     def default(self, obj):
@@ -81,6 +102,22 @@ class SessionContext:
         if self.conversation_state not in ["active", "waiting", "completed", "error"]:
             return False
         return True
+    
+    def validation_errors(self) -> List[str]:
+        """Detailed reasons validate() fails (empty when valid)"""
+        error_details = []
+        if not self.session_id:
+            error_details.append("session_id is missing or empty")
+        if self.intent_confidence is not None:
+            try:
+                confidence_float = float(self.intent_confidence)
+                if not 0.0 <= confidence_float <= 1.0:
+                    error_details.append(f"intent_confidence ({self.intent_confidence}, type: {type(self.intent_confidence)}) must be between 0.0 and 1.0")
+            except (TypeError, ValueError):
+                error_details.append(f"intent_confidence ({self.intent_confidence}, type: {type(self.intent_confidence)}) is not a valid number")
+        if self.conversation_state not in ["active", "waiting", "completed", "error"]:
+            error_details.append(f"conversation_state ({self.conversation_state}) must be one of: active, waiting, completed, error")
+        return error_details
 
 @dataclass
 class AgentContext:
@@ -99,6 +136,101 @@ class AgentContext:
         self.recursions = 0
         self.consecutive_tool_calls = 0
         self.last_tool_result = None
+    
+    def document(self) -> Dict[str, Any]:
+        """agent_context column value: every field except the lists kept in AGENT_LIST_TABLES"""
+        return {f.name: copy.deepcopy(getattr(self, f.name)) for f in fields(self) if f.name not in AGENT_LIST_TABLES}
+
+# AgentContext list fields stored one row per item: field → (table, item column)
+AGENT_LIST_TABLES = {
+    "agent_messages": ("agent_context_messages", "message"),
+    "processed_workflow_messages": ("processed_workflow_messages", "message_id"),
+}
+
+def agent_list_change(field_name: str, old: List[Any], new: List[Any]) -> Optional[tuple]:
+    """
+    Smallest write that turns a stored AgentContext list into new.
+    
+    Returns ("append", items) when new only adds items, ("replace", items) otherwise, or None
+    when nothing changed. processed_workflow_messages has set semantics (order is not kept).
+    """
+    new = list(new or [])
+    if field_name == "processed_workflow_messages":
+        old_ids = set(old)
+        new = list(dict.fromkeys(new))
+        if old_ids.issubset(new):
+            added = [message_id for message_id in new if message_id not in old_ids]
+            return ("append", added) if added else None
+    elif new[:len(old)] == list(old):
+        tail = new[len(old):]
+        return ("append", tail) if tail else None
+    return ("replace", new)
+
+def _insert_agent_list_items(cursor, session_id: str, field_name: str, items: List[Any]):
+    """Append AgentContext list items to their table (already processed IDs are skipped)"""
+    if not items:
+        return
+    table, column = AGENT_LIST_TABLES[field_name]
+    if field_name == "processed_workflow_messages":
+        rows = [(session_id, str(message_id)) for message_id in items]
+        conflict = " ON CONFLICT DO NOTHING"
+    else:
+        rows = [(session_id, Json(item)) for item in items]
+        conflict = ""
+    execute_values(cursor, f"INSERT INTO {table} (session_id, {column}) VALUES %s{conflict}", rows)
+
+def _insert_audit_rows(cursor, rows: List[tuple]):
+    """Write audit rows with a single multi-row INSERT (the session FK guarantees the session exists)"""
+    execute_values(cursor, """
+        INSERT INTO state_audit_log
+        (session_id, change_type, change_path, old_value, new_value, agent_name)
+        VALUES %s
+    """, rows)
+
+class StateAuditWriter:
+    """Background writer that batches state audit rows off the request path"""
+    
+    def __init__(self):
+        self.batch_size = int(os.getenv('STATE_AUDIT_BATCH_SIZE', '100'))
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.flush)
+    
+    def submit(self, rows: List[tuple]):
+        for row in rows:
+            self._queue.put(row)
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="state-audit-writer", daemon=True)
+                    self._thread.start()
+    
+    def flush(self):
+        """Block until every submitted row has been written (or dropped after an error)"""
+        if self._thread is not None:
+            self._queue.join()
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with db_manager.get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        _insert_audit_rows(cursor, batch)
+                    conn.commit()
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} audit records: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+state_audit_writer = StateAuditWriter()
 
 class PostgreSQLStateManager:
     """
@@ -110,6 +242,21 @@ class PostgreSQLStateManager:
         self.session_id = session_id
         self._lock = threading.RLock()
         
+        # Write-behind cache of session/agent context (authoritative for this process)
+        self.write_behind = os.getenv('STATE_WRITE_BEHIND', 'true').lower() == 'true'
+        self.flush_interval = float(os.getenv('STATE_FLUSH_INTERVAL_SECONDS', '2'))
+        self._session_context: Optional[SessionContext] = None
+        self._agent_context: Optional[AgentContext] = None
+        self._dirty: Dict[str, set] = {}  # session_states column → context fields awaiting flush
+        self._pending_list_ops: List[tuple] = []  # (field, "append" | "replace", items) for AGENT_LIST_TABLES
+        self._pending_audit: List[tuple] = []
+        self._flush_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        
+        # Audit rows buffered by the open state_transaction on this thread
+        self.audit_async = os.getenv('STATE_AUDIT_ASYNC', 'false').lower() == 'true'
+        self._tx_local = threading.local()
+        
         # Database connection parameters from environment
         self.db_config = {
             'host': os.getenv('POSTGRES_HOST') or os.getenv('DB_HOST'),
@@ -124,83 +271,24 @@ class PostgreSQLStateManager:
         
         # Initialize or load session
         self._initialize_session()
+        
+        # Don't lose coalesced writes on interpreter exit
+        atexit.register(self.close)
     
     def _get_connection(self):
         """Get a database connection"""
         return psycopg2.connect(**self.db_config)
     
     def _init_state_schema(self):
-        """Initialize state management tables if they don't exist"""
-        schema_sql = """
-        -- Session state management table
-        CREATE TABLE IF NOT EXISTS session_states (
-            session_id VARCHAR(255) PRIMARY KEY,
-            session_context JSONB NOT NULL DEFAULT '{}',
-            agent_context JSONB NOT NULL DEFAULT '{}',
-            conversation_metadata JSONB NOT NULL DEFAULT '{}',
-            is_active BOOLEAN DEFAULT TRUE,
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-        );
-        
-        -- Conversation messages table for better query performance
-        CREATE TABLE IF NOT EXISTS conversation_messages (
-            id SERIAL PRIMARY KEY,
-            session_id VARCHAR(255) REFERENCES session_states(session_id) ON DELETE CASCADE,
-            message_role VARCHAR(50) NOT NULL,
-            message_content TEXT NOT NULL,
-            message_metadata JSONB DEFAULT '{}',
-            agent_name VARCHAR(100),
-            tool_calls JSONB DEFAULT '[]',
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            message_order INTEGER NOT NULL
-        );
-        
-        -- State change audit log
-        CREATE TABLE IF NOT EXISTS state_audit_log (
-            id SERIAL PRIMARY KEY,
-            session_id VARCHAR(255) REFERENCES session_states(session_id) ON DELETE CASCADE,
-            change_type VARCHAR(50) NOT NULL,
-            change_path VARCHAR(255) NOT NULL,
-            old_value JSONB,
-            new_value JSONB,
-            agent_name VARCHAR(100),
-            change_timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            correlation_id UUID DEFAULT gen_random_uuid()
-        );
-        
-        -- Indexes for performance
-        CREATE INDEX IF NOT EXISTS idx_session_states_active ON session_states(is_active, updated_at);
-        CREATE INDEX IF NOT EXISTS idx_conversation_messages_session ON conversation_messages(session_id, message_order);
-        CREATE INDEX IF NOT EXISTS idx_conversation_messages_created ON conversation_messages(created_at);
-        CREATE INDEX IF NOT EXISTS idx_state_audit_session ON state_audit_log(session_id, change_timestamp);
-        CREATE INDEX IF NOT EXISTS idx_session_context_gin ON session_states USING GIN (session_context);
-        CREATE INDEX IF NOT EXISTS idx_agent_context_gin ON session_states USING GIN (agent_context);
-        
-        -- Trigger to auto-update the updated_at timestamp
-        CREATE OR REPLACE FUNCTION update_session_updated_at()
-        RETURNS TRIGGER AS $$
-        BEGIN
-            NEW.updated_at = CURRENT_TIMESTAMP;
-            RETURN NEW;
-        END;
-        $$ LANGUAGE plpgsql;
-        
-        DROP TRIGGER IF EXISTS trigger_update_session_timestamp ON session_states;
-        CREATE TRIGGER trigger_update_session_timestamp
-            BEFORE UPDATE ON session_states
-            FOR EACH ROW
-            EXECUTE FUNCTION update_session_updated_at();
-        """
-        
+        """Verify the schema version (migrations are applied once, not on every construction)"""
         try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(schema_sql)
-                conn.commit()
+            schema_migrator.ensure_current()
         except Exception as e:
             logger.error(f"Failed to initialize state schema: {e}")
             raise
+        
+        # Keep monthly partitions created ahead (background, at most every STATE_RETENTION_INTERVAL_HOURS)
+        state_retention_manager.run_if_due()
     
     def _initialize_session(self):
         """Initialize session state if it doesn't exist"""
@@ -216,7 +304,7 @@ class PostgreSQLStateManager:
                     if not cursor.fetchone():
                         # Create new session
                         initial_session_context = asdict(SessionContext(session_id=self.session_id))
-                        initial_agent_context = asdict(AgentContext())
+                        initial_agent_context = AgentContext().document()
                         
                         cursor.execute("""
                             INSERT INTO session_states (session_id, session_context, agent_context)
@@ -266,8 +354,9 @@ class PostgreSQLStateManager:
             conn.autocommit = False  # Start transaction
             
             with self._lock:
+                self._tx_local.audit_rows = []
                 yield conn
-                conn.commit()
+                self._commit_with_audit(conn, self._tx_local.audit_rows)
                 
         except Exception as e:
             if conn:
@@ -275,52 +364,161 @@ class PostgreSQLStateManager:
             logger.error(f"State transaction failed: {e}")
             raise
         finally:
+            self._tx_local.audit_rows = None
             if conn:
                 conn.close()
     
+    def _session_from_json(self, session_data: Dict[str, Any]) -> SessionContext:
+        # Ensure session_id is included in the data
+        if 'session_id' not in session_data:
+            session_data['session_id'] = self.session_id
+        return SessionContext(**session_data)
+    
+    @staticmethod
+    def _agent_from_json(agent_dict: Dict[str, Any], agent_messages: List[Any],
+                         processed_workflow_messages: List[str]) -> AgentContext:
+        # The list fields come from their own tables, not from the agent_context document
+        agent_dict = {key: value for key, value in agent_dict.items() if key not in AGENT_LIST_TABLES}
+        return AgentContext(
+            agent_messages=agent_messages or [],
+            processed_workflow_messages=processed_workflow_messages or [],
+            **agent_dict
+        )
+    
+    def _load_contexts(self):
+        """Load session and agent context (with the agent list tables) into the cache on first use"""
+        if self._session_context is not None:
+            return
+        
+        with db_manager.get_cursor() as (conn, cursor):
+            cursor.execute("""
+                SELECT s.session_context, s.agent_context,
+                       (SELECT COALESCE(jsonb_agg(m.message ORDER BY m.id), '[]')
+                        FROM agent_context_messages m WHERE m.session_id = s.session_id) AS agent_messages,
+                       (SELECT COALESCE(jsonb_agg(p.message_id ORDER BY p.processed_at, p.message_id), '[]')
+                        FROM processed_workflow_messages p WHERE p.session_id = s.session_id) AS processed_workflow_messages
+                FROM session_states s
+                WHERE s.session_id = %s
+            """, (self.session_id,))
+            row = cursor.fetchone()
+        
+        if not row:
+            raise ValueError(f"Session {self.session_id} not found")
+        
+        self._session_context = self._session_from_json(row['session_context'])
+        self._agent_context = self._agent_from_json(
+            row['agent_context'], row['agent_messages'], row['processed_workflow_messages']
+        )
+    
+    def _mark_dirty(self, column: str, changed_fields: List[str], audit_entries: List[tuple], durable: bool,
+                    list_ops: Optional[List[tuple]] = None):
+        """Queue changed context fields, list appends and their audit entries for the next flush"""
+        with self._lock:
+            self._dirty.setdefault(column, set()).update(changed_fields)
+            self._pending_list_ops.extend(list_ops or [])
+            self._pending_audit.extend(audit_entries)
+        
+        if durable or not self.write_behind:
+            self.flush()
+        else:
+            self._schedule_flush()
+    
+    def _schedule_flush(self):
+        with self._lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self._timed_flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def _timed_flush(self):
+        with self._lock:
+            self._flush_timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Write-behind flush failed, retrying in {self.flush_interval}s: {e}")
+            self._schedule_flush()
+    
+    def flush(self):
+        """
+        Write dirty context fields, list appends and their audit entries in one pooled transaction.
+        
+        Each changed field is set with jsonb_set and list items are inserted as rows, so the
+        statement size depends on what changed, not on how large the session has grown.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                if not self._dirty and not self._pending_list_ops:
+                    return
+                
+                contexts = {"session_context": self._session_context, "agent_context": self._agent_context}
+                field_values = {
+                    column: {name: copy.deepcopy(getattr(contexts[column], name)) for name in sorted(changed)}
+                    for column, changed in self._dirty.items() if changed
+                }
+                dirty, list_ops, audit_entries = self._dirty, self._pending_list_ops, self._pending_audit
+                self._dirty, self._pending_list_ops, self._pending_audit = {}, [], []
+            
+            try:
+                with db_manager.get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        if field_values:
+                            assignments, params = [], []
+                            for column, values in field_values.items():
+                                expression = column
+                                for name, value in values.items():
+                                    expression = f"jsonb_set({expression}, %s, %s)"
+                                    params.extend([[name], Json(value)])
+                                assignments.append(f"{column} = {expression}")
+                            cursor.execute(
+                                f"UPDATE session_states SET {', '.join(assignments)} WHERE session_id = %s",
+                                (*params, self.session_id)
+                            )
+                        for field_name, operation, items in list_ops:
+                            if operation == "replace":
+                                table, _ = AGENT_LIST_TABLES[field_name]
+                                cursor.execute(f"DELETE FROM {table} WHERE session_id = %s", (self.session_id,))
+                            _insert_agent_list_items(cursor, self.session_id, field_name, items)
+                    self._commit_with_audit(conn, [self._audit_row(*entry) for entry in audit_entries])
+            except Exception:
+                # Keep the changes queued; the cache still holds the latest values
+                with self._lock:
+                    for column, changed in dirty.items():
+                        self._dirty.setdefault(column, set()).update(changed)
+                    self._pending_list_ops = list_ops + self._pending_list_ops
+                    self._pending_audit = audit_entries + self._pending_audit
+                raise
+    
+    def close(self):
+        """Flush outstanding writes and stop the write-behind timer"""
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush session state for {self.session_id}: {e}")
+    
     def get_session_context(self) -> Optional[SessionContext]:
         """Get current session context"""
         try:
-            with self._get_connection() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    cursor.execute(
-                        "SELECT session_context FROM session_states WHERE session_id = %s",
-                        (self.session_id,)
-                    )
-                    row = cursor.fetchone()
-                    
-                    if row:
-                        session_data = row['session_context']
-                        # Ensure session_id is included in the data
-                        if 'session_id' not in session_data:
-                            session_data['session_id'] = self.session_id
-                        return SessionContext(**session_data)
-                    return None
+            with self._lock:
+                self._load_contexts()
+                return copy.deepcopy(self._session_context)
         except Exception as e:
             logger.error(f"Failed to get session context: {e}")
             return None
     
-    def update_session_context(self, agent: str = "System", **kwargs) -> SessionContext:
-        """Update session context with validation and audit"""
-        with self.state_transaction(agent) as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Get current context
-            cursor.execute(
-                "SELECT session_context FROM session_states WHERE session_id = %s FOR UPDATE",
-                (self.session_id,)
-            )
-            row = cursor.fetchone()
-            
-            if not row:
-                raise ValueError(f"Session {self.session_id} not found")
-            
-            session_data = row['session_context']
-            # Ensure session_id is included in the data
-            if 'session_id' not in session_data:
-                session_data['session_id'] = self.session_id
-            current_context = SessionContext(**session_data)
-            old_context = asdict(current_context)
+    def update_session_context(self, agent: str = "System", durable: bool = False, **kwargs) -> SessionContext:
+        """Update session context with validation and audit
+        
+        Args:
+            durable: Flush to PostgreSQL before returning instead of on the write-behind timer
+        """
+        with self._lock:
+            self._load_contexts()
+            current_context = copy.deepcopy(self._session_context)
+            audit_entries = []
             
             # Update fields
             for key, value in kwargs.items():
@@ -329,170 +527,167 @@ class PostgreSQLStateManager:
                     setattr(current_context, key, value)
                     
                     # Audit individual field changes
-                    self._audit_change(
-                        "UPDATE", f"session.{key}", old_value, value, agent, conn
-                    )
+                    audit_entries.append(("UPDATE", f"session.{key}", old_value, value, agent))
             
             # Update timestamp and validate
             current_context.last_updated = datetime.now(timezone.utc).isoformat()
+            changed_fields = [key for key in kwargs if hasattr(current_context, key)] + ["last_updated"]
             
             if not current_context.validate():
                 # Provide detailed validation error
-                error_details = []
-                if not current_context.session_id:
-                    error_details.append("session_id is missing or empty")
-                if current_context.intent_confidence is not None:
-                    try:
-                        confidence_float = float(current_context.intent_confidence)
-                        if not 0.0 <= confidence_float <= 1.0:
-                            error_details.append(f"intent_confidence ({current_context.intent_confidence}, type: {type(current_context.intent_confidence)}) must be between 0.0 and 1.0")
-                    except (TypeError, ValueError):
-                        error_details.append(f"intent_confidence ({current_context.intent_confidence}, type: {type(current_context.intent_confidence)}) is not a valid number")
-                if current_context.conversation_state not in ["active", "waiting", "completed", "error"]:
-                    error_details.append(f"conversation_state ({current_context.conversation_state}) must be one of: active, waiting, completed, error")
-                
-                error_msg = f"Invalid session context update: {'; '.join(error_details)}"
+                error_msg = f"Invalid session context update: {'; '.join(current_context.validation_errors())}"
                 print(f"❌ Validation failed: {error_msg}")
                 print(f"🔍 Context values: session_id='{current_context.session_id}', intent_confidence={current_context.intent_confidence}, conversation_state='{current_context.conversation_state}'")
                 raise ValueError(error_msg)
             
-            # Save to database
-            new_context = asdict(current_context)
-            cursor.execute("""
-                UPDATE session_states 
-                SET session_context = %s 
-                WHERE session_id = %s
-            """, (Json(new_context), self.session_id))
-            
-            return current_context
+            self._session_context = current_context
+            result = copy.deepcopy(current_context)
+        
+        self._mark_dirty("session_context", changed_fields, audit_entries, durable)
+        return result
     
     def get_agent_context(self) -> Optional[AgentContext]:
         """Get current agent context"""
         try:
-            with self._get_connection() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    cursor.execute(
-                        "SELECT agent_context FROM session_states WHERE session_id = %s",
-                        (self.session_id,)
-                    )
-                    row = cursor.fetchone()
-                    
-                    if row:
-                        agent_dict = row['agent_context']
-                        # Handle list format for processed_workflow_messages (stored as list in JSON)
-                        if "processed_workflow_messages" in agent_dict and agent_dict["processed_workflow_messages"]:
-                            # Keep as list for JSON compatibility
-                            pass  # It's already a list from JSON
-                        else:
-                            agent_dict["processed_workflow_messages"] = []
-                        
-                        return AgentContext(**agent_dict)
-                    return None
+            with self._lock:
+                self._load_contexts()
+                return copy.deepcopy(self._agent_context)
         except Exception as e:
             logger.error(f"Failed to get agent context: {e}")
             return None
     
-    def update_agent_context(self, agent: str, **kwargs) -> AgentContext:
-        """Update agent context with audit"""
-        with self.state_transaction(agent) as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Get current context
-            cursor.execute(
-                "SELECT agent_context FROM session_states WHERE session_id = %s FOR UPDATE",
-                (self.session_id,)
-            )
-            row = cursor.fetchone()
-            
-            if not row:
-                raise ValueError(f"Session {self.session_id} not found")
-            
-            agent_dict = row['agent_context']
-            # Handle list format
-            if "processed_workflow_messages" in agent_dict and agent_dict["processed_workflow_messages"]:
-                # Keep as list for JSON compatibility
-                pass  # It's already a list
-            else:
-                agent_dict["processed_workflow_messages"] = []
-            
-            current_context = AgentContext(**agent_dict)
+    def update_agent_context(self, agent: str, durable: bool = False, **kwargs) -> AgentContext:
+        """Update agent context with audit
+        
+        Args:
+            durable: Flush to PostgreSQL before returning instead of on the write-behind timer
+        """
+        with self._lock:
+            self._load_contexts()
+            current_context = copy.deepcopy(self._agent_context)
+            audit_entries = []
+            changed_fields = []
+            list_ops = []
             
             # Track agent switches
             if "current_agent" in kwargs and kwargs["current_agent"] != current_context.current_agent:
                 current_context.last_agent_switch = datetime.now(timezone.utc).isoformat()
-                self._audit_change(
-                    "AGENT_SWITCH", "agent.current_agent", 
-                    current_context.current_agent, kwargs["current_agent"], agent, conn
-                )
+                changed_fields.append("last_agent_switch")
+                audit_entries.append((
+                    "AGENT_SWITCH", "agent.current_agent",
+                    current_context.current_agent, kwargs["current_agent"], agent
+                ))
             
             # Update fields
             for key, value in kwargs.items():
                 if hasattr(current_context, key):
                     old_value = getattr(current_context, key)
-                    setattr(current_context, key, value)
                     
+                    if key in AGENT_LIST_TABLES:
+                        # Lists are appended to (or replaced in) their own table; audit only the change
+                        change = agent_list_change(key, old_value, value)
+                        setattr(current_context, key, list(value or []))
+                        if change:
+                            operation, items = change
+                            list_ops.append((key, operation, copy.deepcopy(items)))
+                            audit_entries.append((
+                                "UPDATE", f"agent.{key}",
+                                {"count": len(old_value)} if operation == "replace" else None,
+                                {operation: items}, agent
+                            ))
+                        continue
+                    
+                    setattr(current_context, key, value)
+                    changed_fields.append(key)
                     if key != "current_agent":  # Already audited above
-                        self._audit_change(
-                            "UPDATE", f"agent.{key}", old_value, value, agent, conn
-                        )
-            
-            # Save to database (ensure list format for JSON)
-            context_dict = asdict(current_context)
-            if "processed_workflow_messages" in context_dict:
-                # Ensure it's a list (it should already be one)
-                if not isinstance(context_dict["processed_workflow_messages"], list):
-                    context_dict["processed_workflow_messages"] = list(context_dict["processed_workflow_messages"])
-            
-            cursor.execute("""
-                UPDATE session_states 
-                SET agent_context = %s 
-                WHERE session_id = %s
-            """, (Json(context_dict), self.session_id))
+                        audit_entries.append(("UPDATE", f"agent.{key}", old_value, value, agent))
             
-            return current_context
+            self._agent_context = current_context
+            result = copy.deepcopy(current_context)
+        
+        self._mark_dirty("agent_context", changed_fields, audit_entries, durable, list_ops)
+        return result
     
     def add_conversation_message(self, 
                                role: str, 
                                content: str, 
                                agent: Optional[str] = None,
                                metadata: Optional[Dict[str, Any]] = None,
-                               tool_calls: Optional[List[Dict[str, Any]]] = None):
-        """Add message to conversation history with proper indexing"""
+                               tool_calls: Optional[List[Dict[str, Any]]] = None) -> int:
+        """Add message to conversation history with proper indexing; returns its message_order"""
+        return self.add_conversation_messages([{
+            "role": role,
+            "content": content,
+            "metadata": metadata,
+            "tool_calls": tool_calls
+        }], agent)[0]
+    
+    def add_conversation_messages(self, messages: List[Dict[str, Any]], agent: Optional[str] = None) -> List[int]:
+        """
+        Append several messages (e.g. user + tool + assistant) in a single statement.
+        
+        Orders come from the session's last_message_order counter: the UPDATE row lock serializes
+        concurrent writers to the same session, so orders never collide.
+        
+        Args:
+            messages: Dicts with role, content and optional metadata / tool_calls / agent
+            agent: Default agent_name for messages that don't set one
+        
+        Returns:
+            The message_order of each message, in input order
+        """
+        if not messages:
+            return []
+        
+        rows = [
+            (
+                position,
+                message["role"],
+                message["content"],
+                Json(message.get("metadata") or {}),
+                message.get("agent", agent),
+                Json(message.get("tool_calls") or [])
+            )
+            for position, message in enumerate(messages, start=1)
+        ]
+        
         with self.state_transaction(agent) as conn:
-            cursor = conn.cursor()
-            
-            # Get next message order
-            cursor.execute("""
-                SELECT COALESCE(MAX(message_order), 0) + 1 
-                FROM conversation_messages 
-                WHERE session_id = %s
-            """, (self.session_id,))
-            message_order = cursor.fetchone()[0]
-            
-            # Insert message
-            cursor.execute("""
-                INSERT INTO conversation_messages 
-                (session_id, message_role, message_content, message_metadata, agent_name, tool_calls, message_order)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                self.session_id,
-                role,
-                content,
-                Json(metadata or {}),
-                agent,
-                Json(tool_calls or []),
-                message_order
-            ))
+            with conn.cursor() as cursor:
+                # Bump the counter by the batch size and insert every row in one statement
+                # (execute_values takes only the VALUES placeholder, so bind the rest up front)
+                counter_sql = cursor.mogrify("""
+                    WITH next_order AS (
+                        UPDATE session_states
+                        SET last_message_order = last_message_order + %s
+                        WHERE session_id = %s
+                        RETURNING last_message_order - %s AS base_order
+                    )
+                    INSERT INTO conversation_messages
+                    (session_id, message_role, message_content, message_metadata, agent_name, tool_calls, message_order)
+                    SELECT %s, v.message_role, v.message_content, v.message_metadata::jsonb, v.agent_name,
+                           v.tool_calls::jsonb, next_order.base_order + v.position
+                """, (len(rows), self.session_id, len(rows), self.session_id)).decode().replace("%", "%%")
+                inserted = execute_values(cursor, counter_sql + """
+                    FROM next_order, (VALUES %s) AS v(position, message_role, message_content, message_metadata, agent_name, tool_calls)
+                    RETURNING message_order
+                """, rows, page_size=len(rows), fetch=True)
+            
+            if len(inserted) != len(rows):
+                raise ValueError(f"Session {self.session_id} not found")
             
             # Audit conversation update
-            self._audit_change(
-                "CONVERSATION_UPDATE", "conversation.message", None,
-                {"role": role, "content": content[:100] + "..." if len(content) > 100 else content},
-                agent, conn
-            )
+            for message in messages:
+                content = message["content"]
+                self._audit_change(
+                    "CONVERSATION_UPDATE", "conversation.message", None,
+                    {"role": message["role"], "content": content[:100] + "..." if len(content) > 100 else content},
+                    message.get("agent", agent), conn
+                )
+        
+        return sorted(row[0] for row in inserted)
     
-    def get_conversation_history(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent conversation history"""
+    def get_conversation_history(self, limit: Optional[int] = 10, after_order: int = 0) -> List[Dict[str, Any]]:
+        """Get recent conversation history (limit=None for every message after after_order)"""
         try:
             with self._get_connection() as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
@@ -500,10 +695,10 @@ class PostgreSQLStateManager:
                         SELECT message_role, message_content, message_metadata, 
                                agent_name, tool_calls, created_at, message_order
                         FROM conversation_messages 
-                        WHERE session_id = %s 
+                        WHERE session_id = %s AND message_order > %s
                         ORDER BY message_order DESC 
                         LIMIT %s
-                    """, (self.session_id, limit))
+                    """, (self.session_id, after_order, limit))
                     
                     messages = cursor.fetchall()
                     return [dict(msg) for msg in reversed(messages)]  # Return in chronological order
@@ -511,40 +706,73 @@ class PostgreSQLStateManager:
             logger.error(f"Failed to get conversation history: {e}")
             return []
     
-    def merge_langgraph_state(self, langgraph_state: Dict[str, Any], agent: str = "System"):
-        """Merge state from LangGraph execution with atomic updates"""
+    def get_conversation_summary(self) -> Dict[str, Any]:
+        """Get the rolling summary of older conversation turns ({} if none yet)"""
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    cursor.execute("""
+                        SELECT conversation_metadata -> 'rolling_summary' AS rolling_summary
+                        FROM session_states WHERE session_id = %s
+                    """, (self.session_id,))
+                    row = cursor.fetchone()
+                    return (row and row['rolling_summary']) or {}
+        except Exception as e:
+            logger.error(f"Failed to get conversation summary: {e}")
+            return {}
+    
+    def update_conversation_summary(self, summary: str, through_message_order: int, agent: str = "System"):
+        """Store the rolling summary covering all messages up to through_message_order"""
+        rolling_summary = {
+            "text": summary,
+            "through_message_order": through_message_order,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
         with self.state_transaction(agent) as conn:
-            # Update session context from LangGraph state
-            session_updates = {}
-            for key in ["knowledge_base_id", "article_id", "user_intent", "task_context"]:
-                if key in langgraph_state and langgraph_state[key] is not None:
-                    session_updates[key] = langgraph_state[key]
-            
-            if session_updates:
-                self.update_session_context(agent, **session_updates)
-            
-            # Update agent context
-            agent_updates = {}
-            for key in ["current_agent", "recursions", "consecutive_tool_calls", "last_tool_result"]:
-                if key in langgraph_state:
-                    agent_updates[key] = langgraph_state[key]
-            
-            # Handle processed workflow messages
-            if "processed_workflow_messages" in langgraph_state:
-                agent_updates["processed_workflow_messages"] = langgraph_state["processed_workflow_messages"]
-            
-            if agent_updates:
-                self.update_agent_context(agent, **agent_updates)
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE session_states
+                SET conversation_metadata = jsonb_set(COALESCE(conversation_metadata, '{}'), '{rolling_summary}', %s)
+                WHERE session_id = %s
+            """, (Json(rolling_summary), self.session_id))
             
-            # Handle new messages
-            if "messages" in langgraph_state:
-                for msg in langgraph_state["messages"]:
-                    if hasattr(msg, 'content') and hasattr(msg, '__class__'):
-                        self.add_conversation_message(
-                            role=msg.__class__.__name__,
-                            content=msg.content,
-                            agent=agent
-                        )
+            self._audit_change(
+                "CONVERSATION_UPDATE", "conversation.rolling_summary", None,
+                {"through_message_order": through_message_order, "length": len(summary)},
+                agent, conn
+            )
+    
+    def merge_langgraph_state(self, langgraph_state: Dict[str, Any], agent: str = "System"):
+        """Merge state from LangGraph execution into the cached contexts and conversation history"""
+        # Update session context from LangGraph state
+        session_updates = {}
+        for key in ["knowledge_base_id", "article_id", "user_intent", "task_context"]:
+            if key in langgraph_state and langgraph_state[key] is not None:
+                session_updates[key] = langgraph_state[key]
+        
+        if session_updates:
+            self.update_session_context(agent, **session_updates)
+        
+        # Update agent context
+        agent_updates = {}
+        for key in ["current_agent", "recursions", "consecutive_tool_calls", "last_tool_result"]:
+            if key in langgraph_state:
+                agent_updates[key] = langgraph_state[key]
+        
+        # Handle processed workflow messages
+        if "processed_workflow_messages" in langgraph_state:
+            agent_updates["processed_workflow_messages"] = langgraph_state["processed_workflow_messages"]
+        
+        if agent_updates:
+            self.update_agent_context(agent, **agent_updates)
+        
+        # Handle new messages
+        if "messages" in langgraph_state:
+            self.add_conversation_messages([
+                {"role": msg.__class__.__name__, "content": msg.content}
+                for msg in langgraph_state["messages"]
+                if hasattr(msg, 'content') and hasattr(msg, '__class__')
+            ], agent)
     
     def to_langgraph_state(self) -> Dict[str, Any]:
         """Convert current state to LangGraph-compatible format"""
@@ -577,68 +805,85 @@ class PostgreSQLStateManager:
         
         return state
     
-    def _audit_change(self, change_type: str, change_path: str, old_value: Any, new_value: Any, 
-                     agent: Optional[str] = None, conn=None):
-        """Record state change in audit log"""
-        should_close = False
-        if conn is None:
-            conn = self._get_connection()
-            should_close = True
-        
+    def _audit_row(self, change_type: str, change_path: str, old_value: Any, new_value: Any,
+                   agent: Optional[str] = None) -> tuple:
+        return (
+            self.session_id,
+            change_type,
+            change_path,
+            Json(old_value) if old_value is not None else None,
+            Json(new_value) if new_value is not None else None,
+            agent
+        )
+    
+    def _commit_with_audit(self, conn, rows: List[tuple]):
+        """Commit conn's transaction together with its audit rows (async rows are queued once committed)"""
+        if rows and not self.audit_async:
+            with conn.cursor() as cursor:
+                _insert_audit_rows(cursor, rows)
+        conn.commit()
+        if rows and self.audit_async:
+            state_audit_writer.submit(rows)
+    
+    def _write_audit(self, rows: List[tuple]):
+        """Write audit rows outside any state transaction"""
+        if self.audit_async:
+            state_audit_writer.submit(rows)
+            return
         try:
-            cursor = conn.cursor()
-            
-            # Check if session exists before auditing
-            cursor.execute("SELECT 1 FROM session_states WHERE session_id = %s", (self.session_id,))
-            if cursor.fetchone():
-                cursor.execute("""
-                    INSERT INTO state_audit_log 
-                    (session_id, change_type, change_path, old_value, new_value, agent_name)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    self.session_id,
-                    change_type,
-                    change_path,
-                    Json(old_value) if old_value is not None else None,
-                    Json(new_value) if new_value is not None else None,
-                    agent
-                ))
-                
-                if should_close:
-                    conn.commit()
-            else:
-                # Session doesn't exist yet, skip audit (will be done after session creation)
-                pass
-                
+            with db_manager.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    _insert_audit_rows(cursor, rows)
+                conn.commit()
         except Exception as e:
             logger.error(f"Failed to audit change: {e}")
-        finally:
-            if should_close and conn:
-                conn.close()
+    
+    def _audit_change(self, change_type: str, change_path: str, old_value: Any, new_value: Any, 
+                     agent: Optional[str] = None, conn=None):
+        """Record state change in audit log (buffered until commit inside a state_transaction)"""
+        row = self._audit_row(change_type, change_path, old_value, new_value, agent)
+        buffered = getattr(self._tx_local, "audit_rows", None)
+        if buffered is not None:
+            buffered.append(row)
+        else:
+            self._write_audit([row])
     
     def clear_session(self):
         """Clear session state with audit trail"""
+        self.flush()
+        reset_session = SessionContext(session_id=self.session_id)
+        reset_agent = AgentContext()
         with self.state_transaction("System") as conn:
             cursor = conn.cursor()
             
             # Audit session deletion
             self._audit_change("DELETE", "session", {"session_id": self.session_id}, None, "System", conn)
             
-            # Delete conversation messages
+            # Delete conversation messages and the agent context lists
             cursor.execute("DELETE FROM conversation_messages WHERE session_id = %s", (self.session_id,))
+            for table, _ in AGENT_LIST_TABLES.values():
+                cursor.execute(f"DELETE FROM {table} WHERE session_id = %s", (self.session_id,))
             
             # Mark session as inactive rather than deleting (preserves audit trail)
             cursor.execute("""
                 UPDATE session_states 
                 SET is_active = FALSE, 
-                    session_context = '{}', 
+                    session_context = %s, 
+                    conversation_metadata = '{}',
+                    last_message_order = 0,
                     agent_context = %s
                 WHERE session_id = %s
-            """, (Json(asdict(AgentContext())), self.session_id))
+            """, (Json(asdict(reset_session)), Json(reset_agent.document()), self.session_id))
+        
+        # The cache matches the reset documents, so later jsonb_set updates start from a full context
+        with self._lock:
+            self._session_context = reset_session
+            self._agent_context = reset_agent
     
     def get_state_summary(self) -> Dict[str, Any]:
         """Get comprehensive state summary for debugging"""
         try:
+            self.flush()
             with self._get_connection() as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     # Get basic state info
@@ -685,6 +930,9 @@ class PostgreSQLStateManager:
     def get_audit_trail(self, limit: int = 20) -> List[Dict[str, Any]]:
         """Get recent state changes for debugging and monitoring"""
         try:
+            self.flush()
+            if self.audit_async:
+                state_audit_writer.flush()
             with self._get_connection() as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute("""
@@ -7,7 +7,8 @@ from .agent_types import AgentState, AgentMessage
 from tools.gitlab_tools import GitLabTools
 from tools.knowledge_base_tools import KnowledgeBaseTools
 from prompts.multi_agent_prompts import prompts
-from prompts.foundational_prompts import AgentSpecificFoundations
+from prompts.prompt_registry import prompt_registry
+from utils.llm_cache import get_llm_cache
 
 
 class SupervisorAgent(BaseAgent):
@@ -74,7 +75,7 @@ class SupervisorAgent(BaseAgent):
     
     def _create_supervisor_prompt(self) -> str:
         """Create the system prompt for the supervisor agent"""
-        foundational_prompt = AgentSpecificFoundations.supervision_foundation()
+        foundational_prompt = prompt_registry.get("supervision_foundation")
         
         specialized_supervision_prompt = """
 **SCRUM MASTER ROLE - GITLAB-CENTRIC FACILITATION:**
@@ -316,7 +317,8 @@ Provide your assessment:
         messages = self.get_messages_with_history(state)
         messages.append(HumanMessage(content=review_prompt))
         
-        response = self.llm.invoke(messages)
+        # Review scoring is a pure function of the conversation and work - serve repeats from cache
+        response = get_llm_cache().invoke(self.llm, messages, namespace="supervisor_review")
         review_result = response.content
         
         # Parse review decision (simple keyword detection)
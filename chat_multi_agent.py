@@ -13,6 +13,7 @@ from agents.user_proxy_agent import UserProxyAgent
 from agents.supervisor_agent import SupervisorAgent
 from agents.content_management_agent import ContentManagementAgent
 from agents.postgresql_state_manager import PostgreSQLStateManager
+from utils.session_registry import session_registry
 from agents.agent_types import AgentState, AgentMessage
 from config.model_config import ModelConfig
 
@@ -22,10 +23,9 @@ class SimplifiedMultiAgentChat:
     """Simplified multi-agent chat with direct UserProxy-Supervisor-ContentManagement communication."""
     
     def __init__(self):
-        # Generate session ID first
-        self.current_session_id = self._generate_session_id()
-        # Initialize state manager with session ID
-        self.state_manager = PostgreSQLStateManager(self.current_session_id)
+        # Attach to this front end's warm session (or a new one) through the session registry
+        self.state_manager = session_registry.attach_state_manager("chat")
+        self.current_session_id = self.state_manager.session_id
         # Initialize model configuration
         self.model_config = ModelConfig()
         self.user_proxy = None
@@ -34,11 +34,6 @@ class SimplifiedMultiAgentChat:
         self.conversation_history = []
         self.current_state = AgentState()
         
-    def _generate_session_id(self) -> str:
-        """Generate a unique session ID."""
-        import uuid
-        return str(uuid.uuid4())
-        
     def initialize_agents(self) -> None:
         """Initialize UserProxy, Supervisor, and ContentManagement agents with direct communication."""
         try:
@@ -345,6 +340,7 @@ def main():
             
             if user_input.lower() in ["/q", "/quit"]:
                 print("👋 Simplified multi-agent system shutting down. Goodbye!")
+                session_registry.release(chat_system.current_session_id)
                 break
                 
             elif user_input.lower() in ["/reset", "/r"]:
@@ -18,6 +18,7 @@ from langchain_openai import AzureChatOpenAI
 from IPython.display import Image, display
 
 from utils.langgraph_utils import save_graph
+from utils.llm_gateway import llm_gateway
 from dotenv import load_dotenv
 from prompts.knowledge_base_prompts import prompts
 from tools.knowledge_base_tools import KnowledgeBaseTools
@@ -155,12 +156,7 @@ DEVELOPMENT WORKFLOW SUPPORT:
 Always ask for clarification if you're unsure whether the user wants to work with knowledge bases, GitHub repositories, GitLab projects, or any combination of these capabilities.
 """
 
-llm = AzureChatOpenAI(
-    azure_endpoint=os.getenv('OPENAI_API_ENDPOINT'),
-    azure_deployment=os.getenv('OPENAI_API_MODEL_DEPLOYMENT_NAME'),
-    api_version=os.getenv('OPENAI_API_VERSION'),
-    streaming=True
-)
+llm = llm_gateway.get_llm("primary", streaming=True)
 
 kb_tools = KnowledgeBaseTools()
 github_tools = GithubTools()
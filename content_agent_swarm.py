@@ -4,6 +4,7 @@ import datetime
 import warnings
 import time
 import logging
+import threading
 import locale
 from typing import Dict, Any, List
 from dotenv import load_dotenv
@@ -136,6 +137,16 @@ from agents.supervisor_agent import SupervisorAgent
 
 # Import Unicode-safe printing
 from utils.unicode_safe_print import safe_print
+from utils.kb_summary_reporter import KnowledgeBaseSummaryReporter
+from utils.adaptive_poller import AdaptivePoller
+from utils.cycle_profiler import cycle_profiler
+from utils.graceful_shutdown import shutdown_coordinator
+from utils.content_pipeline import ContentPipeline
+from utils.llm_usage_ledger import usage_ledger
+from utils.state_retention import state_retention_manager
+from utils.session_registry import session_registry
+from prompts.prompt_registry import prompt_registry
+from utils.work_checkpoint_store import work_checkpoint_store, WorkCheckpointStore
 
 load_dotenv(override=True)
 
@@ -169,14 +180,35 @@ class AutonomousAgentSwarm:
     def __init__(self):
         logger.info("🚀 Initializing AutonomousAgentSwarm")
         try:
-            self.orchestrator = Orchestrator()
-            logger.info("✅ Orchestrator initialized successfully")
+            # Attach to the swarm's warm session (resumed after a restart) instead of building a new one
+            self.orchestrator = session_registry.attach_orchestrator("swarm", os.getenv('SWARM_SESSION_ID') or None)
+            logger.info(f"✅ Orchestrator attached to session {self.orchestrator.session_id[:8]}...")
         except Exception as e:
             logger.error(f"❌ Failed to initialize orchestrator: {e}")
             raise
             
         self.is_running = False
         self.cycle_count = 0
+        
+        # Per-cycle KB summary runs in the background and only when the KB changed or the cadence is due
+        self.summary_reporter = KnowledgeBaseSummaryReporter()
+        
+        # Adaptive polling: agent work discovery backs off while idle, KB project reconciliation
+        # runs on its own slower cadence; both are jittered per project to avoid lock-step GitLab load
+        jitter_key = os.getenv('DEFAULT_GITLAB_PROJECT_ID') or self._get_current_kb_id()
+        self.discovery_poller = AdaptivePoller.from_env(
+            "discovery", "SWARM_DISCOVERY", base_interval=30, max_interval=900, jitter_key=jitter_key
+        )
+        self.reconciliation_poller = AdaptivePoller.from_env(
+            "reconciliation", "SWARM_RECONCILE", base_interval=300, max_interval=1800, jitter_key=jitter_key
+        )
+        self._available_projects_cache = None
+        self._stop_event = threading.Event()
+        # A shutdown request (first Ctrl+C) wakes the idle wait immediately instead of after the backoff delay
+        shutdown_coordinator.on_shutdown(self._stop_event.set)
+        
+        # Planner → creator → reviewer stages with bounded queues (upstream throttles when downstream is full)
+        self.pipeline = ContentPipeline.from_env()
         logger.debug(f"Initial state: is_running={self.is_running}, cycle_count={self.cycle_count}")
         
     def initialize_agents(self):
@@ -188,7 +220,8 @@ class AutonomousAgentSwarm:
         # Display comprehensive knowledge base summary during initialization
         safe_print("📊 KNOWLEDGE BASE ANALYSIS - Current Context Overview")
         safe_print("-" * 60)
-        self.display_knowledge_base_summary()
+        self.summary_reporter.request_summary(self._get_current_kb_id(), self.cycle_count, force=True)
+        self.summary_reporter.wait()
         
         safe_print("")
         safe_print("🎯 Agent Initialization:")
@@ -219,19 +252,30 @@ class AutonomousAgentSwarm:
     def run_autonomous_cycle(self):
         """Run one cycle of autonomous agent work discovery and execution"""
         self.cycle_count += 1
+        with cycle_profiler.cycle(self.cycle_count):
+            work_found = self._run_autonomous_cycle()
+        if cycle_profiler.enabled:
+            safe_print(cycle_profiler.format_report())
+        return work_found
+    
+    def _run_autonomous_cycle(self):
+        """Cycle body: discover KB projects, then let each agent discover and execute work"""
         logger.info(f"🔄 Starting autonomous cycle #{self.cycle_count}")
         safe_print(f"🔄 Autonomous Cycle #{self.cycle_count} - {datetime.datetime.now().strftime('%H:%M:%S')}")
         safe_print("-" * 60)
         
-        # Display comprehensive knowledge base summary at the start of each cycle
-        safe_print("📊 Displaying Current KB Context Summary for This Cycle...")
-        self.display_knowledge_base_summary()
-        safe_print("")
+        # Refresh the knowledge base summary off the critical path (only when changed or on cadence)
+        if self.summary_reporter.request_summary(self._get_current_kb_id(), self.cycle_count):
+            logger.debug("KB summary check scheduled in background")
+        
+        # Monthly state partitions: create upcoming ones, archive and drop expired ones (in background, on its own cadence)
+        if state_retention_manager.run_if_due():
+            logger.debug("State retention run scheduled in background")
         safe_print("🔄 Continuing with Agent Work Discovery...")
         safe_print("-" * 60)
         
-        # Discover available KB projects ready for agent work
-        available_projects = self.discover_available_kb_projects()
+        # Discover available KB projects ready for agent work (reconciled on its own cadence)
+        available_projects = self._get_available_kb_projects()
         if available_projects:
             safe_print(f"🎯 Available KB Projects: {len(available_projects)}")
             for project in available_projects[:3]:  # Show first 3
@@ -241,6 +285,9 @@ class AutonomousAgentSwarm:
         else:
             safe_print("💤 No KB projects available for agent work")
         
+        # Fetch open issues for pipeline projects not seen recently; depths are recomputed before each throttle check
+        pipeline_project_ids = self._refresh_pipeline_metrics(available_projects)
+        
         # Each agent checks GitLab for their assigned work and executes autonomously
         agents_with_work = 0
         
@@ -281,6 +328,27 @@ class AutonomousAgentSwarm:
         logger.debug(f"Processing {len(agent_configs)} agent configurations")
         
         for agent_name, config in agent_configs.items():
+            # Cooperative cancellation: never start new agent work once shutdown has been requested
+            if shutdown_coordinator.is_shutdown_requested():
+                logger.info(f"🛑 Shutdown requested - skipping remaining agents from {agent_name}")
+                safe_print(f"  🛑 Shutdown requested - skipping remaining agents")
+                break
+            
+            # Backpressure: don't let an upstream stage produce work its downstream queue can't absorb.
+            # Depths include the issues earlier agents' discovery fetched this cycle (no API call).
+            if pipeline_project_ids:
+                self.pipeline.refresh_from_snapshots(pipeline_project_ids, record_history=False)
+            if self.pipeline.should_throttle(agent_name):
+                downstream = self.pipeline.stage_for(agent_name).downstream
+                safe_print(f"  ⏸️  {agent_name}: Throttled - {downstream.name} queue full "
+                           f"({downstream.queue_depth}/{downstream.max_queue_depth})")
+                continue
+            
+            # Token budget: with LLM_BUDGET_ACTION=throttle an agent over budget sits out until it recovers
+            if usage_ledger.should_throttle(agent_name, self.cycle_count):
+                safe_print(f"  ⏸️  {agent_name}: Throttled - {usage_ledger.over_budget(agent_name, self.cycle_count)}")
+                continue
+            
             logger.debug(f"Processing agent: {agent_name}")
             safe_print(f"  📋 {agent_name}: Scanning for appropriate work...")
             safe_print(f"      Focus: {config['focus']}")
@@ -367,50 +435,51 @@ class AutonomousAgentSwarm:
                 
                 # Call agent's work discovery directly instead of through LangGraph
                 try:
-                    if agent_name == "ContentManagementAgent":
-                        work_result = self._call_content_management_work_discovery()
-                    elif agent_name == "ContentPlannerAgent":
-                        work_result = self._call_content_planner_work_discovery()  
-                    elif agent_name == "ContentCreatorAgent":
-                        work_result = self._call_content_creator_work_discovery()
-                    elif agent_name == "ContentReviewerAgent":
-                        work_result = self._call_content_reviewer_work_discovery()
-                    elif agent_name == "ContentRetrievalAgent":
-                        work_result = self._call_content_retrieval_work_discovery()
-                    elif agent_name == "SupervisorAgent":
-                        work_result = self._call_supervisor_work_discovery()
-                    else:
-                        work_result = {"found_work": False, "message": f"Unknown agent: {agent_name}"}
+                    with cycle_profiler.agent(agent_name), usage_ledger.scope(agent=agent_name, cycle=self.cycle_count):
+                        if agent_name == "ContentManagementAgent":
+                            work_result = self._call_content_management_work_discovery()
+                        elif agent_name == "ContentPlannerAgent":
+                            work_result = self._call_content_planner_work_discovery()  
+                        elif agent_name == "ContentCreatorAgent":
+                            work_result = self._call_content_creator_work_discovery()
+                        elif agent_name == "ContentReviewerAgent":
+                            work_result = self._call_content_reviewer_work_discovery()
+                        elif agent_name == "ContentRetrievalAgent":
+                            work_result = self._call_content_retrieval_work_discovery()
+                        elif agent_name == "SupervisorAgent":
+                            work_result = self._call_supervisor_work_discovery()
+                        else:
+                            work_result = {"found_work": False, "message": f"Unknown agent: {agent_name}"}
                     
-                    logger.debug(f"Work discovery result from {agent_name}: {work_result}")
+                        logger.debug(f"Work discovery result from {agent_name}: {work_result}")
                     
-                    # Debug: Check the exact value
-                    found_work_value = work_result.get("found_work", False)
-                    logger.debug(f"DEBUG: found_work value for {agent_name}: {found_work_value} (type: {type(found_work_value)})")
+                        # Debug: Check the exact value
+                        found_work_value = work_result.get("found_work", False)
+                        logger.debug(f"DEBUG: found_work value for {agent_name}: {found_work_value} (type: {type(found_work_value)})")
                     
-                    if found_work_value:
-                        agents_with_work += 1
-                        logger.info(f"✅ {agent_name} found and selected appropriate work")
-                        safe_print(f"    ✅ Found and selected appropriate work")
-                        safe_print(f"    📝 {work_result.get('message', 'Working on GitLab issue')}")
+                        if found_work_value:
+                            agents_with_work += 1
+                            logger.info(f"✅ {agent_name} found and selected appropriate work")
+                            safe_print(f"    ✅ Found and selected appropriate work")
+                            safe_print(f"    📝 {work_result.get('message', 'Working on GitLab issue')}")
                         
-                        # Execute the work that was found
-                        try:
-                            safe_print(f"    🚀 Executing work...")
-                            logger.debug(f"DEBUG: About to execute work for {agent_name}")
-                            execution_result = self._execute_agent_work(agent_name, work_result)
-                            logger.debug(f"DEBUG: Execution result for {agent_name}: {execution_result}")
-                            if execution_result.get("success", False):
-                                safe_print(f"    ✅ Work completed: {execution_result.get('summary', 'Content created successfully')}")
-                            else:
-                                safe_print(f"    ⚠️  Work execution had issues: {execution_result.get('error', 'Unknown error')}")
-                        except Exception as exec_error:
-                            logger.error(f"❌ Work execution error for {agent_name}: {str(exec_error)}", exc_info=True)
-                            safe_print(f"    ❌ Execution failed: {str(exec_error)[:50]}...")
+                            # Execute the work that was found
+                            try:
+                                safe_print(f"    🚀 Executing work...")
+                                logger.debug(f"DEBUG: About to execute work for {agent_name}")
+                                execution_result = self._execute_agent_work(agent_name, work_result)
+                                logger.debug(f"DEBUG: Execution result for {agent_name}: {execution_result}")
+                                if execution_result.get("success", False):
+                                    safe_print(f"    ✅ Work completed: {execution_result.get('summary', 'Content created successfully')}")
+                                else:
+                                    safe_print(f"    ⚠️  Work execution had issues: {execution_result.get('error', 'Unknown error')}")
+                            except Exception as exec_error:
+                                logger.error(f"❌ Work execution error for {agent_name}: {str(exec_error)}", exc_info=True)
+                                safe_print(f"    ❌ Execution failed: {str(exec_error)[:50]}...")
                             
-                    else:
-                        logger.debug(f"💤 {agent_name} found no appropriate work items")
-                        safe_print(f"    💤 No appropriate work items available - waiting for suitable work to be created")
+                        else:
+                            logger.debug(f"💤 {agent_name} found no appropriate work items")
+                            safe_print(f"    💤 No appropriate work items available - waiting for suitable work to be created")
                         
                 except Exception as work_error:
                     logger.error(f"❌ Work discovery error for {agent_name}: {str(work_error)}")
@@ -423,10 +492,39 @@ class AutonomousAgentSwarm:
                 
         logger.info(f"📊 Cycle #{self.cycle_count} completed: {agents_with_work}/{len(agent_configs)} agents found work")
         safe_print(f"📊 Cycle Summary: {agents_with_work}/{len(agent_configs)} agents found work")
+        safe_print("📦 Pipeline Queues:")
+        safe_print(self.pipeline.format_metrics())
+        safe_print(f"🧾 LLM tokens this cycle: {usage_ledger.cycle_tokens(self.cycle_count)}")
         safe_print("-" * 60)
+        usage_ledger.flush()
         
         return agents_with_work > 0
     
+    def _refresh_pipeline_metrics(self, available_projects: List[Dict[str, Any]]) -> List[str]:
+        """Update pipeline queue depths from the open issues of the KB-linked GitLab projects.
+
+        Work discovery already fetches each project's open issues and records them on the pipeline,
+        so only projects not seen within the reconciliation interval are fetched here. Returns the
+        project ids the pipeline covers.
+        """
+        project_ids = [project["gitlab_project_id"] for project in available_projects or [] if project.get("gitlab_project_id")]
+        if not project_ids:
+            return project_ids
+        try:
+            stale_ids = self.pipeline.stale_projects(project_ids, max_age=self.reconciliation_poller.base_interval)
+            if stale_ids:
+                from operations.gitlab_operations import GitLabOperations
+                gitlab_ops = GitLabOperations()
+                for project_id in stale_ids:
+                    self.pipeline.observe_issues(project_id, gitlab_ops.get_project_issues(project_id, state="opened"))
+            
+            self.pipeline.refresh_from_snapshots(project_ids)
+            logger.debug(f"Pipeline metrics ({len(stale_ids)}/{len(project_ids)} projects fetched): {self.pipeline.get_metrics()}")
+        except Exception as e:
+            # Keep the previous snapshots; backpressure decisions fall back to them
+            logger.warning(f"⚠️ Could not refresh pipeline queue depths: {e}")
+        return project_ids
+    
     def _call_content_management_work_discovery(self) -> Dict[str, Any]:
         """Direct work discovery for ContentManagementAgent using KB analysis"""
         try:
@@ -512,7 +610,8 @@ class AutonomousAgentSwarm:
         """Direct work discovery for ContentCreatorAgent - GitLab issues first, then content gaps"""
         try:
             # First check GitLab for existing issues this agent can work on
-            work_result = self._discover_agent_work("content-creator-agent", ["content-creation", "content-generation", "development", "writing", "create"])
+            work_result = self._discover_agent_work("content-creator-agent", ["content-creation", "content-generation", "development", "writing", "create"],
+                                                    checkpoint_agent="ContentCreatorAgent")
             if work_result.get("found_work", False):
                 return work_result
             
@@ -570,13 +669,19 @@ class AutonomousAgentSwarm:
         except Exception as e:
             return {"found_work": False, "message": f"Error: {str(e)}"}
     
-    def _discover_agent_work(self, agent_username: str, relevant_labels: List[str]) -> Dict[str, Any]:
-        """Generic work discovery method for any agent using GitLab"""
+    def _discover_agent_work(self, agent_username: str, relevant_labels: List[str], checkpoint_agent: str = None) -> Dict[str, Any]:
+        """Generic work discovery method for any agent using GitLab.
+
+        When checkpoint_agent is given, issues with an unfinished checkpoint for that agent are
+        eligible even while labelled in-progress, so interrupted work is resumed rather than orphaned.
+        """
         try:
             # Get GitLab operations instance
             from operations.gitlab_operations import GitLabOperations
             gitlab_ops = GitLabOperations()
             
+            resumable_keys = set(work_checkpoint_store.get_resumable_work_keys(checkpoint_agent)) if checkpoint_agent else set()
+            
             # Get all projects to search for work
             projects = gitlab_ops.get_projects_list()
             
@@ -585,8 +690,9 @@ class AutonomousAgentSwarm:
                 if not project_id:
                     continue
                 
-                # Get open issues for this project
+                # Get open issues for this project (the pipeline reuses them for its queue depths)
                 issues = gitlab_ops.get_project_issues(project_id, state="opened")
+                self.pipeline.observe_issues(project_id, issues)
                 
                 # Look for issues that this agent can handle (autonomous work discovery)
                 for issue in issues:
@@ -608,14 +714,18 @@ class AutonomousAgentSwarm:
                     # Agent can take this work if:
                     # 1. Assigned to them, OR
                     # 2. Has relevant labels AND (unassigned OR not in progress)
+                    # 3. Interrupted mid-work by this agent and resumable from a checkpoint
+                    is_resumable = WorkCheckpointStore.gitlab_issue_key(project_id, issue.get("iid")) in resumable_keys
+                    
                     can_take_work = (agent_assigned and has_relevant_label) or \
-                                   (has_relevant_label and (is_unassigned or not_in_progress))
+                                   (has_relevant_label and (is_unassigned or not_in_progress)) or \
+                                   is_resumable
                     
                     if can_take_work:
                         return {
                             "found_work": True,
                             "work_type": "gitlab_issue",  # Add work_type for proper routing
-                            "message": f"Found work: {issue.get('title')} (#{issue.get('iid')})",
+                            "message": f"{'Resuming' if is_resumable else 'Found'} work: {issue.get('title')} (#{issue.get('iid')})",
                             "work_item": {
                                 "id": issue.get("id"),
                                 "iid": issue.get("iid"),
@@ -923,9 +1033,15 @@ class AutonomousAgentSwarm:
         # For now, just report that work items were created
         return {"success": True, "summary": "Research work items created"}
 
-    def run_continuous_autonomous_mode(self, cycle_interval=30):
-        """Run agents in continuous autonomous mode"""
-        logger.info(f"🚀 Starting continuous autonomous mode with {cycle_interval}s interval")
+    def run_continuous_autonomous_mode(self, cycle_interval=None):
+        """Run agents in continuous autonomous mode with adaptive, jittered polling"""
+        if cycle_interval is not None:
+            self.discovery_poller.base_interval = float(cycle_interval)
+            self.discovery_poller.max_interval = max(self.discovery_poller.max_interval, float(cycle_interval))
+        poller = self.discovery_poller
+        
+        logger.info(f"🚀 Starting continuous autonomous mode with adaptive polling "
+                    f"({poller.base_interval:.0f}s → {poller.max_interval:.0f}s)")
         safe_print("🚀 Starting Continuous Autonomous Agent Mode")
         safe_print("=" * 80)
         safe_print("🎯 Autonomous Operation:")
@@ -935,47 +1051,44 @@ class AutonomousAgentSwarm:
         safe_print("   • Supervisor coordinates and manages quality gates")
         safe_print("   • All collaboration happens through GitLab workflows")
         safe_print("   • PostgreSQL maintains full audit trail")
-        safe_print(f"   • Cycle interval: {cycle_interval} seconds")
+        safe_print(f"   • Work discovery: every {poller.base_interval:.0f}s while busy, backing off to {poller.max_interval:.0f}s when idle")
+        safe_print(f"   • KB project reconciliation: every {self.reconciliation_poller.base_interval:.0f}s-{self.reconciliation_poller.max_interval:.0f}s")
         safe_print("=" * 80)
         
         self.is_running = True
-        consecutive_idle_cycles = 0
-        max_idle_cycles = 5  # Increase interval after 5 idle cycles
-        
-        logger.info(f"Autonomous mode starting: max_idle_cycles={max_idle_cycles}")
+        self._stop_event.clear()
+        shutdown_coordinator.reset()
+        shutdown_coordinator.install_signal_handlers()
+        poller.reset()
         
         try:
-            while self.is_running:
-                logger.debug(f"Starting cycle {self.cycle_count + 1}, consecutive_idle={consecutive_idle_cycles}")
+            while self.is_running and not shutdown_coordinator.is_shutdown_requested():
+                logger.debug(f"Starting cycle {self.cycle_count + 1}, consecutive_idle={poller.consecutive_idle_polls}")
                 work_found = self.run_autonomous_cycle()
+                next_delay = poller.record_poll(found_work=work_found)
                 
                 if work_found:
-                    consecutive_idle_cycles = 0  # Reset idle counter
-                    logger.info(f"🎯 Work found in cycle {self.cycle_count}, resetting idle counter")
-                    print(f"🎯 Work in progress - checking again in {cycle_interval} seconds...")
+                    logger.info(f"🎯 Work found in cycle {self.cycle_count}, polling reset to base interval")
+                    print(f"🎯 Work in progress - checking again in {next_delay:.0f} seconds...")
                 else:
-                    consecutive_idle_cycles += 1
-                    logger.debug(f"No work found, consecutive_idle_cycles now: {consecutive_idle_cycles}")
-                    
-                    if consecutive_idle_cycles >= max_idle_cycles:
-                        # Increase interval for idle periods to reduce resource usage
-                        extended_interval = cycle_interval * 3
-                        logger.info(f"💤 Extended idle period activated: {extended_interval}s interval after {consecutive_idle_cycles} idle cycles")
-                        print(f"💤 Extended idle period - checking again in {extended_interval} seconds...")
+                    logger.debug(f"💤 Idle cycle {poller.consecutive_idle_polls}, backing off to {next_delay:.0f}s")
+                    print(f"💤 No active work - checking again in {next_delay:.0f} seconds...")
+                    if poller.current_interval >= poller.max_interval:
                         print("   💡 Tip: Create GitLab issues for agents to discover and execute")
-                        time.sleep(extended_interval)
-                        consecutive_idle_cycles = 0  # Reset after extended wait
-                        continue
-                    else:
-                        logger.debug(f"💤 Regular idle cycle {consecutive_idle_cycles}/{max_idle_cycles}")
-                        print(f"💤 No active work - checking again in {cycle_interval} seconds...")
                 
-                # Wait for next cycle
-                logger.debug(f"Sleeping for {cycle_interval} seconds before next cycle")
-                time.sleep(cycle_interval)
+                # Wait for next cycle; stop() or a shutdown request wakes the loop immediately
+                if self._stop_event.wait(next_delay) or shutdown_coordinator.is_shutdown_requested():
+                    break
+            
+            if shutdown_coordinator.is_shutdown_requested():
+                logger.info(f"🛑 Autonomous mode drained after shutdown request ({shutdown_coordinator.reason})")
+                print("\n🛑 In-flight work drained - autonomous mode stopped")
+                self.stop()
                 
         except KeyboardInterrupt:
-            logger.info("🛑 Autonomous mode interrupted by user (KeyboardInterrupt)")
+            # Drain timeout expired or a second Ctrl+C: keep interrupted work resumable
+            interrupted = work_checkpoint_store.interrupt_all_in_progress("KeyboardInterrupt")
+            logger.info(f"🛑 Autonomous mode interrupted by user (KeyboardInterrupt), {interrupted} work item(s) checkpointed for resume")
             print("\n🛑 Autonomous mode interrupted by user")
             self.stop()
         except Exception as e:
@@ -983,6 +1096,9 @@ class AutonomousAgentSwarm:
             print(f"\n❌ Unexpected error: {e}")
             self.stop()
             raise
+        finally:
+            shutdown_coordinator.mark_drained()
+            shutdown_coordinator.restore_signal_handlers()
             
     def run_single_cycle(self):
         """Run a single autonomous cycle"""
@@ -1002,11 +1118,19 @@ class AutonomousAgentSwarm:
         return work_found
         
     def stop(self):
-        """Stop autonomous mode"""
+        """Stop autonomous mode; the swarm stays attached to its session for the next start/cycle"""
         logger.info("🛑 Stopping autonomous agent swarm")
         self.is_running = False
+        self._stop_event.set()
+        self.summary_reporter.wait(timeout=5)
+        usage_ledger.flush()
         print("🛑 Autonomous Agent Swarm stopped")
         
+    def close(self):
+        """Stop and detach from the session (on quit), handing its lease over to other processes"""
+        self.stop()
+        session_registry.release(self.orchestrator.session_id)
+        
     def get_status(self):
         """Get current swarm status"""
         logger.debug("Getting swarm status")
@@ -1021,7 +1145,9 @@ class AutonomousAgentSwarm:
         status = {
             "is_running": self.is_running,
             "cycle_count": self.cycle_count,
-            "session_active": session_summary.get('is_active', False) if session_summary else False
+            "session_active": session_summary.get('is_active', False) if session_summary else False,
+            "pipeline": self.pipeline.get_metrics(),
+            "llm_usage": usage_ledger.get_totals()
         }
         
         logger.debug(f"Status: {status}")
@@ -1091,6 +1217,24 @@ class AutonomousAgentSwarm:
             logger.error(f"❌ Error discovering KB projects: {e}")
             return []
 
+    def _get_available_kb_projects(self):
+        """Return available KB projects, re-running discovery only when the reconciliation cadence is due"""
+        if self._available_projects_cache is not None and not self.reconciliation_poller.is_due():
+            logger.debug(f"Using cached KB project list (reconciliation in {self.reconciliation_poller.seconds_until_due():.0f}s)")
+            return self._available_projects_cache
+        
+        previous_ids = None
+        if self._available_projects_cache is not None:
+            previous_ids = sorted(p['gitlab_project_id'] for p in self._available_projects_cache)
+        
+        available_projects = self.discover_available_kb_projects()
+        changed = previous_ids != sorted(p['gitlab_project_id'] for p in available_projects)
+        self._available_projects_cache = available_projects
+        
+        delay = self.reconciliation_poller.record_poll(found_work=changed)
+        logger.debug(f"KB project reconciliation {'found changes' if changed else 'unchanged'} - next in {delay:.0f}s")
+        return available_projects
+
     def _format_available_projects(self, projects):
         """Format available projects for agent consumption"""
         if not projects:
@@ -1102,201 +1246,20 @@ class AutonomousAgentSwarm:
         
         return "\n".join(formatted)
 
-    def display_knowledge_base_summary(self):
+    def _get_current_kb_id(self) -> str:
+        """Get the knowledge base ID in context, falling back to DEFAULT_KNOWLEDGE_BASE_ID"""
+        current_kb_id = getattr(self.orchestrator, 'knowledge_base_id', None)
+        if not current_kb_id:
+            current_kb_id = os.getenv('DEFAULT_KNOWLEDGE_BASE_ID', '1')
+        return str(current_kb_id)
+
+    def display_knowledge_base_summary(self, current_kb_id: str = None):
         """Display a comprehensive summary of the current knowledge base in context"""
         try:
             logger.info("📊 Generating knowledge base summary for current context")
-            safe_print("📊 KNOWLEDGE BASE ANALYSIS SUMMARY")
-            safe_print("=" * 80)
-            
-            # Get the current knowledge base ID from context
-            current_kb_id = getattr(self.orchestrator, 'knowledge_base_id', None)
             if not current_kb_id:
-                # Fallback: Try to get the default KB ID from environment or use 1
-                import os
-                current_kb_id = os.getenv('DEFAULT_KNOWLEDGE_BASE_ID', '1')
-                safe_print(f"⚠️ Using fallback KB ID: {current_kb_id}")
-            
-            safe_print(f"🎯 CURRENT KNOWLEDGE BASE CONTEXT: ID {current_kb_id}")
-            safe_print("")
-            
-            # Get knowledge base operations
-            from operations.knowledge_base_operations import KnowledgeBaseOperations
-            kb_ops = KnowledgeBaseOperations()
-            
-            # Get the specific knowledge base details
-            try:
-                all_kbs = kb_ops.get_all_knowledge_bases()
-                current_kb = None
-                for kb in all_kbs:
-                    if str(kb.id) == str(current_kb_id):
-                        current_kb = kb
-                        break
-                
-                if not current_kb:
-                    safe_print(f"❌ Knowledge base with ID {current_kb_id} not found")
-                    return
-                
-                # Display current KB details
-                safe_print(f"📚 KNOWLEDGE BASE: {current_kb.name}")
-                safe_print(f"   ID: {current_kb.id}")
-                safe_print(f"   Description: {current_kb.description[:100]}{'...' if len(current_kb.description) > 100 else ''}")
-                safe_print(f"   Status: {getattr(current_kb, 'status', 'unknown')}")
-                safe_print(f"   GitLab Project: {getattr(current_kb, 'gitlab_project_id', 'Not linked')}")
-                safe_print("-" * 60)
-                
-                # Get articles summary for current KB
-                all_articles = kb_ops.get_articles_by_knowledge_base_id(str(current_kb.id))
-                root_articles = kb_ops.get_root_level_articles(str(current_kb.id))
-                
-                # Calculate article hierarchy
-                total_articles = len(all_articles)
-                root_count = len(root_articles)
-                child_articles = [article for article in all_articles if article.get('parent_id') is not None]
-                child_count = len(child_articles)
-                
-                safe_print(f"📄 ARTICLE SUMMARY:")
-                safe_print(f"   • Total Articles: {total_articles}")
-                safe_print(f"   • Root Articles: {root_count}")
-                safe_print(f"   • Sub/Child Articles: {child_count}")
-                
-                # Display root articles if any exist
-                if root_articles:
-                    safe_print(f"   📋 Root Articles:")
-                    for j, root_article in enumerate(root_articles, 1):  # Show ALL articles
-                        title = root_article[2] if len(root_article) > 2 else "Untitled"  # Assuming title is at index 2
-                        safe_print(f"      {j}. {title[:50]}{'...' if len(title) > 50 else ''}")
-                else:
-                    safe_print(f"   📋 No root articles found")
-                
-                # Get and display tags with usage count for current KB
-                tags_with_usage = kb_ops.get_tags_with_usage_count(str(current_kb.id))
-                
-                safe_print(f"🏷️ TAG SUMMARY:")
-                safe_print(f"   • Total Tags: {len(tags_with_usage)}")
-                
-                if tags_with_usage:
-                    # Show top 10 most used tags
-                    safe_print(f"   📈 Most Used Tags:")
-                    for j, tag in enumerate(tags_with_usage[:10], 1):
-                        safe_print(f"      {j}. {tag.name} (used {tag.usage_count} times)")
-                    
-                    if len(tags_with_usage) > 10:
-                        safe_print(f"      ... and {len(tags_with_usage) - 10} more tags")
-                    
-                    # Calculate tag usage statistics
-                    total_tag_usage = sum(tag.usage_count for tag in tags_with_usage)
-                    unused_tags = len([tag for tag in tags_with_usage if tag.usage_count == 0])
-                    
-                    safe_print(f"   📊 Tag Statistics:")
-                    safe_print(f"      • Total Tag Applications: {total_tag_usage}")
-                    safe_print(f"      • Average Tags per Article: {total_tag_usage / max(total_articles, 1):.1f}")
-                    safe_print(f"      • Unused Tags: {unused_tags}")
-                else:
-                    safe_print(f"   📊 No tags found for this knowledge base")
-                
-                # Show article hierarchy structure if available
-                try:
-                    hierarchy = kb_ops.get_article_hierarchy(str(current_kb.id))
-                    if hierarchy:
-                        safe_print(f"🌳 ARTICLE HIERARCHY STRUCTURE:")
-                        # Group by hierarchy level for better visualization
-                        levels = {}
-                        for article in hierarchy:
-                            level = article.get('level', 0)
-                            if level not in levels:
-                                levels[level] = []
-                            levels[level].append(article)
-                        
-                        for level in sorted(levels.keys())[:3]:  # Show first 3 levels
-                            articles_at_level = levels[level]
-                            safe_print(f"      Level {level}: {len(articles_at_level)} articles")
-                            
-                            # Show first few articles at each level
-                            for article in articles_at_level[:3]:
-                                title = article.get('title', 'Untitled')
-                                indent = "  " * (level + 1)
-                                safe_print(f"      {indent}• {title[:40]}{'...' if len(title) > 40 else ''}")
-                            
-                            if len(articles_at_level) > 3:
-                                safe_print(f"      {indent}... and {len(articles_at_level) - 3} more")
-                    else:
-                        safe_print(f"   🌳 No article hierarchy found")
-                except Exception as hierarchy_error:
-                    safe_print(f"   ⚠️ Could not load article hierarchy: {hierarchy_error}")
-                
-                # GitLab Project Summary
-                safe_print(f"🔗 GITLAB PROJECT SUMMARY:")
-                gitlab_project_id = getattr(current_kb, 'gitlab_project_id', None)
-                if gitlab_project_id:
-                    try:
-                        from operations.gitlab_operations import GitLabOperations
-                        gitlab_ops = GitLabOperations()
-                        project_details = gitlab_ops.get_project_details(str(gitlab_project_id))
-                        
-                        if project_details:
-                            safe_print(f"   • Project ID: {gitlab_project_id}")
-                            safe_print(f"   • Project Name: {project_details.get('name', 'Unknown')}")
-                            safe_print(f"   • Project URL: {project_details.get('web_url', 'Not available')}")
-                            safe_print(f"   • Created: {project_details.get('created_at', 'Unknown')}")
-                            safe_print(f"   • Last Activity: {project_details.get('last_activity_at', 'Unknown')}")
-                            safe_print(f"   • Visibility: {project_details.get('visibility', 'Unknown')}")
-                            safe_print(f"   • Default Branch: {project_details.get('default_branch', 'Unknown')}")
-                            
-                            # Get additional project statistics if available
-                            if 'statistics' in project_details:
-                                stats = project_details['statistics']
-                                safe_print(f"   • Repository Size: {stats.get('repository_size', 0)} bytes")
-                                safe_print(f"   • Commit Count: {stats.get('commit_count', 0)}")
-                            
-                            # Check for open issues/merge requests
-                            open_issues = project_details.get('open_issues_count', 0)
-                            
-                            # If open_issues_count is not available or is 0, try to get actual count
-                            if open_issues == 0:
-                                try:
-                                    # Get actual issues to provide accurate count
-                                    issues = self.gitlab_operations.get_project_issues(str(gitlab_project_id), state="opened")
-                                    if issues:
-                                        open_issues = len(issues)
-                                except Exception as issue_count_error:
-                                    logger.debug(f"Could not get accurate issue count: {issue_count_error}")
-                            
-                            safe_print(f"   • Open Issues: {open_issues}")
-                            
-                            # Project status
-                            if project_details.get('archived', False):
-                                safe_print(f"   ⚠️ Status: Archived")
-                            else:
-                                safe_print(f"   ✅ Status: Active")
-                                
-                        else:
-                            safe_print(f"   ❌ GitLab project {gitlab_project_id} not accessible or not found")
-                            
-                    except Exception as gitlab_error:
-                        safe_print(f"   ❌ Error accessing GitLab project {gitlab_project_id}: {gitlab_error}")
-                        logger.error(f"GitLab project access error: {gitlab_error}")
-                else:
-                    safe_print(f"   📋 No GitLab project linked to this knowledge base")
-                    safe_print(f"   💡 Link a GitLab project to enable agent collaboration features")
-                
-                # Summary statistics for current KB
-                safe_print("")
-                safe_print("🌟 KNOWLEDGE BASE DATABASE SUMMARY")
-                safe_print("-" * 40)
-                safe_print(f"📚 Knowledge Base: {current_kb.name}")
-                safe_print(f"📄 Total Articles: {total_articles}")
-                safe_print(f"🏷️ Total Tags: {len(tags_with_usage)}")
-                if total_articles > 0:
-                    safe_print(f"📊 Content Depth: {child_count}/{total_articles} articles have sub-content ({(child_count/total_articles)*100:.1f}%)")
-                safe_print("-" * 40)
-                
-            except Exception as kb_error:
-                safe_print(f"   ❌ Error analyzing current KB: {kb_error}")
-                logger.error(f"Error analyzing current KB {current_kb_id}: {kb_error}")
-            
-            logger.info("✅ Knowledge base summary completed successfully")
-            
+                current_kb_id = self._get_current_kb_id()
+            self.summary_reporter.render(current_kb_id)
         except Exception as e:
             logger.error(f"❌ Error generating knowledge base summary: {e}")
             safe_print(f"❌ Error generating knowledge base summary: {e}")
@@ -1330,6 +1293,7 @@ def main():
     safe_print("   • Type 'start' to begin continuous autonomous mode")
     safe_print("   • Type 'cycle' to run a single autonomous cycle")
     safe_print("   • Type 'status' to show swarm status")
+    safe_print("   • Type 'profile' to show cycle timing report (SWARM_PROFILE=true)")
     safe_print("   • Type 'stop' to stop autonomous mode")
     safe_print("   • Type '/q' or '/quit' to exit")
     safe_print("=" * 80)
@@ -1343,14 +1307,15 @@ def main():
             if user_input in ["/q", "/quit", "quit", "exit"]:
                 logger.info("👋 User initiated shutdown")
                 safe_print("👋 Autonomous Agent Swarm shutting down. Goodbye!")
-                swarm.stop()
+                swarm.close()
+                cycle_profiler.close()
                 break
                 
             elif user_input == "start":
                 logger.info("🚀 User requested start of continuous autonomous mode")
                 safe_print("🚀 Starting continuous autonomous mode...")
                 safe_print("   Press Ctrl+C to stop autonomous mode")
-                swarm.run_continuous_autonomous_mode(cycle_interval=30)
+                swarm.run_continuous_autonomous_mode()
                 
             elif user_input == "cycle":
                 logger.info("🔄 User requested single cycle execution")
@@ -1369,8 +1334,24 @@ def main():
                 safe_print(f"   • Running: {status['is_running']}")
                 safe_print(f"   • Cycles Completed: {status['cycle_count']}")
                 safe_print(f"   • Session Active: {status['session_active']}")
+                safe_print("📦 Pipeline Queues:")
+                safe_print(swarm.pipeline.format_metrics())
                 logger.info(f"Status displayed to user: {status}")
                 
+            elif user_input == "profile":
+                logger.debug("📈 User requested profiling report")
+                safe_print(cycle_profiler.format_report())
+                safe_print("🧾 Prompt tokens per call (static prefix / dynamic):")
+                for owner, stats in prompt_registry.get_stats().items():
+                    safe_print(f"   • {owner}: {stats['calls']} calls, {stats['avg_static_tokens']} / "
+                               f"{stats['avg_dynamic_tokens']} tokens ({stats['static_share']:.0%} static)")
+                safe_print("💰 LLM usage per agent (this process):")
+                safe_print(usage_ledger.format_totals())
+                safe_print("💰 LLM usage per knowledge base (last 24h):")
+                for row in usage_ledger.get_rollup("kb", hours=24):
+                    safe_print(f"   • KB {row['key']}: {row['calls']} calls ({row['cache_hits']} cached), "
+                               f"{row['prompt_tokens']} prompt + {row['completion_tokens']} completion tokens")
+                
             elif user_input == "stop":
                 logger.info("🛑 User requested stop")
                 swarm.stop()
@@ -1382,6 +1363,7 @@ def main():
                 safe_print("   • start - Begin continuous autonomous mode")
                 safe_print("   • cycle - Run single autonomous cycle") 
                 safe_print("   • status - Show swarm status")
+                safe_print("   • profile - Show cycle timing report")
                 safe_print("   • stop - Stop autonomous mode")
                 safe_print("   • quit - Exit program")
 
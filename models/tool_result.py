@@ -0,0 +1,44 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel as PydanticBaseModel, Field
+
+
+class ToolResult():
+
+    CREATED = "created"
+    UPDATED = "updated"
+    LINKED = "linked"
+    FAILED = "failed"
+
+    class WriteModel(PydanticBaseModel):
+        """Typed outcome of a write tool (insert / update / link), consumed directly by agents"""
+        tool_name: str = Field(..., description="Name of the tool that produced the result")
+        entity_type: str = Field(..., description="Kind of record written: article, tag or article_tag")
+        status: str = Field(..., description="created, updated, linked or failed")
+        id: Optional[int] = Field(None, description="ID of the written record, if any")
+        knowledge_base_id: Optional[int] = Field(None, description="ID of the knowledge base")
+        title: Optional[str] = Field(None, description="Article title or tag name")
+        parent_id: Optional[int] = Field(None, description="Parent article ID for articles")
+        duration_ms: float = Field(0.0, description="Time spent executing the tool")
+        error: Optional[str] = Field(None, description="Error message when status is failed")
+        details: Dict[str, Any] = Field(default_factory=dict, description="Extra tool-specific fields")
+
+        @property
+        def success(self) -> bool:
+            return self.status != ToolResult.FAILED
+
+        def __str__(self) -> str:
+            # Short summary for the LLM (tool message content) instead of the full record
+            if not self.success:
+                return f"{self.tool_name} failed: {self.error}"
+            label = f"{self.entity_type} {self.id}" if self.id is not None else self.entity_type
+            title = f" '{self.title}'" if self.title else ""
+            parent = f" under parent {self.parent_id}" if self.parent_id is not None else ""
+            return f"{label}{title} {self.status}{parent}"
+
+    # Init above models and make available
+    def __init__(self) -> None:
+        self.models = [self.WriteModel]
+
+    # Method to get models (for ease of use, made so class works similarly to LangChain toolkits)
+    def models(self) -> List[PydanticBaseModel]:
+        return self.models
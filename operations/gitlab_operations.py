@@ -3,9 +3,11 @@ import time
 import signal
 import gitlab
 from typing import List, Optional, Dict, Any
+from utils.cycle_profiler import profile_methods
 
 # Don't load dotenv at module level - let the caller handle it
 
+@profile_methods("gitlab")
 class GitLabOperations:
     """GitLab operations using the official python-gitlab library."""
     
@@ -8,6 +8,7 @@ from models.knowledge_base import KnowledgeBase
 from models.tags import Tags
 from utils.db_change_logger import DatabaseChangeLogger
 from utils.database_manager import db_manager, database_transaction, robust_database_connection
+from utils.cycle_profiler import profile_methods
 
 load_dotenv(override=True)
 
@@ -18,6 +19,7 @@ POSTGRES_DB = os.getenv('POSTGRES_DB')
 POSTGRES_USER = os.getenv('POSTGRES_USER')
 POSTGRES_PASSWORD = os.getenv('POSTGRES_PASSWORD')
 
+@profile_methods("db")
 class KnowledgeBaseOperations:
     def _get_connection(self):
         """Legacy connection method - prefer using db_manager.get_connection()"""
@@ -299,7 +301,8 @@ class KnowledgeBaseOperations:
                             article_id=str(article.id),
                             title=article.title,
                             content=article.content,
-                            parent_id=str(article.parent_id) if article.parent_id else None
+                            parent_id=str(article.parent_id) if article.parent_id else None,
+                            kb_id=str(knowledge_base_id)
                         )
                         
                         updated_article = Article.BaseModel(
@@ -389,7 +392,8 @@ class KnowledgeBaseOperations:
                     # Log the database change
                     DatabaseChangeLogger.log_tag_insert(
                         tag_id=str(tag_id),
-                        name=tag.name
+                        name=tag.name,
+                        kb_id=str(tag.knowledge_base_id)
                     )
                     
                     new_tag = Tags.BaseModel(
@@ -427,7 +431,8 @@ class KnowledgeBaseOperations:
                         # Log the database change
                         DatabaseChangeLogger.log_tag_update(
                             tag_id=str(tag.id),
-                            name=tag.name
+                            name=tag.name,
+                            kb_id=str(tag.knowledge_base_id)
                         )
                         
                         updated_tag = Tags.BaseModel(
@@ -592,6 +597,30 @@ class KnowledgeBaseOperations:
             print(f"An error occurred with KnowledgeBaseOperations.get_tags_with_usage_count: {e}")
             return []
 
+    def get_knowledge_base_change_fingerprint(self, knowledge_base_id: str) -> Optional[Dict[str, Any]]:
+        """Get a cheap single-query fingerprint of a knowledge base's content (counts and last-modified times)
+        used to detect whether anything changed without loading articles, tags or the hierarchy"""
+        try:
+            with db_manager.get_cursor() as (conn, cur):
+                sql = """SELECT
+                             (SELECT COUNT(*) FROM articles
+                              WHERE knowledge_base_id = %(kb_id)s AND is_active = TRUE) AS article_count,
+                             (SELECT MAX(updated_at) FROM articles
+                              WHERE knowledge_base_id = %(kb_id)s) AS articles_updated_at,
+                             (SELECT COUNT(*) FROM tags
+                              WHERE knowledge_base_id = %(kb_id)s) AS tag_count,
+                             (SELECT COUNT(*) FROM article_tags at
+                              JOIN tags t ON t.id = at.tag_id
+                              WHERE t.knowledge_base_id = %(kb_id)s) AS tag_association_count,
+                             (SELECT updated_at FROM knowledge_base
+                              WHERE id = %(kb_id)s) AS kb_updated_at;"""
+                cur.execute(sql, {"kb_id": knowledge_base_id})
+                fingerprint = cur.fetchone()
+                return dict(fingerprint) if fingerprint else None
+        except Exception as e:
+            print(f"An error occurred with KnowledgeBaseOperations.get_knowledge_base_change_fingerprint: {e}")
+            return None
+
     def search_articles_by_tags(self, knowledge_base_id: str, tag_names: List[str], match_all: bool = False) -> List[Article.BaseModel]:
         """Search articles by tag names. If match_all=True, articles must have ALL tags; if False, articles must have ANY tag"""
         try:
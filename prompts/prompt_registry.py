@@ -0,0 +1,195 @@
+"""
+Prompt registry for agent prompt assembly.
+Renders static prompt sections once, keeps them as a stable message prefix so the provider can
+reuse its prompt cache, and reports static vs dynamic token counts per LLM call.
+"""
+
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from utils.context_window import estimate_tokens
+from .foundational_prompts import AgentSpecificFoundations
+
+
+class PromptRegistry:
+    """
+    Cache of rendered static prompts plus prompt size accounting.
+    Static text always goes first and dynamic text last, so identical static prefixes are
+    byte-for-byte stable across calls. Every rendered or registered static prefix is recognised
+    when a call is recorded, which gives the static / dynamic split per owner.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, Callable[[], str]] = {}
+        self._rendered: Dict[str, str] = {}
+        self._static_prefixes: Dict[str, str] = {}
+        self._token_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "static_tokens": 0, "dynamic_tokens": 0}
+        )
+
+    def register(self, name: str, builder: Callable[[], str]) -> None:
+        """Register a builder for a static prompt; it runs once, on first use"""
+        with self._lock:
+            self._builders[name] = builder
+            self._rendered.pop(name, None)
+
+    def get(self, name: str) -> str:
+        """Rendered static prompt (cached after the first render)"""
+        rendered = self._rendered.get(name)
+        if rendered is None:
+            # Build outside the lock: builders may get() other prompts (e.g. the shared foundation)
+            with self._lock:
+                builder = self._builders[name]
+            built = builder()
+            with self._lock:
+                rendered = self._rendered.get(name)
+                if rendered is None:
+                    rendered = self._rendered[name] = built
+                    self._static_prefixes[rendered] = name
+        return rendered
+
+    def register_static_prefix(self, owner: str, text: str) -> None:
+        """Mark text (e.g. an agent's assembled system prompt) as a static prefix owned by owner"""
+        if text not in self._static_prefixes:
+            with self._lock:
+                self._static_prefixes[text] = owner
+
+    def count_tokens(self, text: str) -> int:
+        """Token count, memoized by content hash (static text is counted once)"""
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        count = self._token_counts.get(key)
+        if count is None:
+            count = estimate_tokens(text)
+            self._token_counts[key] = count
+        return count
+
+    def _match_static_prefix(self, content: str) -> Optional[str]:
+        matches = [prefix for prefix in self._static_prefixes if content.startswith(prefix)]
+        return max(matches, key=len) if matches else None
+
+    def record_call(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        """Record the static/dynamic split of one LLM call's messages"""
+        first_content = messages[0].content if messages and isinstance(messages[0].content, str) else ""
+        prefix = self._match_static_prefix(first_content) if first_content else None
+        owner = self._static_prefixes.get(prefix, "unattributed") if prefix else "unattributed"
+
+        static_tokens = self.count_tokens(prefix) if prefix else 0
+        dynamic_text = first_content[len(prefix):] if prefix else first_content
+        dynamic_tokens = estimate_tokens(dynamic_text) + sum(
+            estimate_tokens(message.content) for message in messages[1:] if isinstance(message.content, str)
+        )
+
+        with self._lock:
+            stats = self._stats[owner]
+            stats["calls"] += 1
+            stats["static_tokens"] += static_tokens
+            stats["dynamic_tokens"] += dynamic_tokens
+        return {"owner": owner, "static_tokens": static_tokens, "dynamic_tokens": dynamic_tokens}
+
+    def build_messages(self, static_prefix: str, dynamic_content: str,
+                       history: Optional[List[BaseMessage]] = None) -> List[BaseMessage]:
+        """[static system prefix] + [history] + [dynamic request]"""
+        return [SystemMessage(content=static_prefix), *(history or []), HumanMessage(content=dynamic_content)]
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-owner call counts and average static / dynamic tokens per call"""
+        with self._lock:
+            report = {}
+            for owner, stats in self._stats.items():
+                calls = stats["calls"] or 1
+                total = stats["static_tokens"] + stats["dynamic_tokens"]
+                report[owner] = {
+                    **stats,
+                    "avg_static_tokens": round(stats["static_tokens"] / calls),
+                    "avg_dynamic_tokens": round(stats["dynamic_tokens"] / calls),
+                    "static_share": round(stats["static_tokens"] / total, 3) if total else 0.0
+                }
+            return report
+
+
+class PromptStatsCallbackHandler(BaseCallbackHandler):
+    """Records the static/dynamic prompt split of every chat model call"""
+
+    def __init__(self, registry: PromptRegistry):
+        self.registry = registry
+
+    def on_chat_model_start(self, serialized, messages, **kwargs: Any) -> None:
+        for message_list in messages:
+            self.registry.record_call(message_list)
+
+
+prompt_registry = PromptRegistry()
+
+# Foundational prompts are constant for the life of the process
+prompt_registry.register("content_creation_foundation", AgentSpecificFoundations.content_creation_foundation)
+prompt_registry.register("content_planning_foundation", AgentSpecificFoundations.content_planning_foundation)
+prompt_registry.register("content_review_foundation", AgentSpecificFoundations.content_review_foundation)
+prompt_registry.register("content_management_foundation", AgentSpecificFoundations.content_management_foundation)
+prompt_registry.register("supervision_foundation", AgentSpecificFoundations.supervision_foundation)
+prompt_registry.register("content_retrieval_foundation", AgentSpecificFoundations.content_retrieval_foundation)
+
+
+def _content_creator_level1_instructions() -> str:
+    """Static part of ContentCreatorAgent's Level 1 article creation request"""
+    return prompt_registry.get("content_creation_foundation") + """
+
+HIERARCHY LEVEL: Level 1 (Categories)
+Follow foundational guidance for Level 1 articles:
+- Simple categorical overviews with broad topic organization  
+- Short titles (2-4 words)
+- 300-500 words of broad topic introduction
+- Introductory tone, categorical organization, general concepts
+
+SPECIFIC INSTRUCTIONS:
+- Use the KnowledgeBaseInsertArticle tool for each article  
+- Set parent_id=null for all Level 1 categories
+- Apply appropriate tags using KnowledgeBaseInsertTag and KnowledgeBaseAddTagToArticle tools
+- Follow the Smart Category Expansion Logic from the foundational standards above"""
+
+
+prompt_registry.register("content_creator_level1_instructions", _content_creator_level1_instructions)
+
+
+def _content_creator_level2_instructions() -> str:
+    """Static part of ContentCreatorAgent's Level 2 (subcategory) drafting request"""
+    return prompt_registry.get("content_creation_foundation") + """
+
+HIERARCHY LEVEL: Level 2 (Subcategories)
+Follow foundational guidance for Level 2 articles:
+- Focused domain knowledge with moderate depth
+- 500-800 words per subcategory
+- Informative tone, focused expertise, domain-specific knowledge
+
+SPECIFIC INSTRUCTIONS:
+- Create 3-5 subcategories for the PARENT CATEGORY given below
+- Use the KnowledgeBaseInsertArticle tool for each subcategory
+- Set parent_id to the PARENT CATEGORY ID given below
+- Apply appropriate tags using KnowledgeBaseInsertTag and KnowledgeBaseAddTagToArticle tools"""
+
+
+def _content_creator_level3_instructions() -> str:
+    """Static part of ContentCreatorAgent's Level 3 (content article) drafting request"""
+    return prompt_registry.get("content_creation_foundation") + """
+
+HIERARCHY LEVEL: Level 3 (Articles)
+Follow foundational guidance for Level 3+ articles:
+- Expert-written, authoritative, comprehensive content with detailed implementation
+- 800-1500 words per article
+- Expert authority, comprehensive depth, practical implementation
+
+SPECIFIC INSTRUCTIONS:
+- Create 3-5 articles for the PARENT SUBCATEGORY given below
+- Use the KnowledgeBaseInsertArticle tool for each article
+- Set parent_id to the PARENT SUBCATEGORY ID given below
+- Apply appropriate tags using KnowledgeBaseInsertTag and KnowledgeBaseAddTagToArticle tools"""
+
+
+prompt_registry.register("content_creator_level2_instructions", _content_creator_level2_instructions)
+prompt_registry.register("content_creator_level3_instructions", _content_creator_level3_instructions)
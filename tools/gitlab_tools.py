@@ -9,6 +9,7 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 
 from operations.gitlab_operations import GitLabOperations
+from utils.cycle_profiler import profile_toolkit
 
 # Use direct GitLab API - simpler and more reliable
 gitlab_operations = GitLabOperations()
@@ -1672,3 +1673,7 @@ class GitLabTools:
     
     def get_tools(self) -> List[BaseTool]:
         return self._tools
+
+
+# Time tool executions when swarm profiling is enabled
+profile_toolkit(GitLabTools)
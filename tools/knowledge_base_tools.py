@@ -1,4 +1,5 @@
 import os
+import time
 from typing import List, Optional, Type, Dict, Any
 from langchain_core.callbacks import  CallbackManagerForToolRun
 from langchain_core.tools import BaseTool
@@ -7,11 +8,13 @@ from pydantic import BaseModel, Field, field_validator
 from models.article import Article
 from models.knowledge_base import KnowledgeBase
 from models.tags import Tags
+from models.tool_result import ToolResult
 
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
 from operations.knowledge_base_operations import KnowledgeBaseOperations
+from utils.cycle_profiler import profile_toolkit
 
 kb_Operations=KnowledgeBaseOperations()
 
@@ -1273,7 +1276,8 @@ class KnowledgeBaseTools():
                    
         args_schema: Optional[ArgsSchema] = KnowledgeBaseInsertArticleInputModel
     
-        def _run(self, knowledge_base_id: str, article: Article.InsertModel) -> Article.BaseModel:
+        def _run(self, knowledge_base_id: str, article: Article.InsertModel) -> ToolResult.WriteModel:
+            started = time.perf_counter()
             print(f"🔧 TOOL: KnowledgeBaseInsertArticle CALLED")
             print(f"📊 KB ID: {knowledge_base_id}")
             print(f"📝 Article Title: {article.title}")
@@ -1298,15 +1302,26 @@ class KnowledgeBaseTools():
                     print(f"🎯 Title: {result.title}")
                     print(f"🏗️ Hierarchical Parent ID: {result.parent_id}")
                     print(f"📝 HIERARCHY FIX: Applied hierarchical structure successfully")
-                else:
-                    print(f"❌ FAILED: insert_article returned None")
-                return result
+                    return ToolResult.WriteModel(
+                        tool_name=self.name, entity_type="article", status=ToolResult.CREATED,
+                        id=result.id, knowledge_base_id=result.knowledge_base_id, title=result.title,
+                        parent_id=result.parent_id, duration_ms=(time.perf_counter() - started) * 1000
+                    )
+                print(f"❌ FAILED: insert_article returned None")
+                return ToolResult.WriteModel(
+                    tool_name=self.name, entity_type="article", status=ToolResult.FAILED,
+                    title=article.title, error="insert_article returned no article",
+                    duration_ms=(time.perf_counter() - started) * 1000
+                )
                 
             except Exception as e:
                 print(f"💥 ERROR in KnowledgeBaseInsertArticle: {str(e)}")
                 import traceback
                 print(f"🔍 Traceback: {traceback.format_exc()}")
-                raise
+                return ToolResult.WriteModel(
+                    tool_name=self.name, entity_type="article", status=ToolResult.FAILED,
+                    title=article.title, error=str(e), duration_ms=(time.perf_counter() - started) * 1000
+                )
 
         def _determine_hierarchical_parent_id(self, knowledge_base_id: str, article: Article.InsertModel) -> str:
             """Determine the appropriate parent_id for an article based on hierarchy"""
@@ -1471,7 +1486,8 @@ class KnowledgeBaseTools():
                 
         args_schema: Optional[ArgsSchema] = KnowledgeBaseUpdateArticleInputModel
     
-        def _run(self, knowledge_base_id: str, article: Article.UpdateModel) -> Article.BaseModel:
+        def _run(self, knowledge_base_id: str, article: Article.UpdateModel) -> ToolResult.WriteModel:
+            started = time.perf_counter()
             print(f"🔧 TOOL: KnowledgeBaseUpdateArticle CALLED")
             print(f"📊 KB ID: {knowledge_base_id}")
             print(f"📝 Article ID: {article.id}")
@@ -1484,15 +1500,25 @@ class KnowledgeBaseTools():
                 if result:
                     print(f"✅ SUCCESS: Article updated with ID {result.id}")
                     print(f"🎯 Title: {result.title}")
-                    print(f"📅 Updated: {result.updated_at}")
-                else:
-                    print(f"❌ FAILED: update_article returned None")
-                return result
+                    return ToolResult.WriteModel(
+                        tool_name=self.name, entity_type="article", status=ToolResult.UPDATED,
+                        id=result.id, knowledge_base_id=result.knowledge_base_id, title=result.title,
+                        parent_id=result.parent_id, duration_ms=(time.perf_counter() - started) * 1000
+                    )
+                print(f"❌ FAILED: update_article returned None")
+                return ToolResult.WriteModel(
+                    tool_name=self.name, entity_type="article", status=ToolResult.FAILED,
+                    title=article.title, error="update_article returned no article",
+                    duration_ms=(time.perf_counter() - started) * 1000
+                )
             except Exception as e:
                 print(f"💥 ERROR in KnowledgeBaseUpdateArticle: {str(e)}")
                 import traceback
                 print(f"🔍 Traceback: {traceback.format_exc()}")
-                raise
+                return ToolResult.WriteModel(
+                    tool_name=self.name, entity_type="article", status=ToolResult.FAILED,
+                    title=article.title, error=str(e), duration_ms=(time.perf_counter() - started) * 1000
+                )
 
     # =============================================
     # TAG MANAGEMENT TOOLS
@@ -1585,7 +1611,8 @@ class KnowledgeBaseTools():
                 
         args_schema: Optional[ArgsSchema] = KnowledgeBaseInsertTagInputModel
     
-        def _run(self, tag: Tags.InsertModel) -> Optional[Tags.BaseModel]:
+        def _run(self, tag: Tags.InsertModel) -> ToolResult.WriteModel:
+            started = time.perf_counter()
             try:
                 print(f"🔧 TOOL: KnowledgeBaseInsertTag CALLED")
                 print(f"📝 Parameters:")
@@ -1598,12 +1625,17 @@ class KnowledgeBaseTools():
                 new_tag = kb_Operations.insert_tag(tag)
                 
                 if new_tag:
-                    new_tag_id = getattr(new_tag, 'id', 'Unknown') if hasattr(new_tag, 'id') else 'Unknown'
-                    print(f"✅ KnowledgeBaseInsertTag completed successfully - Tag ID: {new_tag_id}")
-                else:
-                    print(f"❌ KnowledgeBaseInsertTag failed - No tag returned")
-                    
-                return new_tag
+                    print(f"✅ KnowledgeBaseInsertTag completed successfully - Tag ID: {new_tag.id}")
+                    return ToolResult.WriteModel(
+                        tool_name=self.name, entity_type="tag", status=ToolResult.CREATED,
+                        id=new_tag.id, knowledge_base_id=new_tag.knowledge_base_id, title=new_tag.name,
+                        duration_ms=(time.perf_counter() - started) * 1000
+                    )
+                print(f"❌ KnowledgeBaseInsertTag failed - No tag returned")
+                return ToolResult.WriteModel(
+                    tool_name=self.name, entity_type="tag", status=ToolResult.FAILED, title=tag_name,
+                    error="insert_tag returned no tag", duration_ms=(time.perf_counter() - started) * 1000
+                )
                 
             except Exception as e:
                 error_msg = f"❌ KnowledgeBaseInsertTag failed: {str(e)}"
@@ -1611,7 +1643,10 @@ class KnowledgeBaseTools():
                 print(f"🔍 Full error traceback:")
                 import traceback
                 traceback.print_exc()
-                return None
+                return ToolResult.WriteModel(
+                    tool_name=self.name, entity_type="tag", status=ToolResult.FAILED,
+                    error=str(e), duration_ms=(time.perf_counter() - started) * 1000
+                )
 
     class KnowledgeBaseUpdateTag(BaseTool):
         name: str = "KnowledgeBaseUpdateTag"
@@ -1731,7 +1766,8 @@ class KnowledgeBaseTools():
                 
         args_schema: Optional[ArgsSchema] = KnowledgeBaseAddTagToArticleInputModel
     
-        def _run(self, article_id: str, tag_id: str) -> bool:
+        def _run(self, article_id: str, tag_id: str) -> ToolResult.WriteModel:
+            started = time.perf_counter()
             try:
                 print(f"🔧 TOOL: KnowledgeBaseAddTagToArticle CALLED")
                 print(f"📝 Parameters:")
@@ -1746,7 +1782,13 @@ class KnowledgeBaseTools():
                 else:
                     print(f"❌ KnowledgeBaseAddTagToArticle failed - Tag not added")
                     
-                return result
+                return ToolResult.WriteModel(
+                    tool_name=self.name, entity_type="article_tag",
+                    status=ToolResult.LINKED if result else ToolResult.FAILED,
+                    error=None if result else "add_tag_to_article returned False",
+                    details={"article_id": article_id, "tag_id": tag_id},
+                    duration_ms=(time.perf_counter() - started) * 1000
+                )
                 
             except Exception as e:
                 error_msg = f"❌ KnowledgeBaseAddTagToArticle failed: {str(e)}"
@@ -1754,7 +1796,11 @@ class KnowledgeBaseTools():
                 print(f"🔍 Full error traceback:")
                 import traceback
                 traceback.print_exc()
-                return False
+                return ToolResult.WriteModel(
+                    tool_name=self.name, entity_type="article_tag", status=ToolResult.FAILED,
+                    error=str(e), details={"article_id": article_id, "tag_id": tag_id},
+                    duration_ms=(time.perf_counter() - started) * 1000
+                )
 
     class KnowledgeBaseRemoveTagFromArticle(BaseTool):
         name: str = "KnowledgeBaseRemoveTagFromArticle"
@@ -2302,3 +2348,7 @@ Recommend using the LLM to analyze content gaps based on your specific KB descri
     # Method to get tools (for ease of use, made so class works similarly to LangChain toolkits)
     def tools(self) -> List[BaseTool]:
         return self._tools
+
+
+# Time tool executions when swarm profiling is enabled
+profile_toolkit(KnowledgeBaseTools)
@@ -0,0 +1,118 @@
+"""
+Adaptive Poller for Autonomous Agent Loops
+
+Replaces fixed sleep intervals with:
+- Exponential backoff up to a ceiling while polls come back idle
+- Immediate reset to the base interval as soon as work is found
+- Per-key jitter (stable phase offset + random spread) so swarms working on
+  different projects do not hit GitLab in lock-step
+"""
+
+import os
+import random
+import time
+import zlib
+from typing import Optional
+
+
+class AdaptivePoller:
+    """Computes the delay before the next poll from the outcome of previous polls"""
+
+    def __init__(self,
+                 name: str,
+                 base_interval: float,
+                 max_interval: float,
+                 backoff_factor: float = 2.0,
+                 jitter_ratio: float = 0.1,
+                 jitter_key: Optional[str] = None):
+        """
+        Args:
+            name: Cadence name used in log messages (e.g. "discovery", "reconciliation")
+            base_interval: Delay in seconds after a poll that found work
+            max_interval: Ceiling for the backed-off delay in seconds
+            backoff_factor: Multiplier applied per consecutive idle poll
+            jitter_ratio: Maximum jitter as a fraction of the current interval
+            jitter_key: Stable key (e.g. project or KB ID) that determines this poller's phase offset
+        """
+        self.name = name
+        self.base_interval = max(float(base_interval), 0.0)
+        self.max_interval = max(float(max_interval), self.base_interval)
+        self.backoff_factor = max(float(backoff_factor), 1.0)
+        self.jitter_ratio = min(max(float(jitter_ratio), 0.0), 1.0)
+        self.jitter_key = jitter_key
+
+        self.consecutive_idle_polls = 0
+        self.last_poll_at: Optional[float] = None
+        self.next_poll_at: Optional[float] = None
+
+        # Stable per-key phase in [0, 1): different projects land on different offsets
+        if jitter_key is not None:
+            self._phase = (zlib.crc32(str(jitter_key).encode("utf-8")) % 1000) / 1000.0
+        else:
+            self._phase = random.random()
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, base_interval: float, max_interval: float,
+                 jitter_key: Optional[str] = None) -> "AdaptivePoller":
+        """Create a poller whose settings can be overridden with {prefix}_BASE_INTERVAL, _MAX_INTERVAL,
+        _BACKOFF_FACTOR and _JITTER environment variables"""
+        return cls(
+            name=name,
+            base_interval=float(os.getenv(f"{prefix}_BASE_INTERVAL", base_interval)),
+            max_interval=float(os.getenv(f"{prefix}_MAX_INTERVAL", max_interval)),
+            backoff_factor=float(os.getenv(f"{prefix}_BACKOFF_FACTOR", 2.0)),
+            jitter_ratio=float(os.getenv(f"{prefix}_JITTER", 0.1)),
+            jitter_key=jitter_key
+        )
+
+    @property
+    def current_interval(self) -> float:
+        """Backed-off interval before jitter"""
+        interval = self.base_interval * (self.backoff_factor ** self.consecutive_idle_polls)
+        return min(interval, self.max_interval)
+
+    def _apply_jitter(self, interval: float) -> float:
+        """Spread the interval by the stable phase offset plus a random component"""
+        if self.jitter_ratio == 0 or interval == 0:
+            return interval
+        spread = interval * self.jitter_ratio
+        phase_offset = (self._phase - 0.5) * spread
+        random_offset = random.uniform(-0.5, 0.5) * spread
+        return max(interval + phase_offset + random_offset, 0.0)
+
+    def record_poll(self, found_work: bool, now: Optional[float] = None) -> float:
+        """
+        Record the outcome of a poll and schedule the next one.
+
+        Returns:
+            Seconds to wait before the next poll
+        """
+        now = time.monotonic() if now is None else now
+        if found_work:
+            self.consecutive_idle_polls = 0
+        elif self.current_interval < self.max_interval:
+            self.consecutive_idle_polls += 1
+
+        delay = self._apply_jitter(self.current_interval)
+        self.last_poll_at = now
+        self.next_poll_at = now + delay
+        return delay
+
+    def is_due(self, now: Optional[float] = None) -> bool:
+        """True if the poller has never run or its scheduled delay has elapsed"""
+        if self.next_poll_at is None:
+            return True
+        now = time.monotonic() if now is None else now
+        return now >= self.next_poll_at
+
+    def seconds_until_due(self, now: Optional[float] = None) -> float:
+        """Seconds remaining before the next scheduled poll (0 if already due)"""
+        if self.next_poll_at is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(self.next_poll_at - now, 0.0)
+
+    def reset(self) -> None:
+        """Drop back to the base interval and poll immediately on the next check"""
+        self.consecutive_idle_polls = 0
+        self.next_poll_at = None
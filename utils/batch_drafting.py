@@ -0,0 +1,117 @@
+"""
+Batch Drafting Engine
+
+Fans out independent LLM generations (e.g. the subcategories of every category, or the articles of
+every subcategory) concurrently with the model's async abatch, instead of one synchronous
+invoke per node:
+- Concurrency is capped at the deployment's gateway limit (LLM_GATEWAY_*_MAX_CONCURRENCY),
+  or BATCH_DRAFTING_MAX_CONCURRENCY when set lower
+- One failed draft does not fail the batch; its error is returned in its slot
+- Results keep the order of the submitted tasks
+
+Building a knowledge base level by level therefore takes one batch round trip per tree level.
+Synchronous draft() calls all run on one long-lived loop, so the gateway's pooled async HTTP
+clients stay bound to a live loop between batches.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage
+
+from utils.llm_gateway import llm_gateway
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DraftTask:
+    """One independent generation: its messages plus caller context (e.g. the parent article)"""
+    key: str
+    messages: List[BaseMessage]
+    context: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class DraftResult:
+    """LLM response for a DraftTask, or the error that prevented it"""
+    task: DraftTask
+    response: Any = None
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None and self.response is not None
+
+
+class BatchDraftingEngine:
+    """Runs many independent generations concurrently under a per-deployment cap"""
+
+    def __init__(self, llm, role: str = "primary", max_concurrency: Optional[int] = None):
+        """
+        Args:
+            llm: Chat model (usually bound to tools) used for every draft
+            role: Gateway deployment role whose concurrency limit applies
+            max_concurrency: Explicit cap; defaults to BATCH_DRAFTING_MAX_CONCURRENCY or the gateway limit
+        """
+        self.llm = llm
+        self.role = role
+        gateway_limit = llm_gateway.max_concurrency(role)
+        configured = max_concurrency or int(os.getenv('BATCH_DRAFTING_MAX_CONCURRENCY', '0'))
+        self.max_concurrency = min(configured, gateway_limit) if configured > 0 else gateway_limit
+
+    async def adraft(self, tasks: List[DraftTask]) -> List[DraftResult]:
+        """Generate all tasks concurrently; results are in task order"""
+        if not tasks:
+            return []
+        started = time.perf_counter()
+        responses = await self.llm.abatch(
+            [task.messages for task in tasks],
+            config={"max_concurrency": self.max_concurrency},
+            return_exceptions=True
+        )
+        results = [
+            DraftResult(task, error=f"{type(response).__name__}: {response}") if isinstance(response, Exception)
+            else DraftResult(task, response=response)
+            for task, response in zip(tasks, responses)
+        ]
+        failed = sum(1 for result in results if not result.success)
+        logger.info(f"Batch drafting: {len(tasks)} drafts ({failed} failed) in {time.perf_counter() - started:.1f}s "
+                    f"with max concurrency {self.max_concurrency}")
+        return results
+
+    def draft(self, tasks: List[DraftTask]) -> List[DraftResult]:
+        """Synchronous wrapper for callers on plain threads (the swarm agents) or inside an event loop"""
+        return asyncio.run_coroutine_threadsafe(self.adraft(tasks), _drafting_loop()).result()
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _drafting_loop() -> asyncio.AbstractEventLoop:
+    """
+    Long-lived event loop (in a daemon thread) shared by every engine.
+
+    The gateway hands out one httpx.AsyncClient per role, and its connection pool is bound to the
+    loop that first used it, so every batch has to run on the same loop rather than asyncio.run's
+    throwaway ones.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="batch-drafting", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def running_drafting_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """The drafting loop if it has been started and is still running (used to close async clients on it)"""
+    with _loop_lock:
+        return _loop if _loop is not None and _loop.is_running() else None
@@ -0,0 +1,192 @@
+"""
+Content Pipeline Stages with Backpressure
+
+Models the planner → creator → reviewer flow as pipeline stages whose queues are the open
+GitLab issues carrying each stage's labels:
+- Each stage has a bounded queue (maximum number of waiting issues)
+- An upstream stage is throttled while its downstream queue is full, so the creator stops
+  spending LLM budget on work the reviewer cannot keep up with
+- Queue depth, in-progress count and throttling per stage are reported as metrics
+- Depths are computed from open-issue lists that work discovery already fetched; only projects
+  whose snapshot has gone stale need a fetch of their own
+"""
+
+import os
+import time
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineStage:
+    """One stage of the content pipeline and the GitLab issue queue that feeds it"""
+
+    def __init__(self, name: str, agent_name: str, input_labels: List[str], max_queue_depth: int,
+                 downstream: Optional["PipelineStage"] = None):
+        """
+        Args:
+            name: Stage name used in metrics and env overrides (e.g. "creator")
+            agent_name: Swarm agent that consumes this stage's queue
+            input_labels: Issue labels that put an issue in this stage's queue
+            max_queue_depth: Queue capacity; upstream stages throttle once it is reached (0 = unbounded)
+            downstream: Stage that receives this stage's output
+        """
+        self.name = name
+        self.agent_name = agent_name
+        self.input_labels = [label.lower() for label in input_labels]
+        self.max_queue_depth = max(int(max_queue_depth), 0)
+        self.downstream = downstream
+
+        self.queue_depth = 0
+        self.in_progress = 0
+        self.throttled_cycles = 0
+        self.peak_queue_depth = 0
+
+    def accepts(self, labels: Iterable[str]) -> bool:
+        """True if an issue with these labels belongs in this stage's queue"""
+        return any(label.lower() in self.input_labels for label in labels)
+
+    def is_full(self) -> bool:
+        return self.max_queue_depth > 0 and self.queue_depth >= self.max_queue_depth
+
+    def is_blocked(self) -> bool:
+        """Upstream backpressure: this stage must not produce more work while its downstream is full"""
+        return self.downstream is not None and self.downstream.is_full()
+
+
+class ContentPipeline:
+    """Planner → creator → reviewer pipeline with bounded queues between stages"""
+
+    def __init__(self, stages: List[PipelineStage], enabled: bool = True, history_size: int = 50):
+        self.stages = stages
+        self.enabled = enabled
+        self._stages_by_agent = {stage.agent_name: stage for stage in stages}
+        self.last_refreshed_at: Optional[float] = None
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        # GitLab project id → (time fetched, open issues) as last seen by any caller
+        self._issue_snapshots: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ContentPipeline":
+        """Default planner → creator → reviewer pipeline.
+
+        Capacities can be overridden with SWARM_{STAGE}_QUEUE_LIMIT (e.g. SWARM_REVIEWER_QUEUE_LIMIT);
+        SWARM_PIPELINE_BACKPRESSURE=false disables throttling while still reporting queue depths.
+        """
+        def limit(stage_name: str, default: int) -> int:
+            return int(os.getenv(f"SWARM_{stage_name.upper()}_QUEUE_LIMIT", str(default)))
+
+        reviewer = PipelineStage(
+            "reviewer", "ContentReviewerAgent",
+            ["review", "qa", "quality-assurance", "quality-review", "validation", "ready-for-review"],
+            limit("reviewer", 5)
+        )
+        creator = PipelineStage(
+            "creator", "ContentCreatorAgent",
+            ["content-creation", "content-generation", "development", "writing", "create"],
+            limit("creator", 10), downstream=reviewer
+        )
+        planner = PipelineStage(
+            "planner", "ContentPlannerAgent",
+            ["planning", "architecture", "strategy", "design", "kb-plan"],
+            limit("planner", 20), downstream=creator
+        )
+        enabled = os.getenv("SWARM_PIPELINE_BACKPRESSURE", "true").lower() in ("1", "true", "yes", "on")
+        return cls([planner, creator, reviewer], enabled=enabled)
+
+    def observe_issues(self, project_id: Any, open_issues: List[Dict[str, Any]]) -> None:
+        """Record a project's open issues fetched elsewhere (e.g. by work discovery) for the next refresh"""
+        self._issue_snapshots[str(project_id)] = (time.time(), list(open_issues))
+
+    def stale_projects(self, project_ids: Iterable[Any], max_age: float) -> List[str]:
+        """Projects with no open-issue snapshot, or one older than max_age seconds"""
+        now = time.time()
+        return [str(project_id) for project_id in project_ids
+                if now - self._issue_snapshots.get(str(project_id), (0.0, []))[0] > max_age]
+
+    def refresh_from_snapshots(self, project_ids: Iterable[Any], record_history: bool = True) -> None:
+        """Recompute queue depths from the latest open-issue snapshots of these projects"""
+        self.refresh([issue for project_id in project_ids
+                      for issue in self._issue_snapshots.get(str(project_id), (0.0, []))[1]],
+                     record_history=record_history)
+
+    def refresh(self, open_issues: List[Dict[str, Any]], record_history: bool = True) -> None:
+        """Recompute every stage's queue depth from a snapshot of open GitLab issues
+
+        Mid-cycle refreshes pass record_history=False so the history keeps one entry per cycle.
+        """
+        for stage in self.stages:
+            stage.queue_depth = 0
+            stage.in_progress = 0
+
+        for issue in open_issues:
+            labels = issue.get("labels", [])
+            in_progress = any(label.lower() == "in-progress" for label in labels)
+            for stage in self.stages:
+                if stage.accepts(labels):
+                    if in_progress:
+                        stage.in_progress += 1
+                    else:
+                        stage.queue_depth += 1
+
+        for stage in self.stages:
+            stage.peak_queue_depth = max(stage.peak_queue_depth, stage.queue_depth)
+
+        self.last_refreshed_at = time.time()
+        if not record_history:
+            return
+        self.history.append({
+            "timestamp": self.last_refreshed_at,
+            "depths": {stage.name: stage.queue_depth for stage in self.stages}
+        })
+        logger.debug("Pipeline queue depths: " + ", ".join(
+            f"{stage.name}={stage.queue_depth}/{stage.max_queue_depth or '∞'}" for stage in self.stages
+        ))
+
+    def stage_for(self, agent_name: str) -> Optional[PipelineStage]:
+        """The stage consumed by an agent, or None if the agent is not part of the pipeline"""
+        return self._stages_by_agent.get(agent_name)
+
+    def should_throttle(self, agent_name: str) -> bool:
+        """True if the agent's stage must pause because its downstream queue is full"""
+        stage = self.stage_for(agent_name)
+        if not self.enabled or stage is None or not stage.is_blocked():
+            return False
+        stage.throttled_cycles += 1
+        logger.info(f"⏸️ Backpressure: throttling {agent_name} - {stage.downstream.name} queue is full "
+                    f"({stage.downstream.queue_depth}/{stage.downstream.max_queue_depth})")
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth metrics per stage"""
+        return {
+            "enabled": self.enabled,
+            "last_refreshed_at": self.last_refreshed_at,
+            "stages": {
+                stage.name: {
+                    "agent": stage.agent_name,
+                    "queue_depth": stage.queue_depth,
+                    "max_queue_depth": stage.max_queue_depth,
+                    "in_progress": stage.in_progress,
+                    "peak_queue_depth": stage.peak_queue_depth,
+                    "utilization": round(stage.queue_depth / stage.max_queue_depth, 2) if stage.max_queue_depth else None,
+                    "full": stage.is_full(),
+                    "throttled_cycles": stage.throttled_cycles,
+                }
+                for stage in self.stages
+            }
+        }
+
+    def format_metrics(self) -> str:
+        """One line per stage, for cycle summaries and the status command"""
+        lines = []
+        for stage in self.stages:
+            capacity = stage.max_queue_depth or "∞"
+            flags = " FULL" if stage.is_full() else ""
+            if stage.is_blocked() and self.enabled:
+                flags += " (throttled)"
+            lines.append(f"   • {stage.name:<9} queued {stage.queue_depth}/{capacity}, "
+                         f"in progress {stage.in_progress}, throttled {stage.throttled_cycles}x{flags}")
+        return "\n".join(lines)
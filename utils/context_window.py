@@ -0,0 +1,143 @@
+"""
+Token-Budgeted Conversation Context
+
+Builds the message list passed to the agent graph so prompt size stays flat as sessions grow:
+- Recent turns are selected newest-first until a token budget is reached
+- Older turns are folded into a rolling summary stored in session_states
+  (conversation_metadata.rolling_summary) and reused on every message
+- The summary is only regenerated once enough turns have been pushed out of the window,
+  so most messages cost no extra LLM call
+- Every message after the summary's through_message_order is considered, so a turn is either
+  kept verbatim or folded into the summary - never dropped; more than CONTEXT_HISTORY_FETCH_LIMIT
+  unsummarized messages forces a summary update
+
+Configure with CONTEXT_HISTORY_TOKEN_BUDGET, CONTEXT_SUMMARY_BATCH_TOKENS and
+CONTEXT_HISTORY_FETCH_LIMIT.
+"""
+
+import os
+import logging
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count via tiktoken when available, otherwise ~4 characters per token"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(text) // 4 + 1
+
+
+class ConversationContextWindow:
+    """Selects recent conversation turns by token budget and maintains a rolling summary of the rest"""
+
+    SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and a knowledge base assistant.
+
+Current summary:
+{summary}
+
+New conversation turns to fold into the summary:
+{turns}
+
+Write the updated summary in at most {max_words} words. Keep knowledge base and article IDs, names,
+user decisions, open requests and anything later turns may refer back to. Respond with the summary only."""
+
+    def __init__(self, state_manager, llm, token_budget: Optional[int] = None,
+                 summary_batch_tokens: Optional[int] = None, fetch_limit: Optional[int] = None,
+                 summary_max_words: int = 200):
+        """
+        Args:
+            state_manager: PostgreSQLStateManager for the session
+            llm: Chat model used to update the rolling summary
+            token_budget: Maximum tokens of verbatim history passed with each message
+            summary_batch_tokens: Tokens of pushed-out turns that trigger a summary update
+            fetch_limit: Unsummarized messages that force a summary update regardless of their tokens
+            summary_max_words: Length cap for the rolling summary
+        """
+        self.state_manager = state_manager
+        self.llm = llm
+        self.token_budget = token_budget or int(os.getenv('CONTEXT_HISTORY_TOKEN_BUDGET', '3000'))
+        self.summary_batch_tokens = summary_batch_tokens or int(os.getenv('CONTEXT_SUMMARY_BATCH_TOKENS', '1500'))
+        self.fetch_limit = fetch_limit or int(os.getenv('CONTEXT_HISTORY_FETCH_LIMIT', '50'))
+        self.summary_max_words = summary_max_words
+        self.last_stats: Dict[str, Any] = {}
+
+    def build_messages(self, current_message: BaseMessage) -> List[BaseMessage]:
+        """History for the graph: [rolling summary] + recent turns within budget + current message"""
+        summary = self.state_manager.get_conversation_summary()
+        summarized_through = summary.get("through_message_order", 0)
+
+        # Everything not yet summarized; the most recent stored message is the current input, which was just persisted
+        unsummarized = self.state_manager.get_conversation_history(limit=None, after_order=summarized_through)[:-1]
+        history = [msg for msg in unsummarized if msg['message_role'] in ('user', 'assistant')]
+
+        # Walk newest → oldest until the budget is spent
+        selected: List[Dict[str, Any]] = []
+        used_tokens = 0
+        for msg in reversed(history):
+            tokens = estimate_tokens(msg['message_content'])
+            if selected and used_tokens + tokens > self.token_budget:
+                break
+            selected.insert(0, msg)
+            used_tokens += tokens
+
+        # Turns pushed out of the window but not yet summarized
+        overflow = history[:len(history) - len(selected)]
+        overflow_tokens = sum(estimate_tokens(msg['message_content']) for msg in overflow)
+
+        summary_text = summary.get("text")
+        new_summary = None
+        if overflow and (overflow_tokens >= self.summary_batch_tokens or len(unsummarized) > self.fetch_limit):
+            new_summary = self._update_summary(summary_text, overflow)
+        if new_summary:
+            summary_text = new_summary
+        else:
+            # Not worth a summarization call yet - keep the pushed-out turns verbatim
+            selected = overflow + selected
+            used_tokens += overflow_tokens
+
+        messages: List[BaseMessage] = []
+        if summary_text:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary_text}"))
+        for msg in selected:
+            if msg['message_role'] == 'user':
+                messages.append(HumanMessage(content=msg['message_content']))
+            else:
+                messages.append(AIMessage(content=msg['message_content']))
+        messages.append(current_message)
+
+        self.last_stats = {
+            "history_messages": len(selected),
+            "history_tokens": used_tokens,
+            "summary_tokens": estimate_tokens(summary_text or ""),
+            "summarized_through": summary.get("through_message_order", 0)
+        }
+        return messages
+
+    def _update_summary(self, summary_text: Optional[str], turns: List[Dict[str, Any]]) -> Optional[str]:
+        """Fold pushed-out turns into the rolling summary and persist it"""
+        transcript = "\n".join(f"{msg['message_role']}: {msg['message_content']}" for msg in turns)
+        prompt = self.SUMMARY_PROMPT.format(
+            summary=summary_text or "(none yet)", turns=transcript, max_words=self.summary_max_words
+        )
+        try:
+            response = self.llm.invoke([HumanMessage(content=prompt)])
+            new_summary = response.content.strip()
+            through_order = turns[-1]['message_order']
+            self.state_manager.update_conversation_summary(new_summary, through_order)
+            logger.info(f"Rolling conversation summary updated through message {through_order} ({len(turns)} turns folded)")
+            return new_summary
+        except Exception as e:
+            logger.warning(f"Failed to update rolling conversation summary: {e}")
+            return None
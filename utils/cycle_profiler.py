@@ -0,0 +1,330 @@
+"""
+Cycle Profiler for the Autonomous Agent Swarm
+
+Records timing spans for DB queries, GitLab requests, LLM calls, tool executions and
+console printing, attributed to the agent and swarm cycle that triggered them.
+
+- Rolling report with count / p50 / p95 / total per span type and per agent
+- JSON-lines trace file using Chrome trace "complete" events (ph="X"); convert it with
+  export_chrome_trace() and open it in chrome://tracing, Perfetto or speedscope
+
+Enable with SWARM_PROFILE=true (trace file: SWARM_TRACE_FILE, default logs/swarm_trace.jsonl).
+When disabled every span is a no-op.
+"""
+
+import os
+import json
+import time
+import threading
+import functools
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class CycleProfiler:
+    """Collects timing spans per agent and per cycle"""
+
+    def __init__(self, enabled: bool = False, trace_file: Optional[str] = None, window_size: int = 1000):
+        """
+        Args:
+            enabled: Record spans when True; spans are no-ops otherwise
+            trace_file: JSON-lines trace output path (None disables the trace file)
+            window_size: Number of recent durations kept per span type for the rolling report
+        """
+        self.enabled = enabled
+        self.trace_file = trace_file
+        self.window_size = window_size
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._durations: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window_size))
+        self._agent_totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._cycle_totals: Dict[int, Dict[str, float]] = {}
+        self._trace_handle = None
+
+        # Chrome trace timestamps are wall-clock microseconds; durations come from perf_counter
+        self._perf_origin = time.perf_counter()
+        self._wall_origin_us = time.time() * 1_000_000
+        self._pid = os.getpid()
+
+    @classmethod
+    def from_env(cls) -> "CycleProfiler":
+        """Build a profiler from SWARM_PROFILE / SWARM_TRACE_FILE / SWARM_PROFILE_WINDOW"""
+        enabled = os.getenv('SWARM_PROFILE', 'false').lower() in ('1', 'true', 'yes')
+        trace_file = os.getenv('SWARM_TRACE_FILE', 'logs/swarm_trace.jsonl') or None
+        window_size = int(os.getenv('SWARM_PROFILE_WINDOW', '1000'))
+        return cls(enabled=enabled, trace_file=trace_file, window_size=window_size)
+
+    # ------------------------------------------------------------------
+    # Context attribution
+    # ------------------------------------------------------------------
+
+    @property
+    def current_agent(self) -> Optional[str]:
+        return getattr(self._local, 'agent', None)
+
+    @property
+    def current_cycle(self) -> Optional[int]:
+        return getattr(self._local, 'cycle', None)
+
+    @contextmanager
+    def agent(self, agent_name: str):
+        """Attribute spans recorded on this thread to an agent"""
+        previous = self.current_agent
+        self._local.agent = agent_name
+        try:
+            with self.span("agent", agent_name):
+                yield
+        finally:
+            self._local.agent = previous
+
+    @contextmanager
+    def cycle(self, cycle_number: int):
+        """Attribute spans recorded on this thread to a swarm cycle"""
+        previous = self.current_cycle
+        self._local.cycle = cycle_number
+        if self.enabled:
+            with self._lock:
+                self._cycle_totals[cycle_number] = defaultdict(float)
+                # Only keep totals for recent cycles
+                for old_cycle in sorted(self._cycle_totals)[:-self.window_size]:
+                    del self._cycle_totals[old_cycle]
+        try:
+            with self.span("cycle", f"cycle #{cycle_number}"):
+                yield
+        finally:
+            self._local.cycle = previous
+
+    # ------------------------------------------------------------------
+    # Span recording
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def span(self, kind: str, name: str, trace: bool = True, **args):
+        """
+        Time a block of work.
+
+        Args:
+            kind: Span type used for aggregation (db, gitlab, llm, tool, print, agent, cycle)
+            name: Operation name shown in the trace
+            trace: Also write a trace event (False keeps high-frequency spans aggregate-only)
+            args: Extra attributes stored on the trace event
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, start, time.perf_counter(), trace=trace, **args)
+
+    def record(self, kind: str, name: str, start: float, end: float, trace: bool = True,
+               agent: Optional[str] = None, cycle: Optional[int] = None, **args) -> None:
+        """Record a finished span given perf_counter start/end times"""
+        if not self.enabled:
+            return
+        duration = end - start
+        agent = agent or self.current_agent or "swarm"
+        cycle = cycle if cycle is not None else self.current_cycle
+
+        with self._lock:
+            self._durations[kind].append(duration)
+            self._agent_totals[agent][kind] += duration
+            if cycle is not None and cycle in self._cycle_totals:
+                self._cycle_totals[cycle][kind] += duration
+
+        if trace and self.trace_file:
+            self._write_trace_event({
+                "name": name,
+                "cat": kind,
+                "ph": "X",
+                "ts": round(self._wall_origin_us + (start - self._perf_origin) * 1_000_000),
+                "dur": round(duration * 1_000_000),
+                "pid": self._pid,
+                "tid": threading.get_ident(),
+                "args": {"agent": agent, "cycle": cycle, **args}
+            })
+
+    def _write_trace_event(self, event: Dict[str, Any]) -> None:
+        """Append one trace event as a JSON line"""
+        line = json.dumps(event, default=str)
+        with self._lock:
+            try:
+                if self._trace_handle is None:
+                    trace_dir = os.path.dirname(self.trace_file)
+                    if trace_dir:
+                        os.makedirs(trace_dir, exist_ok=True)
+                    self._trace_handle = open(self.trace_file, 'a', encoding='utf-8')
+                self._trace_handle.write(line + "\n")
+                self._trace_handle.flush()
+            except Exception as e:
+                # Tracing must never break the swarm
+                print(f"⚠️ Could not write profiler trace event: {e}")
+                self.trace_file = None
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _percentile(sorted_values: List[float], percentile: float) -> float:
+        """Nearest-rank percentile of an already sorted list"""
+        if not sorted_values:
+            return 0.0
+        index = max(int(round(percentile / 100.0 * len(sorted_values))) - 1, 0)
+        return sorted_values[min(index, len(sorted_values) - 1)]
+
+    def get_report(self) -> Dict[str, Any]:
+        """Rolling statistics per span type, totals per agent and per recent cycle"""
+        with self._lock:
+            durations = {kind: sorted(values) for kind, values in self._durations.items()}
+            agent_totals = {agent: dict(kinds) for agent, kinds in self._agent_totals.items()}
+            cycle_totals = {cycle: dict(kinds) for cycle, kinds in self._cycle_totals.items()}
+
+        span_stats = {}
+        for kind, values in durations.items():
+            span_stats[kind] = {
+                "count": len(values),
+                "p50_ms": self._percentile(values, 50) * 1000,
+                "p95_ms": self._percentile(values, 95) * 1000,
+                "total_s": sum(values)
+            }
+        return {"spans": span_stats, "agents": agent_totals, "cycles": cycle_totals}
+
+    def format_report(self) -> str:
+        """Human readable rolling report for the console"""
+        if not self.enabled:
+            return "📈 Profiling disabled - set SWARM_PROFILE=true to record cycle timings"
+
+        report = self.get_report()
+        lines = ["📈 SWARM CYCLE PROFILE (rolling window)"]
+        lines.append(f"   {'span':<10} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'total s':>10}")
+        for kind, stats in sorted(report["spans"].items()):
+            lines.append(f"   {kind:<10} {stats['count']:>7} {stats['p50_ms']:>10.1f} "
+                         f"{stats['p95_ms']:>10.1f} {stats['total_s']:>10.2f}")
+
+        if report["agents"]:
+            lines.append("   Time by agent (s):")
+            for agent, kinds in sorted(report["agents"].items()):
+                breakdown = ", ".join(f"{kind}={total:.2f}" for kind, total in sorted(kinds.items()) if kind != "agent")
+                lines.append(f"      • {agent}: {breakdown or 'no spans'}")
+
+        if report["cycles"]:
+            last_cycle = max(report["cycles"])
+            breakdown = ", ".join(f"{kind}={total:.2f}" for kind, total in sorted(report["cycles"][last_cycle].items()))
+            lines.append(f"   Last cycle #{last_cycle} (s): {breakdown}")
+
+        if self.trace_file:
+            lines.append(f"   Trace file: {self.trace_file}")
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        """Flush and close the trace file"""
+        with self._lock:
+            if self._trace_handle is not None:
+                self._trace_handle.close()
+                self._trace_handle = None
+
+
+class ProfilerCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler that records LLM calls as profiler spans"""
+
+    def __init__(self, profiler: CycleProfiler):
+        self.profiler = profiler
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> None:
+        if not self.profiler.enabled:
+            return
+        invocation = kwargs.get("invocation_params") or {}
+        model = invocation.get("model") or invocation.get("azure_deployment") or invocation.get("model_name")
+        if not model and serialized:
+            model = (serialized.get("kwargs") or {}).get("azure_deployment")
+        with self._lock:
+            self._runs[run_id] = {
+                "start": time.perf_counter(),
+                "model": model or "llm",
+                "agent": self.profiler.current_agent,
+                "cycle": self.profiler.current_cycle
+            }
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, serialized, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, serialized, kwargs)
+
+    def _finish(self, run_id: UUID, status: str) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        self.profiler.record("llm", str(run["model"]), run["start"], time.perf_counter(),
+                             agent=run["agent"], cycle=run["cycle"], status=status)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "ok")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, f"error: {type(error).__name__}")
+
+
+def profile_methods(kind: str, include_private: bool = False) -> Callable[[type], type]:
+    """
+    Class decorator that wraps every public method in a profiler span.
+
+    Example:
+        @profile_methods("db")
+        class KnowledgeBaseOperations: ...
+    """
+    def decorator(cls: type) -> type:
+        for attr_name, attr in list(vars(cls).items()):
+            if not callable(attr) or isinstance(attr, (staticmethod, classmethod, type)):
+                continue
+            if attr_name.startswith("__") or (attr_name.startswith("_") and not include_private):
+                continue
+            setattr(cls, attr_name, _profiled_method(kind, f"{cls.__name__}.{attr_name}", attr))
+        return cls
+    return decorator
+
+
+def profile_toolkit(toolkit_cls: type) -> type:
+    """Wrap `_run` of every LangChain tool class nested in a toolkit class in a "tool" span"""
+    for attr_name, attr in list(vars(toolkit_cls).items()):
+        if isinstance(attr, type) and "_run" in vars(attr):
+            attr._run = _profiled_method("tool", attr_name, vars(attr)["_run"])
+    return toolkit_cls
+
+
+def _profiled_method(kind: str, span_name: str, method: Callable) -> Callable:
+    """Wrap a function so calls are timed when profiling is enabled"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not cycle_profiler.enabled:
+            return method(*args, **kwargs)
+        with cycle_profiler.span(kind, span_name):
+            return method(*args, **kwargs)
+    return wrapper
+
+
+def export_chrome_trace(jsonl_path: str, output_path: str) -> int:
+    """Convert a JSON-lines trace file into a Chrome trace JSON document; returns the event count"""
+    events = []
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
+
+
+# Global instance
+cycle_profiler = CycleProfiler.from_env()
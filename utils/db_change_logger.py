@@ -4,11 +4,35 @@ Logs all database modifications to the console with timestamps and details
 """
 
 import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List
 
 class DatabaseChangeLogger:
     """Centralized logging for all database changes"""
     
+    # In-process subscribers notified of every logged change (operation, entity_type, entity_id, details)
+    _listeners: List[Callable[[str, str, Optional[str], Dict[str, Any]], None]] = []
+    
+    @staticmethod
+    def add_listener(listener: Callable[[str, str, Optional[str], Dict[str, Any]], None]) -> None:
+        """Register a callback that receives every database change event"""
+        if listener not in DatabaseChangeLogger._listeners:
+            DatabaseChangeLogger._listeners.append(listener)
+    
+    @staticmethod
+    def remove_listener(listener: Callable[[str, str, Optional[str], Dict[str, Any]], None]) -> None:
+        """Unregister a previously added change callback"""
+        if listener in DatabaseChangeLogger._listeners:
+            DatabaseChangeLogger._listeners.remove(listener)
+    
+    @staticmethod
+    def _notify_listeners(operation: str, entity_type: str, entity_id: Optional[str], details: Dict[str, Any]) -> None:
+        """Forward a change event to subscribers; a failing listener never breaks the DB operation"""
+        for listener in list(DatabaseChangeLogger._listeners):
+            try:
+                listener(operation, entity_type, entity_id, details)
+            except Exception as e:
+                print(f"⚠️ DatabaseChangeLogger listener failed: {e}")
+    
     @staticmethod
     def _get_timestamp() -> str:
         """Get formatted timestamp for logging"""
@@ -24,6 +48,12 @@ class DatabaseChangeLogger:
         
         return f"[{timestamp}] 📊 DB_CHANGE: {operation} {entity_type.upper()}{entity_info}{details_part}"
     
+    @staticmethod
+    def _log_change(operation: str, entity_type: str, entity_id: Optional[str], details: Dict[str, Any]) -> None:
+        """Print a database change and notify change listeners"""
+        print(DatabaseChangeLogger._format_log_message(operation, entity_type, entity_id, details))
+        DatabaseChangeLogger._notify_listeners(operation, entity_type, entity_id, details)
+    
     @staticmethod
     def log_knowledge_base_insert(kb_id: str, name: str, description: Optional[str] = None):
         """Log knowledge base creation"""
@@ -31,8 +61,7 @@ class DatabaseChangeLogger:
         if description:
             details["description"] = description[:50] + "..." if len(description) > 50 else description
         
-        message = DatabaseChangeLogger._format_log_message("CREATE", "Knowledge Base", kb_id, details)
-        print(message)
+        DatabaseChangeLogger._log_change("CREATE", "Knowledge Base", kb_id, details)
     
     @staticmethod
     def log_knowledge_base_update(kb_id: str, name: Optional[str] = None, description: Optional[str] = None):
@@ -43,8 +72,7 @@ class DatabaseChangeLogger:
         if description:
             details["description"] = description[:50] + "..." if len(description) > 50 else description
         
-        message = DatabaseChangeLogger._format_log_message("UPDATE", "Knowledge Base", kb_id, details)
-        print(message)
+        DatabaseChangeLogger._log_change("UPDATE", "Knowledge Base", kb_id, details)
     
     @staticmethod
     def log_article_insert(article_id: str, title: str, kb_id: str, parent_id: Optional[str] = None):
@@ -53,13 +81,12 @@ class DatabaseChangeLogger:
         if parent_id:
             details["parent_id"] = parent_id
         
-        message = DatabaseChangeLogger._format_log_message("CREATE", "Article", article_id, details)
-        print(message)
+        DatabaseChangeLogger._log_change("CREATE", "Article", article_id, details)
     
     @staticmethod
-    def log_article_update(article_id: str, title: Optional[str] = None, content: Optional[str] = None, parent_id: Optional[str] = None):
+    def log_article_update(article_id: str, title: Optional[str] = None, content: Optional[str] = None, parent_id: Optional[str] = None, kb_id: Optional[str] = None):
         """Log article update"""
-        details = {}
+        details = {"kb_id": kb_id}
         if title:
             details["title"] = title
         if content:
@@ -67,44 +94,39 @@ class DatabaseChangeLogger:
         if parent_id:
             details["parent_id"] = parent_id
         
-        message = DatabaseChangeLogger._format_log_message("UPDATE", "Article", article_id, details)
-        print(message)
+        DatabaseChangeLogger._log_change("UPDATE", "Article", article_id, details)
     
     @staticmethod
-    def log_tag_insert(tag_id: str, name: str, description: Optional[str] = None):
+    def log_tag_insert(tag_id: str, name: str, description: Optional[str] = None, kb_id: Optional[str] = None):
         """Log tag creation"""
-        details = {"name": name}
+        details = {"name": name, "kb_id": kb_id}
         if description:
             details["description"] = description[:30] + "..." if len(description) > 30 else description
         
-        message = DatabaseChangeLogger._format_log_message("CREATE", "Tag", tag_id, details)
-        print(message)
+        DatabaseChangeLogger._log_change("CREATE", "Tag", tag_id, details)
     
     @staticmethod
-    def log_tag_update(tag_id: str, name: Optional[str] = None, description: Optional[str] = None):
+    def log_tag_update(tag_id: str, name: Optional[str] = None, description: Optional[str] = None, kb_id: Optional[str] = None):
         """Log tag update"""
-        details = {}
+        details = {"kb_id": kb_id}
         if name:
             details["name"] = name
         if description:
             details["description"] = description[:30] + "..." if len(description) > 30 else description
         
-        message = DatabaseChangeLogger._format_log_message("UPDATE", "Tag", tag_id, details)
-        print(message)
+        DatabaseChangeLogger._log_change("UPDATE", "Tag", tag_id, details)
     
     @staticmethod
     def log_tag_delete(tag_id: str, name: Optional[str] = None):
         """Log tag deletion"""
         details = {"name": name} if name else {}
-        message = DatabaseChangeLogger._format_log_message("DELETE", "Tag", tag_id, details)
-        print(message)
+        DatabaseChangeLogger._log_change("DELETE", "Tag", tag_id, details)
     
     @staticmethod
     def log_tag_article_association(article_id: str, tag_id: str, operation: str = "ADD"):
         """Log tag-article association changes"""
         details = {"tag_id": tag_id, "article_id": article_id}
-        message = DatabaseChangeLogger._format_log_message(f"{operation}_TAG_ASSOCIATION", "Article", article_id, details)
-        print(message)
+        DatabaseChangeLogger._log_change(f"{operation}_TAG_ASSOCIATION", "Article", article_id, details)
     
     @staticmethod
     def log_error(operation: str, entity_type: str, error_message: str, entity_id: Optional[str] = None):
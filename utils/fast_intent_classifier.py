@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Fast-Path Intent Classifier
+
+Local first tier in front of LLMIntentClassifier that answers obvious messages without an
+LLM round trip:
+- Compiled regex rules for unambiguous command shapes ("use KB 3", "show my last commands")
+- A small n-gram scoring model built from the intent examples (IDF-weighted unigrams/bigrams)
+- Only high-confidence results are returned; ambiguous input returns None and falls through
+- Negated messages always fall through, rules never fire on messages with an action verb, and
+  n-gram matches fall through on action verbs the matched intent's examples never use
+- Tracks the fraction of messages served by the fast path
+"""
+
+import os
+import re
+import math
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+STOPWORDS = {
+    "a", "an", "the", "to", "of", "in", "on", "for", "and", "or", "me", "my", "i", "we", "our",
+    "you", "your", "it", "this", "that", "these", "those", "please", "can", "could", "would",
+    "do", "does", "is", "are", "be", "some", "all", "about", "with", "x", "y", "z"
+}
+
+# Unambiguous command shapes: (intent, pattern, confidence)
+DEFAULT_RULES: List[Tuple[str, str, float]] = [
+    ("set_knowledge_base_context",
+     r"^(?:please\s+)?(?:use|switch\s+to|select|open|change\s+to)\s+(?:the\s+)?(?:kb|knowledge\s*base)\s*(?:#|id\s*)?\d+\s*$", 98.0),
+    ("get_conversation_history",
+     r"^(?:please\s+)?(?:(?:show|list|display|view|give)\s+(?:me\s+)?|what\s+(?:were|are)\s+)"
+     r"(?:(?:my|the)\s+)?(?:last|previous|recent)\s+(?:\d+\s+)?(?:commands?|questions?|messages?|requests?)\s*\??$"
+     r"|^(?:please\s+)?(?:show|view|display)\s+(?:me\s+)?(?:my\s+|the\s+)?conversation\s+history\s*$"
+     r"|^what\s+did\s+i\s+(?:just\s+)?(?:ask|say|type)\b", 95.0),
+    ("retrieve_content",
+     r"^(?:please\s+)?(?:list|show|display|view)\s+(?:me\s+)?(?:all\s+)?(?:the\s+)?(?:current\s+)?"
+     r"(?:articles|categories|content|structure|kb\s+structure)\s*$", 95.0),
+    ("analyze_content_gaps",
+     r"\b(?:content\s+)?gaps?\b.*\b(?:find|identify|analy[sz]e|show|where|what)\b"
+     r"|\b(?:find|identify|analy[sz]e|show)\b.*\bgaps?\b|\bwhat(?:'s|\s+is)\s+missing\b", 92.0),
+    ("search_content",
+     r"^(?:please\s+)?search\s+(?:for\s+)?\S+", 92.0),
+]
+
+# A rule match that also asks for a change is not a lookup ("create an article summarizing recent requests",
+# "show me the gaps and fill them"); the n-gram tier only accepts change verbs its top intent's examples use
+ACTION_VERBS = re.compile(
+    r"\b(?:create|write|rewrite|draft|generate|update|edit|modify|add|insert|delete|remove|publish|build|make"
+    r"|fill|fix|expand|extend|improve|tag|tags|tagged|untag|rename|move|merge|split|reorgani[sz]e|restructure"
+    r"|link|archive|implement)\b",
+    re.IGNORECASE)
+
+# Negated requests ("don't create a new article") are never fast-pathed
+NEGATION = re.compile(r"\b(?:don'?t|do\s+not|doesn'?t|never|not|no|without|stop|cancel)\b", re.IGNORECASE)
+
+
+class FastIntentClassifier:
+    """Rule + n-gram classifier built from an intents dictionary ({name: {"examples": [...]}})"""
+
+    def __init__(self, intents: Dict[str, Dict[str, Any]], rules: Optional[List[Tuple[str, str, float]]] = None,
+                 min_score: Optional[float] = None, min_margin: Optional[float] = None, enabled: Optional[bool] = None):
+        """
+        Args:
+            intents: Intent definitions; each intent's "examples" train the n-gram model
+            rules: (intent, regex, confidence) rules checked before n-gram scoring
+            min_score: Minimum share (0-1) of the message's n-gram weight that must match the top intent
+            min_margin: Minimum score gap between the top two intents
+            enabled: Disable to always fall through (INTENT_FAST_PATH_ENABLED)
+        """
+        self.enabled = enabled if enabled is not None else \
+            os.getenv('INTENT_FAST_PATH_ENABLED', 'true').lower() in ('1', 'true', 'yes', 'on')
+        self.min_score = min_score if min_score is not None else float(os.getenv('INTENT_FAST_PATH_MIN_SCORE', '0.8'))
+        self.min_margin = min_margin if min_margin is not None else float(os.getenv('INTENT_FAST_PATH_MIN_MARGIN', '0.5'))
+
+        self._rules = [(intent, re.compile(pattern, re.IGNORECASE), confidence)
+                       for intent, pattern, confidence in (rules if rules is not None else DEFAULT_RULES)
+                       if intent in intents]
+        self._intent_ngrams: Dict[str, Set[str]] = {}
+        self._idf: Dict[str, float] = {}
+        self._build_model(intents)
+
+        self._lock = threading.Lock()
+        self.stats = {"total": 0, "rule_hits": 0, "ngram_hits": 0, "fallthrough": 0}
+
+    @staticmethod
+    def _ngrams(text: str) -> Set[str]:
+        tokens = [token for token in re.findall(r"[a-z0-9']+", text.lower()) if token not in STOPWORDS]
+        grams = set(tokens)
+        grams.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+        return grams
+
+    def _build_model(self, intents: Dict[str, Dict[str, Any]]) -> None:
+        document_frequency: Dict[str, int] = defaultdict(int)
+        for intent_name, info in intents.items():
+            grams: Set[str] = set()
+            for example in info.get("examples", []):
+                grams |= self._ngrams(example)
+            self._intent_ngrams[intent_name] = grams
+            for gram in grams:
+                document_frequency[gram] += 1
+
+        intent_count = max(len(intents), 1)
+        self._idf = {gram: math.log((intent_count + 1) / (frequency + 0.5))
+                     for gram, frequency in document_frequency.items()}
+
+    def classify(self, user_message: str) -> Optional[Tuple[str, float]]:
+        """Return (intent, confidence 0-100) when confident, or None to fall through to the LLM"""
+        if not self.enabled:
+            return None
+        message = user_message.strip()
+
+        if NEGATION.search(message):
+            self._count("fallthrough")
+            return None
+
+        has_action = ACTION_VERBS.search(message) is not None
+        for intent, pattern, confidence in self._rules:
+            if pattern.search(message) and not has_action:
+                self._count("rule_hits")
+                return intent, confidence
+
+        result = self._score_ngrams(message)
+        if result is not None:
+            self._count("ngram_hits")
+            return result
+
+        self._count("fallthrough")
+        return None
+
+    def _score_ngrams(self, message: str) -> Optional[Tuple[str, float]]:
+        grams = self._ngrams(message)
+        known = [gram for gram in grams if gram in self._idf]
+        words = [gram for gram in grams if " " not in gram]
+        known_words = [gram for gram in known if " " not in gram]
+        # Mostly unknown words mean the examples don't cover this phrasing - leave it to the LLM
+        if not words or len(known_words) < len(words) * 0.5:
+            return None
+
+        total_weight = sum(self._idf[gram] for gram in known)
+        if total_weight <= 0:
+            return None
+
+        scores = sorted(
+            ((sum(self._idf[gram] for gram in known if gram in intent_grams) / total_weight, intent)
+             for intent, intent_grams in self._intent_ngrams.items()),
+            reverse=True
+        )
+        best_score, best_intent = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+
+        if best_score < self.min_score or best_score - runner_up < self.min_margin:
+            return None
+        # A change verb outside the intent's examples ("add tags to article 5" is not create_content)
+        verbs = {verb.lower() for verb in ACTION_VERBS.findall(message)}
+        if verbs - self._intent_ngrams[best_intent]:
+            return None
+        return best_intent, round(min(60.0 + 35.0 * best_score, 95.0), 1)
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats["total"] += 1
+            self.stats[stat] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counts per tier and the fraction of messages answered without the LLM"""
+        with self._lock:
+            stats = dict(self.stats)
+        served = stats["rule_hits"] + stats["ngram_hits"]
+        stats["fast_path_fraction"] = round(served / stats["total"], 3) if stats["total"] else 0.0
+        return stats
@@ -0,0 +1,103 @@
+"""
+Graceful Shutdown Coordination for Autonomous Agents
+
+Provides cooperative cancellation for long-running agent work:
+- A process-wide shutdown flag agents check between units of work (e.g. tool calls)
+- A drain timeout: after shutdown is requested, in-flight work gets this long to reach a
+  checkpoint before the main thread is interrupted
+- SIGINT handling: the first Ctrl+C requests a graceful drain, a second Ctrl+C stops immediately
+"""
+
+import os
+import signal
+import threading
+import _thread
+import logging
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ShutdownCoordinator:
+    """Process-wide cooperative cancellation with a drain timeout"""
+
+    def __init__(self, drain_timeout: Optional[float] = None):
+        self.drain_timeout = drain_timeout if drain_timeout is not None else \
+            float(os.getenv('SWARM_DRAIN_TIMEOUT', '120'))
+        self._event = threading.Event()
+        self._drain_timer: Optional[threading.Timer] = None
+        self._previous_sigint_handler = None
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    def is_shutdown_requested(self) -> bool:
+        """True once a graceful shutdown has been requested"""
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep up to timeout seconds; returns True early if shutdown is requested"""
+        return self._event.wait(timeout)
+
+    def on_shutdown(self, callback: Callable[[], None]) -> None:
+        """Call callback when shutdown is requested (e.g. to wake a loop sleeping on its own event)"""
+        if callback not in self._callbacks:
+            self._callbacks.append(callback)
+
+    def request_shutdown(self, reason: str = "requested", start_drain_timer: bool = True) -> None:
+        """Ask in-flight work to checkpoint and stop; interrupt the main thread after the drain timeout"""
+        if self._event.is_set():
+            return
+        self.reason = reason
+        self._event.set()
+        for callback in list(self._callbacks):
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Shutdown callback failed: {e}")
+        logger.info(f"🛑 Graceful shutdown requested ({reason}) - draining in-flight work for up to {self.drain_timeout:.0f}s")
+
+        if start_drain_timer and self.drain_timeout > 0:
+            self._drain_timer = threading.Timer(self.drain_timeout, self._drain_timeout_expired)
+            self._drain_timer.daemon = True
+            self._drain_timer.start()
+
+    def _drain_timeout_expired(self) -> None:
+        """In-flight work did not reach a checkpoint in time - interrupt the main thread"""
+        logger.warning(f"⚠️ Drain timeout of {self.drain_timeout:.0f}s expired - interrupting in-flight work")
+        _thread.interrupt_main()
+
+    def mark_drained(self) -> None:
+        """In-flight work has stopped; cancel the pending drain interrupt"""
+        if self._drain_timer is not None:
+            self._drain_timer.cancel()
+            self._drain_timer = None
+
+    def reset(self) -> None:
+        """Clear the shutdown flag so the swarm can be started again"""
+        self.mark_drained()
+        self._event.clear()
+        self.reason = None
+
+    def install_signal_handlers(self) -> None:
+        """Route SIGINT through the coordinator (main thread only)"""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        self._previous_sigint_handler = signal.signal(signal.SIGINT, self._handle_sigint)
+
+    def restore_signal_handlers(self) -> None:
+        """Restore the SIGINT handler that was active before install_signal_handlers()"""
+        if self._previous_sigint_handler is not None and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self._previous_sigint_handler)
+            self._previous_sigint_handler = None
+
+    def _handle_sigint(self, signum, frame) -> None:
+        """First Ctrl+C drains gracefully, second Ctrl+C interrupts immediately"""
+        if self.is_shutdown_requested():
+            self.mark_drained()
+            raise KeyboardInterrupt
+        print("\n🛑 Shutdown requested - finishing in-flight work (press Ctrl+C again to stop immediately)")
+        self.request_shutdown("SIGINT")
+
+
+# Global instance
+shutdown_coordinator = ShutdownCoordinator()
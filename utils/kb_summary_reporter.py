@@ -0,0 +1,491 @@
+"""
+Knowledge Base Summary Reporter
+
+Keeps the per-cycle knowledge base console summary off the swarm's critical path:
+- Caches the summary per knowledge base as independent sections (KB details, articles, tags, hierarchy, GitLab)
+- Applies DatabaseChangeLogger events to the cached counts and reloads only the sections an event affects
+- Compares a cheap single-query KB fingerprint against the cached counts to catch changes made by other processes
+- Renders only when something changed or on a configurable cycle cadence (which also reloads every section)
+- Runs the check and the render in a background thread
+"""
+
+import os
+import threading
+import logging
+from typing import Any, Dict, Iterable, Optional, Set
+
+from utils.db_change_logger import DatabaseChangeLogger
+from utils.unicode_safe_print import safe_print
+
+logger = logging.getLogger(__name__)
+
+
+# Summary sections in render order; each one is loaded by its own query (or GitLab call)
+SUMMARY_SECTIONS = ("knowledge_base", "articles", "tags", "hierarchy", "gitlab")
+
+
+class KnowledgeBaseSummaryReporter:
+    """Incremental, optional and non-blocking knowledge base summary rendering"""
+
+    def __init__(self,
+                 kb_ops=None,
+                 every_n_cycles: Optional[int] = None,
+                 enabled: Optional[bool] = None,
+                 background: Optional[bool] = None):
+        """
+        Args:
+            kb_ops: KnowledgeBaseOperations instance used for section loads and fingerprint checks
+            every_n_cycles: Fully refresh at least every N cycles even without changes (0 = only on change)
+            enabled: Disable per-cycle summaries entirely when False
+            background: Run checks and rendering in a background thread when True
+        """
+        if kb_ops is None:
+            from operations.knowledge_base_operations import KnowledgeBaseOperations
+            kb_ops = KnowledgeBaseOperations()
+        self.kb_ops = kb_ops
+
+        self.every_n_cycles = every_n_cycles if every_n_cycles is not None else \
+            int(os.getenv('KB_SUMMARY_EVERY_N_CYCLES', '10'))
+        self.enabled = enabled if enabled is not None else \
+            os.getenv('KB_SUMMARY_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        self.background = background if background is not None else \
+            os.getenv('KB_SUMMARY_BACKGROUND', 'true').lower() in ('1', 'true', 'yes')
+
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        # Per-KB state: cached summary sections, sections an event invalidated, cycle of last render,
+        # and change events applied since the last render
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        self._stale_sections: Dict[str, Set[str]] = {}
+        self._last_render_cycle: Dict[str, int] = {}
+        self._pending_changes: Dict[str, int] = {}
+
+        DatabaseChangeLogger.add_listener(self._on_database_change)
+
+    # =============================================
+    # CHANGE EVENTS
+    # =============================================
+
+    def _on_database_change(self, operation: str, entity_type: str, entity_id: Optional[str], details: Dict[str, Any]) -> None:
+        """Apply a change event to the cached summary of the KB it belongs to"""
+        details = details or {}
+        with self._lock:
+            kb_id = self._event_kb_id(entity_type, entity_id, details)
+            summary = self._summaries.get(kb_id) if kb_id else None
+            if summary is None:
+                # Nothing cached for this KB yet - its first render loads everything anyway
+                return
+            stale = self._apply_event(summary, operation, entity_type.lower(), entity_id, details)
+            self._stale_sections.setdefault(kb_id, set()).update(stale)
+            self._pending_changes[kb_id] = self._pending_changes.get(kb_id, 0) + 1
+
+    def _event_kb_id(self, entity_type: str, entity_id: Optional[str], details: Dict[str, Any]) -> Optional[str]:
+        """Work out which KB an event belongs to; tag deletes and tag associations only carry a tag id"""
+        if entity_type.lower() == "knowledge base":
+            return str(entity_id) if entity_id else None
+        if details.get("kb_id"):
+            return str(details["kb_id"])
+        tag_id = details.get("tag_id") or (entity_id if entity_type.lower() == "tag" else None)
+        if tag_id:
+            for kb_id, summary in self._summaries.items():
+                if self._find_tag(summary, tag_id) is not None:
+                    return kb_id
+        return None
+
+    def _apply_event(self, summary: Dict[str, Any], operation: str, entity_type: str,
+                     entity_id: Optional[str], details: Dict[str, Any]) -> Set[str]:
+        """Update cached counts in place and return the sections that need reloading"""
+        if entity_type == "knowledge base":
+            # Name/description are truncated in the event and the GitLab link may have changed
+            return {"knowledge_base", "gitlab"}
+
+        if entity_type == "tag":
+            tags = summary.get("tags")
+            if tags is None:
+                return {"tags"}
+            tag = self._find_tag(summary, entity_id)
+            if operation == "CREATE" and tag is None:
+                tags.append({"id": str(entity_id), "name": details.get("name", ""), "usage_count": 0})
+            elif operation == "UPDATE" and tag is not None and details.get("name"):
+                tag["name"] = details["name"]
+            elif operation == "DELETE" and tag is not None:
+                tags.remove(tag)
+            else:
+                return {"tags"}
+            self._sort_tags(tags)
+            return set()
+
+        if operation.endswith("_TAG_ASSOCIATION"):
+            tag = self._find_tag(summary, details.get("tag_id"))
+            if tag is None:
+                return {"tags"}
+            delta = 1 if operation.startswith("ADD") else -1
+            tag["usage_count"] = max(tag["usage_count"] + delta, 0)
+            self._sort_tags(summary["tags"])
+            return set()
+
+        articles = summary.get("articles")
+        if articles is None:
+            return {"articles", "hierarchy"}
+        roots = articles["roots"]
+        root = next((r for r in roots if r["id"] == str(entity_id)), None)
+        parent_id = details.get("parent_id")
+
+        if operation == "CREATE":
+            articles["total"] += 1
+            if parent_id:
+                articles["child"] += 1
+            else:
+                roots.append({"id": str(entity_id), "title": details.get("title") or "Untitled"})
+            return {"hierarchy"}
+
+        if operation == "UPDATE":
+            if root is not None and parent_id:
+                # Root article moved under a parent
+                roots.remove(root)
+                articles["child"] += 1
+            elif root is None and not parent_id:
+                # Child article moved to the root level
+                roots.append({"id": str(entity_id), "title": details.get("title") or "Untitled"})
+                articles["child"] = max(articles["child"] - 1, 0)
+            elif root is not None and details.get("title"):
+                root["title"] = details["title"]
+            return {"hierarchy"}
+
+        return {"articles", "hierarchy"}
+
+    @staticmethod
+    def _find_tag(summary: Dict[str, Any], tag_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if tag_id is None:
+            return None
+        return next((t for t in summary.get("tags") or [] if t["id"] == str(tag_id)), None)
+
+    @staticmethod
+    def _sort_tags(tags: list) -> None:
+        """Keep the same order as get_tags_with_usage_count (most used first, then by name)"""
+        tags.sort(key=lambda t: (-t["usage_count"], t["name"]))
+
+    # =============================================
+    # SCHEDULING
+    # =============================================
+
+    def request_summary(self, kb_id: str, cycle_number: int, force: bool = False) -> bool:
+        """
+        Schedule a summary check for this cycle without blocking the caller.
+
+        Returns:
+            True if a check was scheduled, False if disabled or a previous check is still running
+        """
+        if not self.enabled and not force:
+            return False
+
+        kb_id = str(kb_id)
+        if not self.background:
+            self._check_and_render(kb_id, cycle_number, force)
+            return True
+
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                logger.debug("KB summary still rendering from a previous cycle - skipping this cycle")
+                return False
+            self._worker = threading.Thread(
+                target=self._check_and_render,
+                args=(kb_id, cycle_number, force),
+                name="kb-summary-reporter",
+                daemon=True
+            )
+            self._worker.start()
+        return True
+
+    def render(self, kb_id: str) -> None:
+        """Reload every section and print the summary now, in the calling thread"""
+        self._refresh(str(kb_id), SUMMARY_SECTIONS)
+
+    def _check_and_render(self, kb_id: str, cycle_number: int, force: bool) -> None:
+        """Render the summary if forced, if the KB changed, or if the cadence is due"""
+        try:
+            reason, sections = self._render_plan(kb_id, cycle_number, force)
+            if not reason:
+                logger.debug(f"KB {kb_id} unchanged since cycle {self._last_render_cycle.get(kb_id)} - summary skipped")
+                return
+
+            logger.info(f"📊 Rendering KB {kb_id} summary ({reason}; reloading: {', '.join(sections) or 'nothing'})")
+            self._refresh(kb_id, sections)
+            with self._lock:
+                self._last_render_cycle[kb_id] = cycle_number
+        except Exception as e:
+            logger.error(f"❌ Error rendering knowledge base summary: {e}")
+
+    def _render_plan(self, kb_id: str, cycle_number: int, force: bool):
+        """Work out why a summary should be rendered and which sections to reload; (None, ()) means skip"""
+        with self._lock:
+            pending = self._pending_changes.pop(kb_id, 0)
+            stale = self._stale_sections.pop(kb_id, set())
+            summary = self._summaries.get(kb_id)
+            counts = self._summary_counts(summary) if summary else None
+            last_render = self._last_render_cycle.get(kb_id)
+
+        if force:
+            return "requested", SUMMARY_SECTIONS
+        if summary is None or last_render is None:
+            return "first summary", SUMMARY_SECTIONS
+        if self.every_n_cycles > 0 and cycle_number - last_render >= self.every_n_cycles:
+            return f"periodic refresh every {self.every_n_cycles} cycles", SUMMARY_SECTIONS
+
+        fingerprint = self.kb_ops.get_knowledge_base_change_fingerprint(kb_id)
+        if fingerprint is None or self._fingerprint_counts(fingerprint) != counts:
+            # Counts the cached summary can't account for were changed by another process
+            return "knowledge base changed outside this process", SUMMARY_SECTIONS
+        if not pending and fingerprint != summary.get("fingerprint"):
+            return "knowledge base updated outside this process", SUMMARY_SECTIONS
+        if pending:
+            with self._lock:
+                summary["fingerprint"] = fingerprint
+            return f"{pending} change event(s) since last summary", tuple(s for s in SUMMARY_SECTIONS if s in stale)
+        return None, ()
+
+    @staticmethod
+    def _summary_counts(summary: Dict[str, Any]) -> Optional[tuple]:
+        articles, tags = summary.get("articles"), summary.get("tags")
+        if articles is None or tags is None:
+            return None
+        return (articles["total"], len(tags), sum(t["usage_count"] for t in tags))
+
+    @staticmethod
+    def _fingerprint_counts(fingerprint: Dict[str, Any]) -> tuple:
+        return (fingerprint.get("article_count"), fingerprint.get("tag_count"), fingerprint.get("tag_association_count"))
+
+    # =============================================
+    # SECTION LOADING AND RENDERING
+    # =============================================
+
+    def _refresh(self, kb_id: str, sections: Iterable[str]) -> None:
+        """Reload the given sections into the cached summary, then print the whole summary"""
+        sections = set(sections)
+        with self._lock:
+            summary = dict(self._summaries.get(kb_id) or {})
+        if sections >= set(SUMMARY_SECTIONS):
+            summary["fingerprint"] = self.kb_ops.get_knowledge_base_change_fingerprint(kb_id)
+
+        if "knowledge_base" in sections or "knowledge_base" not in summary:
+            summary["knowledge_base"] = self.kb_ops.get_knowledge_base_by_id(kb_id)
+        if not summary["knowledge_base"]:
+            self._print_header(kb_id)
+            safe_print(f"❌ Knowledge base with ID {kb_id} not found")
+            return
+
+        # Events that land while a section reloads may be missed or counted twice; the fingerprint
+        # count check on the next cycle catches that drift and triggers a full reload
+        loaded = self._load_sections(kb_id, summary, sections)
+        with self._lock:
+            self._summaries[kb_id] = loaded
+            snapshot = {
+                **loaded,
+                "articles": {**loaded["articles"], "roots": list(loaded["articles"]["roots"])},
+                "tags": [dict(t) for t in loaded["tags"]],
+            }
+        self._print_summary(kb_id, snapshot)
+
+    def _load_sections(self, kb_id: str, summary: Dict[str, Any], sections: Set[str]) -> Dict[str, Any]:
+        """Load the requested (or missing) sections; everything else keeps its cached value"""
+        def wanted(section: str) -> bool:
+            return section in sections or section not in summary
+
+        if wanted("articles"):
+            all_articles = self.kb_ops.get_articles_by_knowledge_base_id(kb_id)
+            root_articles = self.kb_ops.get_root_level_articles(kb_id)
+            summary["articles"] = {
+                "total": len(all_articles),
+                "child": len([article for article in all_articles if article.get('parent_id') is not None]),
+                # Rows are plain tuples: id at index 0, title at index 2
+                "roots": [{"id": str(row[0]), "title": row[2] if len(row) > 2 else "Untitled"} for row in root_articles],
+            }
+
+        if wanted("tags"):
+            summary["tags"] = [
+                {"id": str(tag.id), "name": tag.name, "usage_count": tag.usage_count}
+                for tag in self.kb_ops.get_tags_with_usage_count(kb_id)
+            ]
+
+        if wanted("hierarchy"):
+            try:
+                summary["hierarchy"] = self.kb_ops.get_article_hierarchy(kb_id)
+            except Exception as hierarchy_error:
+                summary["hierarchy"] = hierarchy_error
+
+        if wanted("gitlab"):
+            summary["gitlab"] = self._load_gitlab_section(getattr(summary["knowledge_base"], 'gitlab_project_id', None))
+
+        return summary
+
+    def _load_gitlab_section(self, gitlab_project_id) -> Dict[str, Any]:
+        """Fetch GitLab project details (and an accurate open issue count when the project reports none)"""
+        section: Dict[str, Any] = {"project_id": gitlab_project_id, "details": None, "open_issues": 0, "error": None}
+        if not gitlab_project_id:
+            return section
+        try:
+            from operations.gitlab_operations import GitLabOperations
+            gitlab_ops = GitLabOperations()
+            project_details = gitlab_ops.get_project_details(str(gitlab_project_id))
+            section["details"] = project_details
+            if project_details:
+                open_issues = project_details.get('open_issues_count', 0)
+                # If open_issues_count is not available or is 0, try to get actual count
+                if open_issues == 0:
+                    try:
+                        issues = gitlab_ops.get_project_issues(str(gitlab_project_id), state="opened")
+                        if issues:
+                            open_issues = len(issues)
+                    except Exception as issue_count_error:
+                        logger.debug(f"Could not get accurate issue count: {issue_count_error}")
+                section["open_issues"] = open_issues
+        except Exception as gitlab_error:
+            section["error"] = gitlab_error
+            logger.error(f"GitLab project access error: {gitlab_error}")
+        return section
+
+    @staticmethod
+    def _print_header(kb_id: str) -> None:
+        safe_print("📊 KNOWLEDGE BASE ANALYSIS SUMMARY")
+        safe_print("=" * 80)
+        safe_print(f"🎯 CURRENT KNOWLEDGE BASE CONTEXT: ID {kb_id}")
+        safe_print("")
+
+    def _print_summary(self, kb_id: str, summary: Dict[str, Any]) -> None:
+        """Print the cached summary sections"""
+        self._print_header(kb_id)
+        current_kb = summary["knowledge_base"]
+
+        # Current KB details
+        safe_print(f"📚 KNOWLEDGE BASE: {current_kb.name}")
+        safe_print(f"   ID: {current_kb.id}")
+        safe_print(f"   Description: {current_kb.description[:100]}{'...' if len(current_kb.description) > 100 else ''}")
+        safe_print(f"   Status: {getattr(current_kb, 'status', 'unknown')}")
+        safe_print(f"   GitLab Project: {getattr(current_kb, 'gitlab_project_id', 'Not linked')}")
+        safe_print("-" * 60)
+
+        # Article hierarchy counts
+        articles = summary["articles"]
+        total_articles = articles["total"]
+        root_articles = articles["roots"]
+        child_count = articles["child"]
+
+        safe_print(f"📄 ARTICLE SUMMARY:")
+        safe_print(f"   • Total Articles: {total_articles}")
+        safe_print(f"   • Root Articles: {len(root_articles)}")
+        safe_print(f"   • Sub/Child Articles: {child_count}")
+
+        if root_articles:
+            safe_print(f"   📋 Root Articles:")
+            for j, root_article in enumerate(root_articles, 1):  # Show ALL articles
+                title = root_article["title"]
+                safe_print(f"      {j}. {title[:50]}{'...' if len(title) > 50 else ''}")
+        else:
+            safe_print(f"   📋 No root articles found")
+
+        # Tags with usage count
+        tags_with_usage = summary["tags"]
+        safe_print(f"🏷️ TAG SUMMARY:")
+        safe_print(f"   • Total Tags: {len(tags_with_usage)}")
+
+        if tags_with_usage:
+            # Show top 10 most used tags
+            safe_print(f"   📈 Most Used Tags:")
+            for j, tag in enumerate(tags_with_usage[:10], 1):
+                safe_print(f"      {j}. {tag['name']} (used {tag['usage_count']} times)")
+
+            if len(tags_with_usage) > 10:
+                safe_print(f"      ... and {len(tags_with_usage) - 10} more tags")
+
+            total_tag_usage = sum(tag['usage_count'] for tag in tags_with_usage)
+            unused_tags = len([tag for tag in tags_with_usage if tag['usage_count'] == 0])
+
+            safe_print(f"   📊 Tag Statistics:")
+            safe_print(f"      • Total Tag Applications: {total_tag_usage}")
+            safe_print(f"      • Average Tags per Article: {total_tag_usage / max(total_articles, 1):.1f}")
+            safe_print(f"      • Unused Tags: {unused_tags}")
+        else:
+            safe_print(f"   📊 No tags found for this knowledge base")
+
+        # Article hierarchy structure
+        hierarchy = summary["hierarchy"]
+        if isinstance(hierarchy, Exception):
+            safe_print(f"   ⚠️ Could not load article hierarchy: {hierarchy}")
+        elif hierarchy:
+            safe_print(f"🌳 ARTICLE HIERARCHY STRUCTURE:")
+            # Group by hierarchy level for better visualization
+            levels = {}
+            for article in hierarchy:
+                levels.setdefault(article.get('level', 0), []).append(article)
+
+            for level in sorted(levels.keys())[:3]:  # Show first 3 levels
+                articles_at_level = levels[level]
+                safe_print(f"      Level {level}: {len(articles_at_level)} articles")
+
+                indent = "  " * (level + 1)
+                for article in articles_at_level[:3]:
+                    title = article.get('title', 'Untitled')
+                    safe_print(f"      {indent}• {title[:40]}{'...' if len(title) > 40 else ''}")
+
+                if len(articles_at_level) > 3:
+                    safe_print(f"      {indent}... and {len(articles_at_level) - 3} more")
+        else:
+            safe_print(f"   🌳 No article hierarchy found")
+
+        self._print_gitlab_section(summary["gitlab"])
+
+        # Summary statistics for current KB
+        safe_print("")
+        safe_print("🌟 KNOWLEDGE BASE DATABASE SUMMARY")
+        safe_print("-" * 40)
+        safe_print(f"📚 Knowledge Base: {current_kb.name}")
+        safe_print(f"📄 Total Articles: {total_articles}")
+        safe_print(f"🏷️ Total Tags: {len(tags_with_usage)}")
+        if total_articles > 0:
+            safe_print(f"📊 Content Depth: {child_count}/{total_articles} articles have sub-content ({(child_count/total_articles)*100:.1f}%)")
+        safe_print("-" * 40)
+
+        logger.info("✅ Knowledge base summary completed successfully")
+
+    @staticmethod
+    def _print_gitlab_section(section: Dict[str, Any]) -> None:
+        safe_print(f"🔗 GITLAB PROJECT SUMMARY:")
+        gitlab_project_id = section["project_id"]
+        project_details = section["details"]
+        if not gitlab_project_id:
+            safe_print(f"   📋 No GitLab project linked to this knowledge base")
+            safe_print(f"   💡 Link a GitLab project to enable agent collaboration features")
+        elif section["error"] is not None:
+            safe_print(f"   ❌ Error accessing GitLab project {gitlab_project_id}: {section['error']}")
+        elif not project_details:
+            safe_print(f"   ❌ GitLab project {gitlab_project_id} not accessible or not found")
+        else:
+            safe_print(f"   • Project ID: {gitlab_project_id}")
+            safe_print(f"   • Project Name: {project_details.get('name', 'Unknown')}")
+            safe_print(f"   • Project URL: {project_details.get('web_url', 'Not available')}")
+            safe_print(f"   • Created: {project_details.get('created_at', 'Unknown')}")
+            safe_print(f"   • Last Activity: {project_details.get('last_activity_at', 'Unknown')}")
+            safe_print(f"   • Visibility: {project_details.get('visibility', 'Unknown')}")
+            safe_print(f"   • Default Branch: {project_details.get('default_branch', 'Unknown')}")
+
+            if 'statistics' in project_details:
+                stats = project_details['statistics']
+                safe_print(f"   • Repository Size: {stats.get('repository_size', 0)} bytes")
+                safe_print(f"   • Commit Count: {stats.get('commit_count', 0)}")
+
+            safe_print(f"   • Open Issues: {section['open_issues']}")
+
+            if project_details.get('archived', False):
+                safe_print(f"   ⚠️ Status: Archived")
+            else:
+                safe_print(f"   ✅ Status: Active")
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until any in-flight summary finishes (used on shutdown)"""
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            worker.join(timeout)
+
+    def close(self) -> None:
+        """Stop listening for change events"""
+        DatabaseChangeLogger.remove_listener(self._on_database_change)
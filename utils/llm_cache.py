@@ -0,0 +1,390 @@
+"""
+LLM Response Cache
+
+Caches responses of LLM calls that are effectively pure functions of their input
+(intent classification, supervisor review scoring, ...):
+- Exact tier: keyed by model + prompt hash + tool schema hash
+- Optional similarity tier: near-identical requests (embedding cosine similarity above a
+  threshold) reuse a cached response. Only the varying (non-system) messages are embedded, so the
+  shared system prompt can't make distinct requests look alike; the tier is limited to the
+  namespaces in LLM_CACHE_SIMILARITY_NAMESPACES and skipped for requests that carry numbers (IDs)
+- Pluggable storage: PostgreSQL (shared across processes) or a local SQLite file on disk
+- TTL expiry and size-based eviction (least recently hit entries go first)
+
+Configure with LLM_CACHE_BACKEND=disk|postgres|none, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES,
+LLM_CACHE_DIR, and LLM_CACHE_EMBEDDING_DEPLOYMENT / LLM_CACHE_SIMILARITY_THRESHOLD /
+LLM_CACHE_SIMILARITY_NAMESPACES for the similarity tier.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from utils.llm_usage_ledger import usage_ledger
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCacheBackend(ABC):
+    """Storage interface for cached LLM responses"""
+
+    @abstractmethod
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Unexpired cached response for a key, or None"""
+        pass
+
+    @abstractmethod
+    def set(self, cache_key: str, namespace: str, model: str, response: Dict[str, Any],
+            expires_at: float, embedding: Optional[List[float]] = None) -> None:
+        """Store (or replace) a response with its expiry time and optional embedding"""
+        pass
+
+    @abstractmethod
+    def candidates(self, namespace: str, model: str, limit: int) -> List[Tuple[Dict[str, Any], List[float]]]:
+        """Recent unexpired (response, embedding) pairs for the similarity tier"""
+        pass
+
+    @abstractmethod
+    def evict(self, max_entries: int) -> int:
+        """Remove expired entries and trim to max_entries; returns the number removed"""
+        pass
+
+
+class DiskLLMCacheBackend(LLMCacheBackend):
+    """Local SQLite file; one persistent connection shared by all threads"""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "llm_cache.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_response_cache (
+                cache_key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding TEXT,
+                expires_at REAL NOT NULL,
+                last_hit_at REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_namespace ON llm_response_cache(namespace, model)")
+        self._conn.commit()
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_response_cache WHERE cache_key = ? AND expires_at > ?", (cache_key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE llm_response_cache SET last_hit_at = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+                (now, cache_key)
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, cache_key: str, namespace: str, model: str, response: Dict[str, Any],
+            expires_at: float, embedding: Optional[List[float]] = None) -> None:
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO llm_response_cache
+                    (cache_key, namespace, model, response, embedding, expires_at, last_hit_at, hit_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+            """, (cache_key, namespace, model, json.dumps(response),
+                  json.dumps(embedding) if embedding else None, expires_at, time.time()))
+            self._conn.commit()
+
+    def candidates(self, namespace: str, model: str, limit: int) -> List[Tuple[Dict[str, Any], List[float]]]:
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT response, embedding FROM llm_response_cache
+                WHERE namespace = ? AND model = ? AND embedding IS NOT NULL AND expires_at > ?
+                ORDER BY last_hit_at DESC LIMIT ?
+            """, (namespace, model, time.time(), limit)).fetchall()
+        return [(json.loads(response), json.loads(embedding)) for response, embedding in rows]
+
+    def evict(self, max_entries: int) -> int:
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            removed += self._conn.execute("""
+                DELETE FROM llm_response_cache WHERE cache_key IN (
+                    SELECT cache_key FROM llm_response_cache ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (max_entries,)).rowcount
+            self._conn.commit()
+        return removed
+
+
+class PostgresLLMCacheBackend(LLMCacheBackend):
+    """PostgreSQL table shared by every process using the same database"""
+
+    def __init__(self):
+        from utils.database_manager import db_manager
+        from utils.schema_migrations import schema_migrator
+        self.db = db_manager
+        # The cache table is created by schema migration 4
+        schema_migrator.ensure_current()
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        with self.db.get_cursor() as (conn, cursor):
+            cursor.execute("""
+                UPDATE llm_response_cache
+                SET last_hit_at = CURRENT_TIMESTAMP, hit_count = hit_count + 1
+                WHERE cache_key = %s AND expires_at > CURRENT_TIMESTAMP
+                RETURNING response
+            """, (cache_key,))
+            row = cursor.fetchone()
+            conn.commit()
+        return row['response'] if row else None
+
+    def set(self, cache_key: str, namespace: str, model: str, response: Dict[str, Any],
+            expires_at: float, embedding: Optional[List[float]] = None) -> None:
+        from psycopg2.extras import Json
+        with self.db.get_cursor(dict_cursor=False) as (conn, cursor):
+            cursor.execute("""
+                INSERT INTO llm_response_cache (cache_key, namespace, model, response, embedding, expires_at)
+                VALUES (%s, %s, %s, %s, %s, to_timestamp(%s))
+                ON CONFLICT (cache_key) DO UPDATE
+                SET response = EXCLUDED.response,
+                    embedding = EXCLUDED.embedding,
+                    expires_at = EXCLUDED.expires_at,
+                    last_hit_at = CURRENT_TIMESTAMP
+            """, (cache_key, namespace, model, Json(response), Json(embedding) if embedding else None, expires_at))
+            conn.commit()
+
+    def candidates(self, namespace: str, model: str, limit: int) -> List[Tuple[Dict[str, Any], List[float]]]:
+        with self.db.get_cursor() as (conn, cursor):
+            cursor.execute("""
+                SELECT response, embedding FROM llm_response_cache
+                WHERE namespace = %s AND model = %s AND embedding IS NOT NULL AND expires_at > CURRENT_TIMESTAMP
+                ORDER BY last_hit_at DESC LIMIT %s
+            """, (namespace, model, limit))
+            return [(row['response'], row['embedding']) for row in cursor.fetchall()]
+
+    def evict(self, max_entries: int) -> int:
+        with self.db.get_cursor(dict_cursor=False) as (conn, cursor):
+            cursor.execute("DELETE FROM llm_response_cache WHERE expires_at <= CURRENT_TIMESTAMP")
+            removed = cursor.rowcount
+            cursor.execute("""
+                DELETE FROM llm_response_cache WHERE cache_key IN (
+                    SELECT cache_key FROM llm_response_cache ORDER BY last_hit_at DESC OFFSET %s
+                )
+            """, (max_entries,))
+            removed += cursor.rowcount
+            conn.commit()
+        return removed
+
+
+class LLMCache:
+    """Read-through cache around llm.invoke() for deterministic calls"""
+
+    def __init__(self, backend: Optional[LLMCacheBackend], ttl_seconds: float = 86400, max_entries: int = 5000,
+                 embeddings=None, similarity_threshold: float = 0.97, similarity_candidates: int = 200,
+                 similarity_namespaces: Sequence[str] = ("intent_classification",), evict_every: int = 100):
+        """
+        Args:
+            backend: Storage backend (None disables caching)
+            ttl_seconds: Lifetime of a cached response
+            max_entries: Size bound enforced by eviction
+            embeddings: Optional LangChain Embeddings for the similarity tier
+            similarity_threshold: Minimum cosine similarity for a near-identical hit
+            similarity_candidates: Recent entries compared in the similarity tier
+            similarity_namespaces: Namespaces whose requests may be served by the similarity tier
+            evict_every: Run eviction after this many writes
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.similarity_candidates = similarity_candidates
+        self.similarity_namespaces = set(similarity_namespaces)
+        self.evict_every = evict_every
+
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "similar_hits": 0, "misses": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls) -> "LLMCache":
+        backend_name = os.getenv('LLM_CACHE_BACKEND', 'disk').lower()
+        backend = None
+        try:
+            if backend_name == 'postgres':
+                backend = PostgresLLMCacheBackend()
+            elif backend_name == 'disk':
+                backend = DiskLLMCacheBackend(os.getenv('LLM_CACHE_DIR', 'cache'))
+        except Exception as e:
+            logger.warning(f"⚠️ LLM cache backend '{backend_name}' unavailable, caching disabled: {e}")
+
+        embeddings = None
+        embedding_deployment = os.getenv('LLM_CACHE_EMBEDDING_DEPLOYMENT')
+        if backend is not None and embedding_deployment:
+            from langchain_openai import AzureOpenAIEmbeddings
+            embeddings = AzureOpenAIEmbeddings(
+                azure_deployment=embedding_deployment,
+                azure_endpoint=os.getenv('OPENAI_API_ENDPOINT'),
+                api_version=os.getenv('OPENAI_API_VERSION')
+            )
+
+        return cls(
+            backend,
+            ttl_seconds=float(os.getenv('LLM_CACHE_TTL_SECONDS', '86400')),
+            max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000')),
+            embeddings=embeddings,
+            similarity_threshold=float(os.getenv('LLM_CACHE_SIMILARITY_THRESHOLD', '0.97')),
+            similarity_namespaces=[namespace.strip() for namespace in
+                                   os.getenv('LLM_CACHE_SIMILARITY_NAMESPACES', 'intent_classification').split(',')
+                                   if namespace.strip()]
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def model_name(llm) -> str:
+        """Deployment/model identifier of a chat model (or a tool-bound wrapper around one)"""
+        bound = getattr(llm, 'bound', llm)
+        return str(getattr(bound, 'azure_deployment', None) or getattr(bound, 'model_name', None) or type(bound).__name__)
+
+    @staticmethod
+    def prompt_text(messages: Sequence[BaseMessage]) -> str:
+        return "\n".join(f"{message.type}: {message.content}" for message in messages)
+
+    @staticmethod
+    def similarity_text(messages: Sequence[BaseMessage]) -> str:
+        """The varying part of a request: every message except the (shared) system prompts"""
+        return "\n".join(f"{message.type}: {message.content}" for message in messages if message.type != "system")
+
+    def _similarity_applies(self, namespace: str, text: str) -> bool:
+        # Requests that differ only in an ID or count must never share an answer
+        return self.embeddings is not None and namespace in self.similarity_namespaces and not re.search(r"\d", text)
+
+    @staticmethod
+    def make_key(model: str, messages: Sequence[BaseMessage], tools: Optional[Sequence[Any]] = None) -> str:
+        """sha256 over model, prompt hash and tool schema hash"""
+        prompt_hash = hashlib.sha256(LLMCache.prompt_text(messages).encode("utf-8")).hexdigest()
+        tool_schema = json.dumps(
+            [getattr(tool, 'name', str(tool)) + ":" + json.dumps(getattr(tool, 'args', {}), sort_keys=True, default=str)
+             for tool in (tools or [])],
+            sort_keys=True
+        )
+        tool_hash = hashlib.sha256(tool_schema.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{model}|{prompt_hash}|{tool_hash}".encode("utf-8")).hexdigest()
+
+    def invoke(self, llm, messages: Sequence[BaseMessage], namespace: str = "default",
+               tools: Optional[Sequence[Any]] = None) -> AIMessage:
+        """Return a cached response for these messages, or call llm.invoke() and cache the result"""
+        if not self.enabled:
+            return llm.invoke(messages)
+
+        model = self.model_name(llm)
+        cache_key = self.make_key(model, messages, tools)
+        embedding = None
+
+        try:
+            cached = self.backend.get(cache_key)
+            if cached is not None:
+                self._count("hits")
+                usage_ledger.record_cache_hit(model, namespace)
+                return self._to_message(cached)
+
+            similarity_text = self.similarity_text(messages)
+            if self._similarity_applies(namespace, similarity_text):
+                embedding = self.embeddings.embed_query(similarity_text)
+                similar = self._find_similar(namespace, model, embedding)
+                if similar is not None:
+                    self._count("similar_hits")
+                    usage_ledger.record_cache_hit(model, namespace)
+                    return self._to_message(similar)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"LLM cache lookup failed ({namespace}): {e}")
+
+        self._count("misses")
+        response = llm.invoke(messages)
+
+        try:
+            self.backend.set(cache_key, namespace, model, self._to_record(response),
+                             time.time() + self.ttl_seconds, embedding)
+            with self._lock:
+                self._writes += 1
+                run_eviction = self._writes % self.evict_every == 0
+            if run_eviction:
+                removed = self.backend.evict(self.max_entries)
+                if removed:
+                    logger.debug(f"LLM cache evicted {removed} entries")
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"LLM cache store failed ({namespace}): {e}")
+
+        return response
+
+    def _find_similar(self, namespace: str, model: str, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        best, best_score = None, self.similarity_threshold
+        for response, candidate in self.backend.candidates(namespace, model, self.similarity_candidates):
+            score = self._cosine(embedding, candidate)
+            if score >= best_score:
+                best, best_score = response, score
+        return best
+
+    @staticmethod
+    def _cosine(a: List[float], b: List[float]) -> float:
+        if len(a) != len(b):
+            return 0.0
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+
+    @staticmethod
+    def _to_record(response) -> Dict[str, Any]:
+        return {
+            "content": getattr(response, 'content', str(response)),
+            "tool_calls": list(getattr(response, 'tool_calls', None) or [])
+        }
+
+    @staticmethod
+    def _to_message(record: Dict[str, Any]) -> AIMessage:
+        return AIMessage(content=record.get("content", ""), tool_calls=record.get("tool_calls", []))
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["similar_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["similar_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide cache, created from the environment on first use"""
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMCache.from_env()
+    return _llm_cache
@@ -0,0 +1,310 @@
+"""
+LLM Gateway - Shared Azure OpenAI Clients
+
+Single owner of the chat model clients used across the application:
+- One AzureChatOpenAI instance per deployment/configuration, built once and reused
+- Pooled keep-alive HTTP connections per deployment (shared by all agents and entry points)
+- Per-deployment concurrency limits enforced around every LLM call
+- Health tracking with primary → backup routing, so failover uses a pre-built client
+  instead of constructing one (and opening a cold connection) on the critical path
+- Token usage of every call recorded in the LLM usage ledger
+
+Deployments come from OPENAI_API_MODEL_DEPLOYMENT_NAME (primary) and
+OPENAI_API_BACKUP_MODEL_DEPLOYMENT_NAME (backup); limits and health thresholds from LLM_GATEWAY_*.
+"""
+
+import os
+import time
+import asyncio
+import threading
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import Runnable
+from langchain_openai import AzureChatOpenAI
+
+from utils.llm_usage_ledger import usage_ledger, UsageLedgerCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeploymentConfig:
+    """Connection settings and limits for one Azure OpenAI deployment"""
+    role: str
+    azure_deployment: str
+    azure_endpoint: Optional[str]
+    api_version: Optional[str]
+    api_key: Optional[str] = None
+    max_concurrency: int = 8
+    max_connections: int = 20
+    default_kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class DeploymentHealth:
+    """Rolling health of a deployment, used for primary/backup routing"""
+    consecutive_failures: int = 0
+    total_calls: int = 0
+    total_failures: int = 0
+    in_flight: int = 0
+    unhealthy_until: float = 0.0
+    last_error: Optional[str] = None
+    avg_latency_seconds: Optional[float] = None
+
+    def is_healthy(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self.unhealthy_until
+
+
+class GatewayCallbackHandler(BaseCallbackHandler):
+    """Enforces a deployment's concurrency limit and records call outcomes for health routing"""
+
+    def __init__(self, gateway: "LLMGateway", role: str):
+        self.gateway = gateway
+        self.role = role
+        self._runs: Dict[UUID, float] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID) -> None:
+        self.gateway._acquire(self.role)
+        with self._lock:
+            self._runs[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def _finish(self, run_id: UUID, error: Optional[BaseException]) -> None:
+        with self._lock:
+            started = self._runs.pop(run_id, None)
+        if started is None:
+            return
+        self.gateway._release(self.role, time.perf_counter() - started, error)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, None)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, error)
+
+
+class LLMGateway:
+    """Owns pooled chat model clients per deployment and routes between primary and backup"""
+
+    def __init__(self, failure_threshold: Optional[int] = None, cooldown_seconds: Optional[float] = None):
+        self.failure_threshold = failure_threshold or int(os.getenv('LLM_GATEWAY_FAILURE_THRESHOLD', '3'))
+        self.cooldown_seconds = cooldown_seconds if cooldown_seconds is not None else \
+            float(os.getenv('LLM_GATEWAY_COOLDOWN_SECONDS', '60'))
+
+        self._configs: Dict[str, DeploymentConfig] = {}
+        self._health: Dict[str, DeploymentHealth] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._http_clients: Dict[str, httpx.Client] = {}
+        self._async_http_clients: Dict[str, httpx.AsyncClient] = {}
+        self._handlers: Dict[str, GatewayCallbackHandler] = {}
+        self._usage_handlers: Dict[str, UsageLedgerCallbackHandler] = {}
+        # Process-wide handlers (profiler, prompt stats) attached to every client the gateway builds
+        self._shared_callbacks: List[BaseCallbackHandler] = []
+        self._llms: Dict[tuple, AzureChatOpenAI] = {}
+        self._lock = threading.RLock()
+        self._configured = False
+
+    def _ensure_configured(self) -> None:
+        """Read deployments from the environment on first use (after load_dotenv has run)"""
+        if self._configured:
+            return
+        with self._lock:
+            if self._configured:
+                return
+            endpoint = os.getenv('OPENAI_API_ENDPOINT')
+            api_version = os.getenv('OPENAI_API_VERSION')
+            api_key = os.getenv('OPENAI_API_KEY')
+            self.register(DeploymentConfig(
+                role="primary",
+                azure_deployment=os.getenv('OPENAI_API_MODEL_DEPLOYMENT_NAME'),
+                azure_endpoint=endpoint,
+                api_version=api_version,
+                api_key=api_key,
+                max_concurrency=int(os.getenv('LLM_GATEWAY_PRIMARY_MAX_CONCURRENCY', '8')),
+                max_connections=int(os.getenv('LLM_GATEWAY_MAX_CONNECTIONS', '20'))
+            ))
+            self.register(DeploymentConfig(
+                role="backup",
+                azure_deployment=os.getenv('OPENAI_API_BACKUP_MODEL_DEPLOYMENT_NAME', 'gpt-4o'),
+                azure_endpoint=endpoint,
+                api_version=api_version,
+                api_key=api_key,
+                max_concurrency=int(os.getenv('LLM_GATEWAY_BACKUP_MAX_CONCURRENCY', '4')),
+                max_connections=int(os.getenv('LLM_GATEWAY_MAX_CONNECTIONS', '20')),
+                default_kwargs={"temperature": 0.1, "model_kwargs": {"max_tokens": 4000}}
+            ))
+            self._configured = True
+
+    def register(self, config: DeploymentConfig) -> None:
+        """Add (or replace) a deployment under a role name such as "primary" or "backup" """
+        with self._lock:
+            self._configs[config.role] = config
+            self._health[config.role] = DeploymentHealth()
+            self._semaphores[config.role] = threading.BoundedSemaphore(max(config.max_concurrency, 1))
+            self._handlers[config.role] = GatewayCallbackHandler(self, config.role)
+            self._usage_handlers[config.role] = UsageLedgerCallbackHandler(usage_ledger, config.role, config.azure_deployment)
+            limits = httpx.Limits(max_connections=config.max_connections,
+                                  max_keepalive_connections=config.max_connections)
+            self._http_clients[config.role] = httpx.Client(limits=limits, timeout=httpx.Timeout(120.0, connect=10.0))
+            self._async_http_clients[config.role] = httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(120.0, connect=10.0))
+            self._llms = {key: llm for key, llm in self._llms.items() if key[0] != config.role}
+
+    def add_callbacks(self, callbacks: List[BaseCallbackHandler]) -> None:
+        """Attach process-wide callback handlers to every client (call once, e.g. at import time).
+
+        Clients already built are dropped from the cache so the next get_llm() includes the handlers.
+        """
+        with self._lock:
+            self._shared_callbacks.extend(cb for cb in callbacks if cb not in self._shared_callbacks)
+            self._llms.clear()
+
+    def get_llm(self, role: str = "primary", streaming: bool = False,
+                callbacks: Optional[List[BaseCallbackHandler]] = None, **overrides: Any) -> Runnable:
+        """Return the shared chat model for a deployment role, building it on first request.
+
+        Instances are cached per (role, streaming, overrides), so every caller asking for the same
+        configuration gets the same client and connection pool. Per-caller callbacks are attached with
+        with_config() instead of being baked into a cached client; the binding does not carry over to
+        bind_tools(), so handlers every tool-calling agent needs belong in add_callbacks().
+        """
+        self._ensure_configured()
+        key = (role, streaming, repr(sorted(overrides.items())))
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is None:
+                config = self._configs[role]
+                kwargs = {**config.default_kwargs, **overrides}
+                if config.api_key:
+                    # Otherwise AzureChatOpenAI falls back to AZURE_OPENAI_API_KEY as before
+                    kwargs.setdefault("api_key", config.api_key)
+                llm = AzureChatOpenAI(
+                    azure_endpoint=config.azure_endpoint,
+                    azure_deployment=config.azure_deployment,
+                    api_version=config.api_version,
+                    streaming=streaming,
+                    http_client=self._http_clients[role],
+                    http_async_client=self._async_http_clients[role],
+                    callbacks=[self._handlers[role], self._usage_handlers[role]] + self._shared_callbacks,
+                    **kwargs
+                )
+                self._llms[key] = llm
+                logger.debug(f"LLM gateway built client for {role} ({config.azure_deployment})")
+        if callbacks:
+            return llm.with_config(callbacks=list(callbacks))
+        return llm
+
+    def deployment_name(self, role: str) -> Optional[str]:
+        self._ensure_configured()
+        return self._configs[role].azure_deployment
+
+    def max_concurrency(self, role: str) -> int:
+        """Concurrent request limit of a deployment role"""
+        self._ensure_configured()
+        return max(self._configs[role].max_concurrency, 1)
+
+    def is_healthy(self, role: str) -> bool:
+        self._ensure_configured()
+        return self._health[role].is_healthy()
+
+    def route(self, preferred: str = "primary", fallback: str = "backup") -> str:
+        """Pick the role to call: the preferred deployment unless it is cooling down after failures"""
+        self._ensure_configured()
+        if self.is_healthy(preferred) or not self.is_healthy(fallback):
+            return preferred
+        logger.info(f"🔀 LLM gateway routing to {fallback}: {preferred} unhealthy "
+                    f"({self._health[preferred].last_error})")
+        return fallback
+
+    def warm_up(self, roles: Optional[List[str]] = None) -> None:
+        """Build clients ahead of time so the first call (or a failover) does not pay construction cost"""
+        self._ensure_configured()
+        for role in roles or list(self._configs):
+            self.get_llm(role)
+
+    def _acquire(self, role: str) -> None:
+        semaphore = self._semaphores[role]
+        if not semaphore.acquire(blocking=False):
+            logger.debug(f"LLM gateway: {role} at concurrency limit, waiting for a slot")
+            semaphore.acquire()
+        with self._lock:
+            self._health[role].in_flight += 1
+
+    def _release(self, role: str, latency_seconds: float, error: Optional[BaseException]) -> None:
+        with self._lock:
+            health = self._health[role]
+            health.in_flight = max(health.in_flight - 1, 0)
+            health.total_calls += 1
+            health.avg_latency_seconds = latency_seconds if health.avg_latency_seconds is None else \
+                0.8 * health.avg_latency_seconds + 0.2 * latency_seconds
+            if error is None:
+                health.consecutive_failures = 0
+                health.unhealthy_until = 0.0
+            else:
+                health.total_failures += 1
+                health.consecutive_failures += 1
+                health.last_error = f"{type(error).__name__}: {str(error)[:200]}"
+                if health.consecutive_failures >= self.failure_threshold:
+                    health.unhealthy_until = time.time() + self.cooldown_seconds
+                    logger.warning(f"⚠️ LLM gateway marked {role} unhealthy for {self.cooldown_seconds:.0f}s "
+                                   f"after {health.consecutive_failures} consecutive failures")
+        self._semaphores[role].release()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Health, concurrency and latency per deployment"""
+        self._ensure_configured()
+        with self._lock:
+            return {
+                role: {
+                    "deployment": config.azure_deployment,
+                    "healthy": self._health[role].is_healthy(),
+                    "in_flight": self._health[role].in_flight,
+                    "max_concurrency": config.max_concurrency,
+                    "total_calls": self._health[role].total_calls,
+                    "total_failures": self._health[role].total_failures,
+                    "consecutive_failures": self._health[role].consecutive_failures,
+                    "avg_latency_seconds": self._health[role].avg_latency_seconds,
+                    "last_error": self._health[role].last_error,
+                }
+                for role, config in self._configs.items()
+            }
+
+    def close(self) -> None:
+        """Close pooled HTTP connections (sync and async)"""
+        with self._lock:
+            for client in self._http_clients.values():
+                client.close()
+            async_clients = list(self._async_http_clients.values())
+            self._http_clients.clear()
+            self._async_http_clients.clear()
+            self._llms.clear()
+            self._configured = False
+        for client in async_clients:
+            self._close_async_client(client)
+
+    @staticmethod
+    def _close_async_client(client: httpx.AsyncClient) -> None:
+        """aclose() on the batch drafting loop that owns the client's connections, if it is running"""
+        from utils.batch_drafting import running_drafting_loop
+        loop = running_drafting_loop()
+        try:
+            if loop is not None:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=10)
+            else:
+                asyncio.run(client.aclose())
+        except Exception as e:
+            logger.warning(f"LLM gateway could not close async HTTP client: {e}")
+
+
+# Global instance
+llm_gateway = LLMGateway()
@@ -5,6 +5,9 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import AzureChatOpenAI
 import json
 
+from utils.llm_cache import get_llm_cache
+from utils.fast_intent_classifier import FastIntentClassifier
+
 
 class LLMIntentClassifier:
     """
@@ -58,6 +61,9 @@ class LLMIntentClassifier:
                 "examples": ["how does this work", "what can you do", "help me understand", "explain this"]
             }
         }
+        
+        # Local first tier: obvious messages are answered without an LLM round trip
+        self.fast_path = FastIntentClassifier(self.intents)
     
     def classify_intent(self, user_message: str, context: Optional[Dict[str, Any]] = None) -> Tuple[str, float]:
         """
@@ -67,6 +73,11 @@ class LLMIntentClassifier:
         if not user_message or not user_message.strip():
             return "general_inquiry", 0.0
         
+        # Fast path: high-confidence rule / n-gram match, ambiguous input falls through to the LLM
+        fast_result = self.fast_path.classify(user_message)
+        if fast_result is not None:
+            return fast_result
+        
         # Create system prompt with intent definitions
         system_prompt = self._create_system_prompt()
         
@@ -80,7 +91,8 @@ class LLMIntentClassifier:
                 HumanMessage(content=user_prompt)
             ]
             
-            response = self.llm.invoke(messages)
+            # Same message + context always classifies the same way - serve repeats from cache
+            response = get_llm_cache().invoke(self.llm, messages, namespace="intent_classification")
             
             # Parse the JSON response
             result = self._parse_llm_response(response.content)
@@ -220,10 +232,15 @@ Respond with valid JSON only:
             "confidence": confidence,
             "intent_description": self.intents.get(intent, {}).get("description", "Unknown intent"),
             "available_intents": list(self.intents.keys()),
+            "fast_path_stats": self.fast_path.get_stats(),
             "system_prompt_length": len(self._create_system_prompt()),
             "user_prompt_length": len(self._create_user_prompt(user_message, context))
         }
     
+    def get_fast_path_stats(self) -> Dict[str, Any]:
+        """Fraction of messages classified locally without calling the LLM"""
+        return self.fast_path.get_stats()
+    
     def get_supported_intents(self) -> List[str]:
         """Get list of all supported intent names"""
         return list(self.intents.keys())
@@ -240,13 +257,10 @@ def test_llm_intent_classifier():
     
     load_dotenv(override=True)
     
-    # Initialize LLM and classifier
-    llm = AzureChatOpenAI(
-        azure_endpoint=os.getenv('OPENAI_API_ENDPOINT'),
-        azure_deployment=os.getenv('OPENAI_API_MODEL_DEPLOYMENT_NAME'),
-        api_version=os.getenv('OPENAI_API_VERSION')
-        # Note: o1 model doesn't support temperature parameter
-    )
+    # Initialize LLM and classifier (shared client from the gateway)
+    # Note: o1 model doesn't support temperature parameter
+    from utils.llm_gateway import llm_gateway
+    llm = llm_gateway.get_llm("primary")
     
     classifier = LLMIntentClassifier(llm)
     
@@ -296,6 +310,7 @@ def test_llm_intent_classifier():
         intent, confidence = classifier.classify_intent(phrase)
         print(f"'{phrase[:50]:<50}' → {intent:<25} ({confidence:5.1f}%)")
     
+    print(f"\n⚡ Fast path: {classifier.get_fast_path_stats()}")
     print("\n" + "=" * 70)
     print("✅ LLM handles natural language understanding automatically!")
     print("✅ No need for manual pattern maintenance or rule updates!")
@@ -0,0 +1,346 @@
+"""
+LLM Usage Ledger
+
+Records every LLM invocation (prompt/completion tokens, latency, model, cache hits) and
+attributes it to the agent, knowledge base and swarm cycle that made it:
+- Records are buffered in memory and written to PostgreSQL (llm_usage_ledger) in batches
+- Rollups per agent / KB / cycle, from the table or from this process's running totals
+- Budgets per agent (tokens per rolling hour) and per swarm cycle; when exceeded the agent is
+  either throttled (skipped) or degraded to a cheaper deployment role
+
+Attribution uses ledger.scope(agent=..., kb_id=...), falling back to the cycle profiler's
+current agent / cycle. Token counts come from the provider's usage data; streamed responses
+without usage data are estimated and flagged.
+
+Configure with LLM_USAGE_FLUSH_SIZE, LLM_BUDGET_AGENT_HOURLY_TOKENS, LLM_BUDGET_CYCLE_TOKENS,
+LLM_BUDGET_ACTION (degrade | throttle) and LLM_BUDGET_DEGRADE_ROLE.
+"""
+
+import os
+import time
+import logging
+import threading
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from psycopg2.extras import execute_values
+
+from utils.database_manager import db_manager
+from utils.schema_migrations import schema_migrator
+from utils.cycle_profiler import cycle_profiler
+from utils.context_window import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_scope: contextvars.ContextVar = contextvars.ContextVar("llm_usage_scope", default={})
+
+
+@dataclass
+class UsageRecord:
+    """One LLM invocation (or cache hit)"""
+    agent_name: Optional[str]
+    kb_id: Optional[int]
+    cycle: Optional[int]
+    role: Optional[str]
+    model: Optional[str]
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: float = 0.0
+    cache_hit: bool = False
+    success: bool = True
+    estimated: bool = False
+    created_at: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class LLMUsageLedger:
+    """Token accounting, rollups and budget enforcement for LLM calls"""
+
+    ROLLUP_COLUMNS = {"agent": "agent_name", "kb": "kb_id", "cycle": "cycle", "model": "model"}
+
+    def __init__(self, flush_size: Optional[int] = None, agent_hourly_budget: Optional[int] = None,
+                 cycle_budget: Optional[int] = None, budget_action: Optional[str] = None,
+                 degrade_role: Optional[str] = None):
+        """
+        Args:
+            flush_size: Buffered records that trigger a batch write
+            agent_hourly_budget: Max tokens per agent over a rolling hour (0 = unlimited)
+            cycle_budget: Max tokens per swarm cycle across all agents (0 = unlimited)
+            budget_action: "degrade" (use degrade_role) or "throttle" (skip the agent's work)
+            degrade_role: Gateway role used while degraded
+        """
+        self.flush_size = flush_size or int(os.getenv('LLM_USAGE_FLUSH_SIZE', '20'))
+        self.agent_hourly_budget = agent_hourly_budget if agent_hourly_budget is not None else \
+            int(os.getenv('LLM_BUDGET_AGENT_HOURLY_TOKENS', '0'))
+        self.cycle_budget = cycle_budget if cycle_budget is not None else int(os.getenv('LLM_BUDGET_CYCLE_TOKENS', '0'))
+        self.budget_action = (budget_action or os.getenv('LLM_BUDGET_ACTION', 'degrade')).lower()
+        self.degrade_role = degrade_role or os.getenv('LLM_BUDGET_DEGRADE_ROLE', 'backup')
+
+        self._buffer: List[UsageRecord] = []
+        self._recent_by_agent: Dict[Optional[str], Deque[Tuple[float, int]]] = defaultdict(deque)
+        self._cycle_tokens: Dict[int, int] = {}
+        self._totals: Dict[Optional[str], Dict[str, Any]] = defaultdict(
+            lambda: {"calls": 0, "cache_hits": 0, "failures": 0, "prompt_tokens": 0,
+                     "completion_tokens": 0, "latency_ms": 0.0}
+        )
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Attribution
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def scope(self, **attributes: Any):
+        """Attribute LLM calls made inside the block (agent, kb_id, cycle); nests and crosses async tasks"""
+        token = _scope.set({**_scope.get(), **{key: value for key, value in attributes.items() if value is not None}})
+        try:
+            yield
+        finally:
+            _scope.reset(token)
+
+    def current_attribution(self) -> Dict[str, Any]:
+        attributes = _scope.get()
+        return {
+            "agent_name": attributes.get("agent") or cycle_profiler.current_agent,
+            "kb_id": attributes.get("kb_id"),
+            "cycle": attributes.get("cycle") if attributes.get("cycle") is not None else cycle_profiler.current_cycle,
+        }
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, record: UsageRecord) -> None:
+        record.created_at = record.created_at or time.time()
+        try:
+            record.kb_id = int(record.kb_id) if record.kb_id is not None else None
+        except (TypeError, ValueError):
+            record.kb_id = None
+        with self._lock:
+            self._buffer.append(record)
+            totals = self._totals[record.agent_name]
+            totals["calls"] += 1
+            totals["cache_hits"] += int(record.cache_hit)
+            totals["failures"] += int(not record.success)
+            totals["prompt_tokens"] += record.prompt_tokens
+            totals["completion_tokens"] += record.completion_tokens
+            totals["latency_ms"] += record.latency_ms
+            if record.total_tokens:
+                self._recent_by_agent[record.agent_name].append((record.created_at, record.total_tokens))
+                if record.cycle is not None:
+                    self._cycle_tokens[record.cycle] = self._cycle_tokens.get(record.cycle, 0) + record.total_tokens
+                    for old_cycle in sorted(self._cycle_tokens)[:-20]:
+                        del self._cycle_tokens[old_cycle]
+            should_flush = len(self._buffer) >= self.flush_size
+        if should_flush:
+            self.flush()
+
+    def record_cache_hit(self, model: Optional[str], namespace: str) -> None:
+        """A response served from the LLM cache: counted as a call with no tokens spent"""
+        self.record(UsageRecord(role=namespace, model=model, cache_hit=True, **self.current_attribution()))
+
+    def _ensure_schema(self) -> None:
+        """The ledger table is created by schema migration 3"""
+        schema_migrator.ensure_current()
+
+    def flush(self) -> int:
+        """Write buffered records in one batch; on failure they stay buffered for the next flush"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        try:
+            self._ensure_schema()
+            with db_manager.get_cursor(dict_cursor=False) as (conn, cursor):
+                execute_values(cursor, """
+                    INSERT INTO llm_usage_ledger (agent_name, kb_id, cycle, role, model, prompt_tokens,
+                        completion_tokens, latency_ms, cache_hit, success, estimated, created_at)
+                    VALUES %s
+                """, [(r.agent_name, r.kb_id, r.cycle, r.role, r.model, r.prompt_tokens, r.completion_tokens,
+                       r.latency_ms, r.cache_hit, r.success, r.estimated, r.created_at) for r in batch],
+                    template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, to_timestamp(%s))")
+                conn.commit()
+            return len(batch)
+        except Exception as e:
+            logger.warning(f"Failed to write {len(batch)} LLM usage records: {e}")
+            with self._lock:
+                # Keep a bounded backlog so a database outage cannot grow memory without limit
+                self._buffer = (batch + self._buffer)[-self.flush_size * 50:]
+            return 0
+
+    # ------------------------------------------------------------------
+    # Budgets
+    # ------------------------------------------------------------------
+
+    def agent_tokens_last_hour(self, agent_name: Optional[str]) -> int:
+        cutoff = time.time() - 3600
+        with self._lock:
+            recent = self._recent_by_agent.get(agent_name)
+            if not recent:
+                return 0
+            while recent and recent[0][0] < cutoff:
+                recent.popleft()
+            return sum(tokens for _, tokens in recent)
+
+    def cycle_tokens(self, cycle: Optional[int]) -> int:
+        with self._lock:
+            return self._cycle_tokens.get(cycle, 0) if cycle is not None else 0
+
+    def over_budget(self, agent_name: Optional[str] = None, cycle: Optional[int] = None) -> Optional[str]:
+        """Reason the agent (or cycle) is over budget, or None"""
+        attribution = self.current_attribution()
+        agent_name = agent_name or attribution["agent_name"]
+        cycle = cycle if cycle is not None else attribution["cycle"]
+        if self.agent_hourly_budget and self.agent_tokens_last_hour(agent_name) >= self.agent_hourly_budget:
+            return f"{agent_name} used {self.agent_tokens_last_hour(agent_name)} tokens in the last hour " \
+                   f"(budget {self.agent_hourly_budget})"
+        if self.cycle_budget and self.cycle_tokens(cycle) >= self.cycle_budget:
+            return f"cycle #{cycle} used {self.cycle_tokens(cycle)} tokens (budget {self.cycle_budget})"
+        return None
+
+    def should_throttle(self, agent_name: Optional[str] = None, cycle: Optional[int] = None) -> bool:
+        """True when over budget and the configured action is to skip work"""
+        return self.budget_action == "throttle" and self.over_budget(agent_name, cycle) is not None
+
+    def preferred_role(self, default_role: str = "primary", agent_name: Optional[str] = None) -> str:
+        """Deployment role to call: the degrade role while over budget (action "degrade")"""
+        if self.budget_action == "degrade" and self.over_budget(agent_name) is not None:
+            return self.degrade_role
+        return default_role
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def get_totals(self) -> Dict[str, Dict[str, Any]]:
+        """Running totals per agent for this process"""
+        with self._lock:
+            report = {}
+            for agent_name, totals in self._totals.items():
+                llm_calls = totals["calls"] - totals["cache_hits"]
+                report[agent_name or "unattributed"] = {
+                    **totals,
+                    "total_tokens": totals["prompt_tokens"] + totals["completion_tokens"],
+                    "avg_latency_ms": round(totals["latency_ms"] / llm_calls, 1) if llm_calls else 0.0,
+                }
+            return report
+
+    def get_rollup(self, by: str = "agent", hours: float = 24) -> List[Dict[str, Any]]:
+        """Persisted usage grouped by agent, kb, cycle or model over the last N hours"""
+        column = self.ROLLUP_COLUMNS[by]
+        self.flush()
+        try:
+            self._ensure_schema()
+            with db_manager.get_cursor() as (conn, cursor):
+                cursor.execute(f"""
+                    SELECT {column} AS key,
+                           COUNT(*) AS calls,
+                           COUNT(*) FILTER (WHERE cache_hit) AS cache_hits,
+                           COUNT(*) FILTER (WHERE NOT success) AS failures,
+                           SUM(prompt_tokens) AS prompt_tokens,
+                           SUM(completion_tokens) AS completion_tokens,
+                           ROUND(AVG(latency_ms) FILTER (WHERE NOT cache_hit)::numeric, 1) AS avg_latency_ms
+                    FROM llm_usage_ledger
+                    WHERE created_at >= NOW() - (%s * INTERVAL '1 hour')
+                    GROUP BY {column}
+                    ORDER BY SUM(prompt_tokens + completion_tokens) DESC
+                """, (hours,))
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Failed to read LLM usage rollup by {by}: {e}")
+            return []
+
+    def format_totals(self) -> str:
+        lines = []
+        for agent_name, totals in sorted(self.get_totals().items(), key=lambda item: -item[1]["total_tokens"]):
+            lines.append(f"   • {agent_name}: {totals['calls']} calls ({totals['cache_hits']} cached), "
+                         f"{totals['prompt_tokens']} prompt + {totals['completion_tokens']} completion tokens, "
+                         f"avg {totals['avg_latency_ms']}ms")
+        return "\n".join(lines) if lines else "   (no LLM calls recorded)"
+
+
+class UsageLedgerCallbackHandler(BaseCallbackHandler):
+    """Records tokens, latency and outcome of every call made through a chat model"""
+
+    def __init__(self, ledger: LLMUsageLedger, role: str, model: Optional[str] = None):
+        self.ledger = ledger
+        self.role = role
+        self.model = model
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_text = "\n".join(str(message.content) for message_list in messages for message in message_list)
+        self._start(run_id, prompt_text)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "\n".join(prompts))
+
+    def _start(self, run_id: UUID, prompt_text: str) -> None:
+        with self._lock:
+            self._runs[run_id] = {
+                "started": time.perf_counter(),
+                "prompt_text": prompt_text,
+                **self.ledger.current_attribution()
+            }
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._pop(run_id)
+        if run is None:
+            return
+        prompt_tokens, completion_tokens, model = self._usage(response)
+        estimated = prompt_tokens is None
+        if estimated:
+            prompt_tokens = estimate_tokens(run["prompt_text"])
+            completion_tokens = sum(estimate_tokens(getattr(generation, 'text', '') or '')
+                                    for generations in response.generations for generation in generations)
+        self._record(run, prompt_tokens, completion_tokens or 0, model, success=True, estimated=estimated)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._pop(run_id)
+        if run is not None:
+            self._record(run, estimate_tokens(run["prompt_text"]), 0, None, success=False, estimated=True)
+
+    def _pop(self, run_id: UUID) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._runs.pop(run_id, None)
+
+    def _usage(self, response) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+        """Provider token usage from llm_output, or from the message usage_metadata when streaming"""
+        llm_output = response.llm_output or {}
+        model = llm_output.get("model_name")
+        token_usage = llm_output.get("token_usage") or {}
+        if token_usage.get("prompt_tokens") is not None:
+            return token_usage["prompt_tokens"], token_usage.get("completion_tokens", 0), model
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+                if usage:
+                    return usage.get("input_tokens", 0), usage.get("output_tokens", 0), model
+        return None, None, model
+
+    def _record(self, run: Dict[str, Any], prompt_tokens: int, completion_tokens: int,
+                model: Optional[str], success: bool, estimated: bool) -> None:
+        self.ledger.record(UsageRecord(
+            agent_name=run["agent_name"],
+            kb_id=run["kb_id"],
+            cycle=run["cycle"],
+            role=self.role,
+            model=model or self.model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_ms=round((time.perf_counter() - run["started"]) * 1000, 1),
+            success=success,
+            estimated=estimated
+        ))
+
+
+usage_ledger = LLMUsageLedger()
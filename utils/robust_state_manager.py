@@ -3,11 +3,23 @@ Robust State Management System for Multi-Agent Knowledge Base
 
 This module provides a centralized, persistent, and validated state management
 system that ensures consistency across user interactions and agent operations.
+
+Persistence uses one SQLite connection per manager in WAL mode with synchronous=NORMAL.
+Only the state components changed since the last save are written, and change-history
+rows recorded inside a state_transaction are inserted in one batch when it commits.
+
+Conversation memory is a bounded ring buffer (STATE_MEMORY_MAX_MESSAGES); messages it evicts
+spill to a conversation_archive table on disk (STATE_MEMORY_ARCHIVE). Transaction checkpoints
+are copy-on-write: they keep references to the current components, and a component is copied
+only when it is first modified inside the transaction.
 """
 
-from typing import Dict, Any, Optional, List, TypedDict, Union
+from typing import Dict, Any, Optional, List, TypedDict, Union, Deque
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
+from collections import deque
+from itertools import islice
+import copy
 import json
 import os
 import sqlite3
@@ -78,53 +90,95 @@ class AgentContext:
 
 @dataclass
 class ConversationMemory:
-    """Structured conversation memory"""
-    messages: List[Dict[str, Any]] = field(default_factory=list)
+    """Structured conversation memory: a bounded ring of recent messages"""
+    messages: Deque[Dict[str, Any]] = field(default_factory=deque)
     context_window: int = 10  # Number of recent messages to keep in active memory
+    max_messages: int = 0  # Ring capacity (0 = context_window * 2)
+    total_messages: int = 0
+    
+    def __post_init__(self):
+        # Also turns the list loaded from JSON back into a ring
+        self.messages = deque(self.messages, maxlen=self.max_messages or self.context_window * 2)
+        self._evicted: List[Dict[str, Any]] = []
     
     def add_message(self, message: Dict[str, Any]):
-        """Add message to memory with automatic pruning"""
+        """Add message to memory; the oldest message is evicted once the ring is full"""
+        if len(self.messages) == self.messages.maxlen:
+            self._evicted.append(self.messages[0])
         self.messages.append({
             **message,
             "timestamp": datetime.now().isoformat()
         })
-        
-        # Keep only recent messages in active memory
-        if len(self.messages) > self.context_window * 2:
-            # Keep recent messages and some historical context
-            self.messages = self.messages[-self.context_window:]
+        self.total_messages += 1
+    
+    def take_evicted(self) -> List[Dict[str, Any]]:
+        """Messages evicted since the last call (for the spill-to-disk archive)"""
+        evicted, self._evicted = self._evicted, []
+        return evicted
     
     def get_recent_context(self, count: int = 5) -> List[Dict[str, Any]]:
         """Get recent conversation context"""
-        return self.messages[-count:] if count <= len(self.messages) else self.messages
+        return list(islice(self.messages, max(len(self.messages) - count, 0), None))
+    
+    def copy(self) -> "ConversationMemory":
+        """Independent copy (bounded by the ring capacity, not the session length)"""
+        memory = ConversationMemory(self.messages, self.context_window, self.messages.maxlen, self.total_messages)
+        memory._evicted = list(self._evicted)
+        return memory
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "messages": list(self.messages),
+            "context_window": self.context_window,
+            "max_messages": self.messages.maxlen,
+            "total_messages": self.total_messages
+        }
 
 class RobustStateManager:
     """
     Centralized state management with persistence, validation, and rollback capabilities
     """
     
-    def __init__(self, session_id: str, persistence_dir: str = "session_data"):
+    def __init__(self, session_id: str, persistence_dir: str = "session_data",
+                 memory_size: Optional[int] = None, archive_messages: Optional[bool] = None):
         self.session_id = session_id
         self.persistence_dir = persistence_dir
         self._lock = threading.RLock()
         
-        # Initialize storage
+        # Conversation ring size and whether evicted messages spill to conversation_archive
+        self.memory_size = memory_size or int(os.getenv('STATE_MEMORY_MAX_MESSAGES', '20'))
+        self.archive_messages = archive_messages if archive_messages is not None else \
+            os.getenv('STATE_MEMORY_ARCHIVE', 'true').lower() == 'true'
+        
+        # Initialize storage: one persistent connection, shared by this manager's threads under _lock
         os.makedirs(persistence_dir, exist_ok=True)
         self.db_path = os.path.join(persistence_dir, "state_storage.db")
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
         self._init_database()
         
         # State components
         self._session_context: Optional[SessionContext] = None
         self._agent_context = AgentContext()
-        self._conversation_memory = ConversationMemory()
+        self._conversation_memory = ConversationMemory(max_messages=self.memory_size)
         self._change_history: List[StateChange] = []
         
+        # Components still shared with the open transaction's checkpoint (copied on first write)
+        self._checkpoint_shared: set = set()
+        
+        # Persistence tracking: components changed since the last save, change rows not yet written
+        self._dirty: set = set()
+        self._pending_changes: List[tuple] = []
+        self._transaction_depth = 0
+        self._row_exists = False
+        
         # Load existing state if available
         self._load_state()
     
     def _init_database(self):
         """Initialize SQLite database for state persistence"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._conn as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS session_states (
                     session_id TEXT PRIMARY KEY,
@@ -149,48 +203,82 @@ class RobustStateManager:
                     FOREIGN KEY (session_id) REFERENCES session_states (session_id)
                 )
             """)
-            conn.commit()
+            
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS conversation_archive (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT,
+                    message TEXT,
+                    archived_at TIMESTAMP
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_conversation_archive_session ON conversation_archive (session_id, id)")
     
     @contextmanager
     def state_transaction(self, agent: Optional[str] = None):
         """Context manager for atomic state operations"""
         with self._lock:
+            # Create a checkpoint before changes
+            checkpoint = self._create_checkpoint()
+            self._transaction_depth += 1
             try:
-                # Create a checkpoint before changes
-                checkpoint = self._create_checkpoint()
                 yield self
-                # Auto-save after successful transaction
-                self._save_state()
             except Exception as e:
                 # Rollback to checkpoint on error
                 logger.error(f"State transaction failed: {e}")
                 self._restore_checkpoint(checkpoint)
                 raise
+            finally:
+                self._transaction_depth -= 1
+            
+            # Auto-save after successful transaction (outermost only)
+            if self._transaction_depth == 0:
+                self._save_state()
     
     def _create_checkpoint(self) -> Dict[str, Any]:
-        """Create a state checkpoint for rollback"""
-        return {
-            "session_context": asdict(self._session_context) if self._session_context else None,
-            "agent_context": asdict(self._agent_context),
-            "conversation_memory": asdict(self._conversation_memory),
+        """Create a copy-on-write state checkpoint for rollback (O(1): references, not copies)"""
+        checkpoint = {
+            "session_context": self._session_context,
+            "agent_context": self._agent_context,
+            "conversation_memory": self._conversation_memory,
+            "checkpoint_shared": set(self._checkpoint_shared),
+            "dirty": set(self._dirty),
+            "pending_changes": len(self._pending_changes),
+            "change_history": len(self._change_history),
             "timestamp": datetime.now()
         }
+        self._checkpoint_shared = {"session_context", "agent_context", "conversation_memory"}
+        return checkpoint
     
     def _restore_checkpoint(self, checkpoint: Dict[str, Any]):
         """Restore state from checkpoint"""
-        if checkpoint["session_context"]:
-            self._session_context = SessionContext(**checkpoint["session_context"])
-        self._agent_context = AgentContext(**checkpoint["agent_context"])
-        self._conversation_memory = ConversationMemory(**checkpoint["conversation_memory"])
+        self._session_context = checkpoint["session_context"]
+        self._agent_context = checkpoint["agent_context"]
+        self._conversation_memory = checkpoint["conversation_memory"]
+        self._checkpoint_shared = checkpoint["checkpoint_shared"]
+        self._dirty = checkpoint["dirty"]
+        del self._pending_changes[checkpoint["pending_changes"]:]
+        del self._change_history[checkpoint["change_history"]:]
+    
+    def _writable(self, component: str):
+        """Return a component safe to modify, copying it first if a checkpoint still references it"""
+        if component in self._checkpoint_shared:
+            self._checkpoint_shared.discard(component)
+            current = getattr(self, f"_{component}")
+            if current is not None:
+                setattr(self, f"_{component}", current.copy() if component == "conversation_memory" else copy.copy(current))
+        return getattr(self, f"_{component}")
     
     def initialize_session(self, knowledge_base_id: Optional[str] = None) -> SessionContext:
         """Initialize or get existing session context"""
         with self._lock:
             if not self._session_context:
+                self._checkpoint_shared.discard("session_context")
                 self._session_context = SessionContext(
                     session_id=self.session_id,
                     knowledge_base_id=knowledge_base_id
                 )
+                self._dirty.add("session_context")
                 self._record_change(StateChangeType.CREATE, "session", None, asdict(self._session_context))
             return self._session_context
     
@@ -200,42 +288,49 @@ class RobustStateManager:
             if not self._session_context:
                 self.initialize_session()
             
-            old_context = asdict(self._session_context)
+            previous_context = self._session_context
+            session_context = copy.copy(previous_context)
+            changes = []
             
             # Update fields
             for key, value in kwargs.items():
-                if hasattr(self._session_context, key):
-                    old_value = getattr(self._session_context, key)
-                    setattr(self._session_context, key, value)
-                    self._record_change(StateChangeType.UPDATE, f"session.{key}", old_value, value)
+                if hasattr(session_context, key):
+                    changes.append((f"session.{key}", getattr(session_context, key), value))
+                    setattr(session_context, key, value)
             
-            # Update timestamp and validate
-            self._session_context.last_updated = datetime.now()
+            # Update timestamp and validate (invalid changes never replace the current context)
+            session_context.last_updated = datetime.now()
             
-            if not self._session_context.validate():
-                # Rollback invalid changes
-                self._session_context = SessionContext(**old_context)
+            if not session_context.validate():
                 raise ValueError("Invalid session context update")
             
+            self._session_context = session_context
+            self._checkpoint_shared.discard("session_context")
+            for key_path, old_value, value in changes:
+                self._record_change(StateChangeType.UPDATE, key_path, old_value, value)
+            
+            self._dirty.add("session_context")
             return self._session_context
     
     def update_agent_context(self, agent: str, **kwargs) -> AgentContext:
         """Update agent context"""
         with self._lock:
-            old_context = asdict(self._agent_context)
+            agent_context = self._writable("agent_context")
             
             for key, value in kwargs.items():
-                if hasattr(self._agent_context, key):
-                    old_value = getattr(self._agent_context, key)
-                    setattr(self._agent_context, key, value)
+                if hasattr(agent_context, key):
+                    old_value = getattr(agent_context, key)
+                    setattr(agent_context, key, value)
                     self._record_change(StateChangeType.UPDATE, f"agent.{key}", old_value, value, agent)
             
+            self._dirty.add("agent_context")
             return self._agent_context
     
     def add_conversation_message(self, message: Dict[str, Any], agent: Optional[str] = None):
         """Add message to conversation memory"""
         with self._lock:
-            self._conversation_memory.add_message(message)
+            self._writable("conversation_memory").add_message(message)
+            self._dirty.add("conversation_memory")
             self._record_change(StateChangeType.CREATE, "conversation.message", None, message, agent)
     
     def get_conversation_context(self, count: int = 5) -> List[Dict[str, Any]]:
@@ -314,56 +409,82 @@ class RobustStateManager:
             session_id=self.session_id
         )
         self._change_history.append(change)
+        self._pending_changes.append((
+            self.session_id,
+            change.timestamp,
+            change.change_type.value,
+            key,
+            json.dumps(old_value, default=str) if old_value is not None else None,
+            json.dumps(new_value, default=str) if new_value is not None else None,
+            agent
+        ))
         
-        # Persist change to database
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
+        # Inside a state_transaction the rows are written in one batch at commit
+        if self._transaction_depth == 0:
+            with self._lock, self._conn:
+                self._write_pending_changes()
+    
+    def _write_pending_changes(self):
+        if self._pending_changes:
+            self._conn.executemany("""
                 INSERT INTO state_changes 
                 (session_id, timestamp, change_type, key_path, old_value, new_value, agent)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                self.session_id,
-                change.timestamp,
-                change.change_type.value,
-                key,
-                json.dumps(old_value, default=str) if old_value is not None else None,
-                json.dumps(new_value, default=str) if new_value is not None else None,
-                agent
-            ))
-            conn.commit()
+            """, self._pending_changes)
+            self._pending_changes = []
     
     def _save_state(self):
-        """Persist current state to database"""
-        with sqlite3.connect(self.db_path) as conn:
-            session_data = asdict(self._session_context) if self._session_context else None
-            agent_data = asdict(self._agent_context)
-            memory_data = asdict(self._conversation_memory)
+        """Persist changed state components and pending change rows in one transaction"""
+        with self._lock, self._conn as conn:
+            if self._dirty:
+                now = datetime.now()
+                if not self._row_exists:
+                    conn.execute("""
+                        INSERT OR IGNORE INTO session_states (session_id, created_at, last_updated)
+                        VALUES (?, ?, ?)
+                    """, (
+                        self.session_id,
+                        self._session_context.created_at if self._session_context else now,
+                        now
+                    ))
+                    self._row_exists = True
+                
+                components = {
+                    "session_context": lambda: json.dumps(asdict(self._session_context), default=str) if self._session_context else None,
+                    "agent_context": lambda: json.dumps(asdict(self._agent_context), default=str),
+                    "conversation_memory": lambda: json.dumps(self._conversation_memory.to_dict(), default=str),
+                }
+                columns = [column for column in components if column in self._dirty]
+                assignments = ", ".join(f"{column} = ?" for column in columns)
+                conn.execute(
+                    f"UPDATE session_states SET {assignments}, last_updated = ? WHERE session_id = ?",
+                    (*(components[column]() for column in columns), now, self.session_id)
+                )
+                self._dirty = set()
             
-            conn.execute("""
-                INSERT OR REPLACE INTO session_states 
-                (session_id, session_context, agent_context, conversation_memory, created_at, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                self.session_id,
-                json.dumps(session_data, default=str) if session_data else None,
-                json.dumps(agent_data, default=str),
-                json.dumps(memory_data, default=str),
-                self._session_context.created_at if self._session_context else datetime.now(),
-                datetime.now()
-            ))
-            conn.commit()
+            # Spill messages evicted from the ring (committed ones only: a rollback discards the copy holding them)
+            evicted = self._conversation_memory.take_evicted()
+            if evicted and self.archive_messages:
+                archived_at = datetime.now()
+                conn.executemany(
+                    "INSERT INTO conversation_archive (session_id, message, archived_at) VALUES (?, ?, ?)",
+                    [(self.session_id, json.dumps(message, default=str), archived_at) for message in evicted]
+                )
+            
+            self._write_pending_changes()
     
     def _load_state(self):
         """Load existing state from database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
+            with self._lock:
+                cursor = self._conn.execute("""
                     SELECT session_context, agent_context, conversation_memory 
                     FROM session_states WHERE session_id = ?
                 """, (self.session_id,))
                 row = cursor.fetchone()
                 
                 if row:
+                    self._row_exists = True
                     session_data, agent_data, memory_data = row
                     
                     if session_data:
@@ -379,7 +500,9 @@ class RobustStateManager:
                         self._agent_context = AgentContext(**agent_dict)
                     
                     if memory_data:
-                        self._conversation_memory = ConversationMemory(**json.loads(memory_data))
+                        memory_dict = json.loads(memory_data)
+                        memory_dict["max_messages"] = self.memory_size
+                        self._conversation_memory = ConversationMemory(**memory_dict)
         
         except Exception as e:
             logger.warning(f"Could not load existing state: {e}")
@@ -393,12 +516,30 @@ class RobustStateManager:
             
             self._session_context = None
             self._agent_context = AgentContext()
-            self._conversation_memory = ConversationMemory()
+            self._conversation_memory = ConversationMemory(max_messages=self.memory_size)
+            
+            self._checkpoint_shared = set()
+            self._dirty = set()
             
             # Clear from database
-            with sqlite3.connect(self.db_path) as conn:
+            with self._conn as conn:
                 conn.execute("DELETE FROM session_states WHERE session_id = ?", (self.session_id,))
-                conn.commit()
+            self._row_exists = False
+    
+    def close(self):
+        """Save outstanding changes and close the SQLite connection"""
+        with self._lock:
+            self._save_state()
+            self._conn.close()
+    
+    def get_archived_messages(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent messages spilled out of the conversation ring, oldest first"""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT message FROM conversation_archive
+                WHERE session_id = ? ORDER BY id DESC LIMIT ?
+            """, (self.session_id, limit)).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
     
     def get_state_summary(self) -> Dict[str, Any]:
         """Get a summary of current state for debugging"""
@@ -408,6 +549,7 @@ class RobustStateManager:
                 "session_context": asdict(self._session_context) if self._session_context else None,
                 "agent_context": asdict(self._agent_context),
                 "conversation_messages": len(self._conversation_memory.messages),
+                "total_conversation_messages": self._conversation_memory.total_messages,
                 "change_history_count": len(self._change_history),
                 "last_updated": self._session_context.last_updated if self._session_context else None
             }
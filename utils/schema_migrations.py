@@ -0,0 +1,394 @@
+"""
+Schema Migrations
+
+Versioned DDL for every PostgreSQL table the agents create (session state, work checkpoints,
+LLM usage ledger, LLM response cache):
+- Applied versions are recorded in the schema_version table
+- apply_pending() runs all newer migrations in one transaction under an advisory lock, so
+  concurrent processes never race on DDL
+- ensure_current() costs one cheap query per process; when the database is behind it applies
+  the pending migrations (STATE_SCHEMA_AUTO_MIGRATE=true, default) or raises
+
+Apply or inspect from the command line with: python -m utils.schema_migrations [--status]
+
+Migrations are append-only: never edit an applied migration, add a new version instead.
+The first migrations are written with IF NOT EXISTS / guarded DO blocks because databases
+created before this module already contain some of the tables.
+"""
+
+import os
+import sys
+import logging
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+from psycopg2 import errors
+
+from utils.database_manager import db_manager
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key shared by every process applying migrations
+MIGRATION_LOCK_KEY = 4_711_045
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One schema version: its number, a short name and the DDL that reaches it"""
+    version: int
+    name: str
+    sql: str
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "session_state_tables", """
+        -- Session state management table
+        CREATE TABLE IF NOT EXISTS session_states (
+            session_id VARCHAR(255) PRIMARY KEY,
+            session_context JSONB NOT NULL DEFAULT '{}',
+            agent_context JSONB NOT NULL DEFAULT '{}',
+            conversation_metadata JSONB NOT NULL DEFAULT '{}',
+            last_message_order INTEGER NOT NULL DEFAULT 0,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Creates the monthly partition of a time-partitioned table that holds month_start
+        CREATE OR REPLACE FUNCTION ensure_monthly_partition(parent_table TEXT, month_start DATE)
+        RETURNS TEXT AS $$
+        DECLARE
+            partition_start DATE := date_trunc('month', month_start)::date;
+            partition_name TEXT := parent_table || '_p' || to_char(partition_start, 'YYYY_MM');
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, parent_table, partition_start, (partition_start + INTERVAL '1 month')::date
+            );
+            RETURN partition_name;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Conversation messages, partitioned by month (converts a pre-partitioning table once)
+        DO $$
+        DECLARE
+            month_start DATE;
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('conversation_messages')) THEN
+                IF to_regclass('conversation_messages') IS NOT NULL THEN
+                    ALTER TABLE conversation_messages RENAME TO conversation_messages_unpartitioned;
+                END IF;
+
+                CREATE TABLE conversation_messages (
+                    id BIGSERIAL,
+                    session_id VARCHAR(255) REFERENCES session_states(session_id) ON DELETE CASCADE,
+                    message_role VARCHAR(50) NOT NULL,
+                    message_content TEXT NOT NULL,
+                    message_metadata JSONB DEFAULT '{}',
+                    agent_name VARCHAR(100),
+                    tool_calls JSONB DEFAULT '[]',
+                    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    message_order INTEGER NOT NULL,
+                    PRIMARY KEY (id, created_at)
+                ) PARTITION BY RANGE (created_at);
+                CREATE TABLE conversation_messages_default PARTITION OF conversation_messages DEFAULT;
+
+                IF to_regclass('conversation_messages_unpartitioned') IS NOT NULL THEN
+                    FOR month_start IN
+                        SELECT DISTINCT date_trunc('month', created_at)::date
+                        FROM conversation_messages_unpartitioned WHERE created_at IS NOT NULL
+                    LOOP
+                        PERFORM ensure_monthly_partition('conversation_messages', month_start);
+                    END LOOP;
+
+                    INSERT INTO conversation_messages
+                    (id, session_id, message_role, message_content, message_metadata, agent_name, tool_calls, created_at, message_order)
+                    SELECT id, session_id, message_role, message_content, message_metadata, agent_name, tool_calls,
+                           COALESCE(created_at, CURRENT_TIMESTAMP), message_order
+                    FROM conversation_messages_unpartitioned;
+                    PERFORM setval(pg_get_serial_sequence('conversation_messages', 'id'),
+                                   COALESCE((SELECT MAX(id) FROM conversation_messages), 0) + 1, false);
+                    DROP TABLE conversation_messages_unpartitioned;
+                END IF;
+            END IF;
+        END $$;
+
+        -- State change audit log, partitioned by month (converts a pre-partitioning table once)
+        DO $$
+        DECLARE
+            month_start DATE;
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('state_audit_log')) THEN
+                IF to_regclass('state_audit_log') IS NOT NULL THEN
+                    ALTER TABLE state_audit_log RENAME TO state_audit_log_unpartitioned;
+                END IF;
+
+                CREATE TABLE state_audit_log (
+                    id BIGSERIAL,
+                    session_id VARCHAR(255) REFERENCES session_states(session_id) ON DELETE CASCADE,
+                    change_type VARCHAR(50) NOT NULL,
+                    change_path VARCHAR(255) NOT NULL,
+                    old_value JSONB,
+                    new_value JSONB,
+                    agent_name VARCHAR(100),
+                    change_timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    correlation_id UUID DEFAULT gen_random_uuid(),
+                    PRIMARY KEY (id, change_timestamp)
+                ) PARTITION BY RANGE (change_timestamp);
+                CREATE TABLE state_audit_log_default PARTITION OF state_audit_log DEFAULT;
+
+                IF to_regclass('state_audit_log_unpartitioned') IS NOT NULL THEN
+                    FOR month_start IN
+                        SELECT DISTINCT date_trunc('month', change_timestamp)::date
+                        FROM state_audit_log_unpartitioned WHERE change_timestamp IS NOT NULL
+                    LOOP
+                        PERFORM ensure_monthly_partition('state_audit_log', month_start);
+                    END LOOP;
+
+                    INSERT INTO state_audit_log
+                    (id, session_id, change_type, change_path, old_value, new_value, agent_name, change_timestamp, correlation_id)
+                    SELECT id, session_id, change_type, change_path, old_value, new_value, agent_name,
+                           COALESCE(change_timestamp, CURRENT_TIMESTAMP), correlation_id
+                    FROM state_audit_log_unpartitioned;
+                    PERFORM setval(pg_get_serial_sequence('state_audit_log', 'id'),
+                                   COALESCE((SELECT MAX(id) FROM state_audit_log), 0) + 1, false);
+                    DROP TABLE state_audit_log_unpartitioned;
+                END IF;
+            END IF;
+        END $$;
+
+        -- Current and next month's partitions (the retention job keeps creating them ahead)
+        SELECT ensure_monthly_partition(parent_table, (date_trunc('month', CURRENT_DATE) + months_ahead * INTERVAL '1 month')::date)
+        FROM unnest(ARRAY['conversation_messages', 'state_audit_log']) AS parent_table,
+             generate_series(0, 1) AS months_ahead;
+
+        -- Per-session message counter for sessions created before it existed
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'session_states' AND column_name = 'last_message_order'
+            ) THEN
+                ALTER TABLE session_states ADD COLUMN last_message_order INTEGER NOT NULL DEFAULT 0;
+                UPDATE session_states s
+                SET last_message_order = m.max_order
+                FROM (
+                    SELECT session_id, MAX(message_order) AS max_order
+                    FROM conversation_messages GROUP BY session_id
+                ) m
+                WHERE m.session_id = s.session_id;
+            END IF;
+        END $$;
+
+        -- Indexes for performance
+        CREATE INDEX IF NOT EXISTS idx_session_states_active ON session_states(is_active, updated_at);
+        CREATE INDEX IF NOT EXISTS idx_conversation_messages_session ON conversation_messages(session_id, message_order);
+        CREATE INDEX IF NOT EXISTS idx_conversation_messages_created ON conversation_messages(created_at);
+        CREATE INDEX IF NOT EXISTS idx_state_audit_session ON state_audit_log(session_id, change_timestamp);
+        CREATE INDEX IF NOT EXISTS idx_session_context_gin ON session_states USING GIN (session_context);
+        CREATE INDEX IF NOT EXISTS idx_agent_context_gin ON session_states USING GIN (agent_context);
+
+        -- Trigger to auto-update the updated_at timestamp
+        CREATE OR REPLACE FUNCTION update_session_updated_at()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.updated_at = CURRENT_TIMESTAMP;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trigger_update_session_timestamp ON session_states;
+        CREATE TRIGGER trigger_update_session_timestamp
+            BEFORE UPDATE ON session_states
+            FOR EACH ROW
+            EXECUTE FUNCTION update_session_updated_at();
+    """),
+    Migration(2, "work_checkpoints", """
+        CREATE TABLE IF NOT EXISTS work_checkpoints (
+            work_key VARCHAR(255) PRIMARY KEY,
+            agent_name VARCHAR(100) NOT NULL,
+            status VARCHAR(50) NOT NULL DEFAULT 'in_progress',
+            checkpoint_data JSONB NOT NULL DEFAULT '{}',
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_work_checkpoints_agent_status
+            ON work_checkpoints(agent_name, status);
+    """),
+    Migration(3, "llm_usage_ledger", """
+        CREATE TABLE IF NOT EXISTS llm_usage_ledger (
+            id BIGSERIAL PRIMARY KEY,
+            agent_name VARCHAR(100),
+            kb_id INTEGER,
+            cycle INTEGER,
+            role VARCHAR(100),
+            model VARCHAR(255),
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            latency_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+            cache_hit BOOLEAN NOT NULL DEFAULT FALSE,
+            success BOOLEAN NOT NULL DEFAULT TRUE,
+            estimated BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_llm_usage_ledger_created ON llm_usage_ledger(created_at);
+        CREATE INDEX IF NOT EXISTS idx_llm_usage_ledger_agent ON llm_usage_ledger(agent_name, created_at);
+    """),
+    Migration(4, "llm_response_cache", """
+        CREATE TABLE IF NOT EXISTS llm_response_cache (
+            cache_key VARCHAR(64) PRIMARY KEY,
+            namespace VARCHAR(100) NOT NULL,
+            model VARCHAR(255) NOT NULL,
+            response JSONB NOT NULL,
+            embedding JSONB,
+            expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            last_hit_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            hit_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_llm_cache_namespace ON llm_response_cache(namespace, model);
+        CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_response_cache(last_hit_at);
+    """),
+    Migration(5, "agent_context_list_tables", """
+        -- The ever-growing agent_context lists live in append-only tables, so updating
+        -- agent_context only rewrites its small scalar fields
+        CREATE TABLE IF NOT EXISTS agent_context_messages (
+            id BIGSERIAL PRIMARY KEY,
+            session_id VARCHAR(255) NOT NULL REFERENCES session_states(session_id) ON DELETE CASCADE,
+            message JSONB NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_agent_context_messages_session ON agent_context_messages(session_id, id);
+
+        CREATE TABLE IF NOT EXISTS processed_workflow_messages (
+            session_id VARCHAR(255) NOT NULL REFERENCES session_states(session_id) ON DELETE CASCADE,
+            message_id TEXT NOT NULL,
+            processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, message_id)
+        );
+
+        -- Move the lists already embedded in agent_context into the new tables
+        INSERT INTO agent_context_messages (session_id, message)
+        SELECT s.session_id, m.message
+        FROM session_states s
+        CROSS JOIN LATERAL jsonb_array_elements(s.agent_context -> 'agent_messages') WITH ORDINALITY AS m(message, position)
+        WHERE jsonb_typeof(s.agent_context -> 'agent_messages') = 'array'
+        ORDER BY s.session_id, m.position;
+
+        INSERT INTO processed_workflow_messages (session_id, message_id)
+        SELECT s.session_id, p.message_id
+        FROM session_states s
+        CROSS JOIN LATERAL jsonb_array_elements_text(s.agent_context -> 'processed_workflow_messages') AS p(message_id)
+        WHERE jsonb_typeof(s.agent_context -> 'processed_workflow_messages') = 'array'
+        ON CONFLICT DO NOTHING;
+
+        UPDATE session_states
+        SET agent_context = agent_context - 'agent_messages' - 'processed_workflow_messages'
+        WHERE agent_context ?| ARRAY['agent_messages', 'processed_workflow_messages'];
+    """),
+    Migration(6, "session_leases", """
+        -- Process that currently serves a session (see utils/session_registry.py)
+        ALTER TABLE session_states ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(255);
+        ALTER TABLE session_states ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;
+    """),
+    Migration(7, "work_checkpoint_leases", """
+        -- Process that is running an in-progress work item (see utils/work_checkpoint_store.py)
+        ALTER TABLE work_checkpoints ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(255);
+        ALTER TABLE work_checkpoints ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;
+    """),
+]
+
+
+class SchemaMigrator:
+    """Applies pending migrations once and verifies the schema version cheaply afterwards"""
+
+    def __init__(self, migrations: List[Migration] = MIGRATIONS, auto_migrate: Optional[bool] = None):
+        """
+        Args:
+            migrations: Ordered migrations (versions must increase)
+            auto_migrate: Apply pending migrations from ensure_current() (STATE_SCHEMA_AUTO_MIGRATE)
+        """
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+        self.auto_migrate = auto_migrate if auto_migrate is not None else \
+            os.getenv('STATE_SCHEMA_AUTO_MIGRATE', 'true').lower() == 'true'
+        self._lock = threading.Lock()
+        self._verified = False
+
+    @property
+    def latest_version(self) -> int:
+        return self.migrations[-1].version if self.migrations else 0
+
+    def current_version(self) -> int:
+        """Highest applied version (0 for a database that has never been migrated)"""
+        try:
+            with db_manager.get_cursor(dict_cursor=False) as (conn, cursor):
+                cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+                return cursor.fetchone()[0]
+        except errors.UndefinedTable:
+            return 0
+
+    def apply_pending(self) -> List[int]:
+        """Apply every migration newer than the database in one transaction; returns applied versions"""
+        applied = []
+        with db_manager.get_connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    # Serialize concurrent migrators; the version is re-read under the lock
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_KEY,))
+                    cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS schema_version (
+                            version INTEGER PRIMARY KEY,
+                            name VARCHAR(255) NOT NULL,
+                            applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+                        )
+                    """)
+                    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+                    current = cursor.fetchone()[0]
+
+                    for migration in self.migrations:
+                        if migration.version <= current:
+                            continue
+                        logger.info(f"Applying schema migration {migration.version}: {migration.name}")
+                        cursor.execute(migration.sql)
+                        cursor.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                                       (migration.version, migration.name))
+                        applied.append(migration.version)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return applied
+
+    def ensure_current(self) -> None:
+        """Verify the schema version once per process, migrating (or raising) when it is behind"""
+        if self._verified:
+            return
+        with self._lock:
+            if self._verified:
+                return
+            version = self.current_version()
+            if version < self.latest_version:
+                if not self.auto_migrate:
+                    raise RuntimeError(
+                        f"Database schema is at version {version}, expected {self.latest_version}; "
+                        f"run: python -m utils.schema_migrations"
+                    )
+                applied = self.apply_pending()
+                if applied:
+                    logger.info(f"Schema migrated from version {version} to {applied[-1]}")
+            elif version > self.latest_version:
+                logger.warning(f"Database schema version {version} is newer than this code ({self.latest_version})")
+            self._verified = True
+
+
+# Global instance
+schema_migrator = SchemaMigrator()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    version = schema_migrator.current_version()
+    print(f"Schema version: {version} (latest: {schema_migrator.latest_version})")
+    if "--status" not in sys.argv[1:]:
+        applied = schema_migrator.apply_pending()
+        print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
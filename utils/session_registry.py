@@ -0,0 +1,392 @@
+"""
+Session Registry
+
+Process-wide cache of hydrated sessions shared by the front ends (chat_multi_agent,
+content_agent_swarm) so a new chat window or a swarm restart attaches to warm state instead
+of rebuilding everything. The caches are in-process only; across processes a session is handed
+over (a restart resumes it), never served live by two processes at once:
+- One PostgreSQLStateManager per session per process (the write-behind cache is only
+  authoritative when a session has a single manager in the process)
+- One Orchestrator (state manager, LLM clients, seven agents, compiled graph) per session,
+  reused by every caller that attaches to that session
+- KB contexts cached by knowledge base ID for SESSION_REGISTRY_KB_CONTEXT_TTL_SECONDS, so the
+  agents share one KnowledgeBaseSetContext lookup instead of each running their own
+- Sessions are tagged with the front end that opened them (conversation_metadata.front_end);
+  with SESSION_REGISTRY_RESUME enabled, a restarted front end resumes its most recent active
+  session that was updated within SESSION_REGISTRY_RESUME_MAX_AGE_HOURS
+- Attached sessions hold a lease (session_states.lease_owner / lease_expires_at) renewed by a
+  heartbeat every third of SESSION_REGISTRY_LEASE_SECONDS; sessions leased by another live
+  process are never resumed or attached, so each session has a single write-behind cache
+
+Unattached sessions beyond SESSION_REGISTRY_MAX_SESSIONS are flushed and evicted, least
+recently used first.
+"""
+
+import os
+import copy
+import atexit
+import socket
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from utils.database_manager import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+class _SessionEntry:
+    """Cached objects of one session and the number of front ends attached to it"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.state_manager = None
+        self.orchestrator = None
+        self.front_end: Optional[str] = None
+        self.attached = 0
+        self.lock = threading.RLock()  # re-entered when the Orchestrator fetches its state manager
+
+
+class SessionRegistry:
+    """Shares hydrated sessions and KB contexts between the front ends of one process"""
+
+    def __init__(self, max_sessions: Optional[int] = None,
+                 kb_context_ttl_seconds: Optional[float] = None,
+                 resume: Optional[bool] = None,
+                 resume_max_age_hours: Optional[float] = None,
+                 lease_seconds: Optional[float] = None):
+        """
+        Args:
+            max_sessions: Sessions kept cached; only unattached ones are evicted
+            kb_context_ttl_seconds: How long a loaded KB context is reused (0 = always reload)
+            resume: Whether front ends resume their most recent active session
+            resume_max_age_hours: Sessions idle for longer are not resumed
+            lease_seconds: How long a session stays leased to this process without a heartbeat
+        """
+        self.max_sessions = max_sessions if max_sessions is not None else int(
+            os.getenv('SESSION_REGISTRY_MAX_SESSIONS', '8'))
+        self.kb_context_ttl = kb_context_ttl_seconds if kb_context_ttl_seconds is not None else float(
+            os.getenv('SESSION_REGISTRY_KB_CONTEXT_TTL_SECONDS', '300'))
+        self.resume = resume if resume is not None else (
+            os.getenv('SESSION_REGISTRY_RESUME', 'true').lower() == 'true')
+        self.resume_max_age_hours = resume_max_age_hours if resume_max_age_hours is not None else float(
+            os.getenv('SESSION_REGISTRY_RESUME_MAX_AGE_HOURS', '24'))
+        self.lease_seconds = lease_seconds if lease_seconds is not None else float(
+            os.getenv('SESSION_REGISTRY_LEASE_SECONDS', '60'))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, _SessionEntry]" = OrderedDict()
+        self._kb_contexts: Dict[str, tuple] = {}  # kb_id → (loaded_at, context result)
+        self._kb_locks: Dict[str, threading.Lock] = {}
+        self._heartbeat: Optional[threading.Thread] = None
+        self.stats = {"kb_context_hits": 0, "kb_context_loads": 0,
+                      "session_hits": 0, "session_builds": 0, "sessions_resumed": 0, "evictions": 0}
+        atexit.register(self._release_all_leases)
+
+    # ------------------------------------------------------------------ KB contexts
+
+    def get_kb_context(self, knowledge_base_id: str, loader: Callable[[], Dict[str, Any]],
+                       force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Return the cached KnowledgeBaseSetContext result for a KB, calling loader() on a miss.
+
+        Concurrent misses for the same KB wait for a single load; failed results are not cached.
+        """
+        kb_id = str(knowledge_base_id)
+        if not force_refresh:
+            cached = self._cached_kb_context(kb_id)
+            if cached is not None:
+                return cached
+
+        with self._lock:
+            kb_lock = self._kb_locks.setdefault(kb_id, threading.Lock())
+
+        with kb_lock:
+            if not force_refresh:
+                cached = self._cached_kb_context(kb_id)
+                if cached is not None:
+                    return cached
+
+            result = loader()
+            with self._lock:
+                self.stats["kb_context_loads"] += 1
+                if result.get("success"):
+                    self._kb_contexts[kb_id] = (time.monotonic(), copy.deepcopy(result))
+                else:
+                    self._kb_contexts.pop(kb_id, None)
+            return result
+
+    def _cached_kb_context(self, kb_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cached = self._kb_contexts.get(kb_id)
+            if cached is None or time.monotonic() - cached[0] >= self.kb_context_ttl:
+                return None
+            self.stats["kb_context_hits"] += 1
+            return copy.deepcopy(cached[1])
+
+    def invalidate_kb_context(self, knowledge_base_id: Optional[str] = None):
+        """Drop one cached KB context (e.g. after the KB was renamed), or all of them"""
+        with self._lock:
+            if knowledge_base_id is None:
+                self._kb_contexts.clear()
+            else:
+                self._kb_contexts.pop(str(knowledge_base_id), None)
+
+    # ------------------------------------------------------------------ Sessions
+
+    def get_state_manager(self, session_id: str):
+        """The single PostgreSQLStateManager of a session in this process"""
+        from agents.postgresql_state_manager import PostgreSQLStateManager
+
+        entry = self._entry(session_id)
+        with entry.lock:
+            if entry.state_manager is None:
+                entry.state_manager = PostgreSQLStateManager(session_id)
+            return entry.state_manager
+
+    def attach_state_manager(self, front_end: str, session_id: Optional[str] = None):
+        """Attach a front end to a session's state manager (see attach_orchestrator for session choice)"""
+        session_id = self._resolve_session_id(front_end, session_id)
+        state_manager = self.get_state_manager(session_id)
+        self._attach(self._entry(session_id), front_end)
+        return state_manager
+
+    def attach_orchestrator(self, front_end: str, session_id: Optional[str] = None):
+        """
+        Attach a front end to a hydrated Orchestrator.
+
+        Uses session_id if given, otherwise the front end's most recent active session (when
+        resuming is enabled), otherwise a new session. Call release() when the front end closes.
+        Raises RuntimeError if session_id is leased by another live process.
+        """
+        from agents.orchestrator import Orchestrator
+
+        session_id = self._resolve_session_id(front_end, session_id)
+        entry = self._entry(session_id)
+        with entry.lock:
+            built = entry.orchestrator is None
+            if built:
+                entry.orchestrator = Orchestrator(session_id)
+        with self._lock:
+            self.stats["session_builds" if built else "session_hits"] += 1
+
+        self._attach(entry, front_end)
+        return entry.orchestrator
+
+    def session_replaced(self, old_session_id: str, new_session_id: str):
+        """Move a cached Orchestrator to the new session it started (e.g. after clearing state)"""
+        with self._lock:
+            old_entry = self._sessions.pop(old_session_id, None)
+        if old_entry is None:
+            return
+
+        new_entry = self._entry(new_session_id)
+        with new_entry.lock:
+            new_entry.orchestrator = old_entry.orchestrator
+        with self._lock:
+            new_entry.attached += old_entry.attached
+        self._acquire_lease(new_session_id)
+        if old_entry.front_end:
+            self._tag_front_end(new_entry, old_entry.front_end)
+        self._release_lease(old_session_id)
+        self._close_entry(old_entry)
+
+    def release(self, session_id: str):
+        """Detach a front end from a session; the session stays cached for the next attach"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry.attached > 0:
+                entry.attached -= 1
+            detached = entry is not None and entry.attached == 0
+        if entry is not None and entry.state_manager is not None:
+            entry.state_manager.flush()
+        if detached:
+            # Flushed above, so another process may take the session over now
+            self._release_lease(session_id)
+        self._evict_unattached()
+
+    def claim_resumable_session(self, front_end: str) -> Optional[str]:
+        """
+        Lease and return the most recently updated active session opened by this front end.
+
+        Sessions leased by another live process are skipped, so two processes never resume the
+        same session; the claim is one statement, so concurrent starts can't both win it.
+        """
+        try:
+            with db_manager.get_cursor(dict_cursor=False) as (conn, cursor):
+                cursor.execute("""
+                    UPDATE session_states
+                    SET lease_owner = %s, lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                    WHERE session_id = (
+                        SELECT session_id
+                        FROM session_states
+                        WHERE is_active = TRUE
+                          AND conversation_metadata ->> 'front_end' = %s
+                          AND updated_at >= CURRENT_TIMESTAMP - make_interval(secs => %s)
+                          AND (lease_owner IS NULL OR lease_owner = %s OR lease_expires_at < CURRENT_TIMESTAMP)
+                        ORDER BY updated_at DESC
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING session_id
+                """, (self.owner, self.lease_seconds, front_end, self.resume_max_age_hours * 3600, self.owner))
+                row = cursor.fetchone()
+                conn.commit()
+                return row[0] if row else None
+        except Exception as e:
+            logger.warning(f"Session registry could not look up a session to resume for {front_end}: {e}")
+            return None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Cached sessions, attachments and cache counters"""
+        with self._lock:
+            return {
+                "sessions": {
+                    session_id: {"front_end": entry.front_end, "attached": entry.attached,
+                                 "orchestrator": entry.orchestrator is not None}
+                    for session_id, entry in self._sessions.items()
+                },
+                "kb_contexts": list(self._kb_contexts),
+                **self.stats,
+            }
+
+    def _resolve_session_id(self, front_end: str, session_id: Optional[str]) -> str:
+        if session_id is None:
+            return self._resume_or_new_session_id(front_end)
+        if not self._acquire_lease(session_id):
+            raise RuntimeError(f"Session {session_id} is in use by another process")
+        return session_id
+
+    def _resume_or_new_session_id(self, front_end: str) -> str:
+        session_id = self.claim_resumable_session(front_end) if self.resume else None
+        if session_id:
+            with self._lock:
+                self.stats["sessions_resumed"] += 1
+            logger.info(f"Session registry: {front_end} resuming session {session_id[:8]}...")
+            return session_id
+        return str(uuid.uuid4())
+
+    def _attach(self, entry: _SessionEntry, front_end: str):
+        with self._lock:
+            entry.attached += 1
+        # The session row exists now, so a new session can be leased too
+        self._acquire_lease(entry.session_id)
+        self._tag_front_end(entry, front_end)
+        self._start_heartbeat()
+        self._evict_unattached()
+
+    def _acquire_lease(self, session_id: str) -> bool:
+        """Lease a session to this process; False if another live process holds it (True for a new session)"""
+        try:
+            with db_manager.get_cursor(dict_cursor=False) as (conn, cursor):
+                cursor.execute("""
+                    UPDATE session_states
+                    SET lease_owner = %s, lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                    WHERE session_id = %s
+                      AND (lease_owner IS NULL OR lease_owner = %s OR lease_expires_at < CURRENT_TIMESTAMP)
+                    RETURNING session_id
+                """, (self.owner, self.lease_seconds, session_id, self.owner))
+                acquired = cursor.fetchone() is not None
+                if not acquired:
+                    cursor.execute("SELECT 1 FROM session_states WHERE session_id = %s", (session_id,))
+                    acquired = cursor.fetchone() is None
+                conn.commit()
+                return acquired
+        except Exception as e:
+            logger.warning(f"Session registry could not lease session {session_id[:8]}...: {e}")
+            return True
+
+    def _release_lease(self, session_id: str):
+        try:
+            with db_manager.get_cursor(dict_cursor=False) as (conn, cursor):
+                cursor.execute("""
+                    UPDATE session_states SET lease_owner = NULL, lease_expires_at = NULL
+                    WHERE session_id = %s AND lease_owner = %s
+                """, (session_id, self.owner))
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"Session registry could not release session {session_id[:8]}...: {e}")
+
+    def _release_all_leases(self):
+        with self._lock:
+            attached = [session_id for session_id, entry in self._sessions.items() if entry.attached > 0]
+        for session_id in attached:
+            self._release_lease(session_id)
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(target=self._renew_leases, name="session-lease-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _renew_leases(self):
+        """Extend the leases of every attached session while this process is alive"""
+        while True:
+            time.sleep(max(self.lease_seconds / 3, 1.0))
+            with self._lock:
+                attached = [session_id for session_id, entry in self._sessions.items() if entry.attached > 0]
+            if not attached:
+                continue
+            try:
+                with db_manager.get_cursor(dict_cursor=False) as (conn, cursor):
+                    cursor.execute("""
+                        UPDATE session_states
+                        SET lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                        WHERE session_id = ANY(%s) AND lease_owner = %s
+                    """, (self.lease_seconds, attached, self.owner))
+                    conn.commit()
+            except Exception as e:
+                logger.warning(f"Session registry lease heartbeat failed: {e}")
+
+    def _entry(self, session_id: str) -> _SessionEntry:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = self._sessions[session_id] = _SessionEntry(session_id)
+            self._sessions.move_to_end(session_id)
+            return entry
+
+    def _tag_front_end(self, entry: _SessionEntry, front_end: str):
+        """Record the front end on the session row so a restart of it can resume the session"""
+        if entry.front_end == front_end:
+            return
+        entry.front_end = front_end
+        try:
+            with db_manager.get_cursor(dict_cursor=False) as (conn, cursor):
+                cursor.execute("""
+                    UPDATE session_states
+                    SET conversation_metadata = jsonb_set(COALESCE(conversation_metadata, '{}'), '{front_end}', to_jsonb(%s::text))
+                    WHERE session_id = %s
+                """, (front_end, entry.session_id))
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"Session registry could not tag session {entry.session_id[:8]}... with {front_end}: {e}")
+
+    def _evict_unattached(self):
+        with self._lock:
+            evicted = []
+            for session_id in list(self._sessions):
+                if len(self._sessions) <= self.max_sessions:
+                    break
+                if self._sessions[session_id].attached == 0:
+                    evicted.append(self._sessions.pop(session_id))
+            self.stats["evictions"] += len(evicted)
+        for entry in evicted:
+            self._close_entry(entry)
+
+    @staticmethod
+    def _close_entry(entry: _SessionEntry):
+        state_manager = entry.state_manager
+        if state_manager is None and entry.orchestrator is not None:
+            state_manager = getattr(entry.orchestrator, "state_manager", None)
+        if state_manager is not None:
+            state_manager.close()
+
+
+# Global instance
+session_registry = SessionRegistry()
@@ -0,0 +1,170 @@
+"""
+State Retention Manager
+
+Keeps the time-partitioned state tables (conversation_messages, state_audit_log) bounded:
+- Creates the monthly partitions for the current month and STATE_PARTITION_MONTHS_AHEAD months
+  ahead so new rows never land in the DEFAULT partition
+- Partitions older than the table's retention window are archived to gzip-compressed CSV
+  files in STATE_ARCHIVE_DIR (leave empty to drop without archiving), then detached and dropped
+- Runs at most every STATE_RETENTION_INTERVAL_HOURS, in a background thread
+
+Retention is set per table with STATE_MESSAGES_RETENTION_MONTHS and STATE_AUDIT_RETENTION_MONTHS
+(0 keeps a table's partitions forever).
+"""
+
+import os
+import re
+import gzip
+import time
+import logging
+import threading
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg2 import sql
+
+from utils.database_manager import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+PARTITION_NAME_PATTERN = re.compile(r"^(?P<table>.+)_p(?P<year>\d{4})_(?P<month>\d{2})$")
+
+
+def _add_months(month_start: date, months: int) -> date:
+    month_index = month_start.year * 12 + (month_start.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+class StateRetentionManager:
+    """Monthly partition maintenance and retention for the state tables"""
+
+    def __init__(self, retention_months: Optional[Dict[str, int]] = None,
+                 archive_dir: Optional[str] = None,
+                 months_ahead: Optional[int] = None,
+                 interval_hours: Optional[float] = None):
+        """
+        Args:
+            retention_months: table → months of partitions to keep (0 = keep forever)
+            archive_dir: Directory for compressed partition archives ('' = drop without archiving)
+            months_ahead: Future monthly partitions to keep created
+            interval_hours: Minimum time between retention runs for run_if_due()
+        """
+        self.retention_months = retention_months if retention_months is not None else {
+            "conversation_messages": int(os.getenv('STATE_MESSAGES_RETENTION_MONTHS', '12')),
+            "state_audit_log": int(os.getenv('STATE_AUDIT_RETENTION_MONTHS', '3')),
+        }
+        self.archive_dir = archive_dir if archive_dir is not None else os.getenv('STATE_ARCHIVE_DIR', 'archive/state')
+        self.months_ahead = months_ahead if months_ahead is not None else int(os.getenv('STATE_PARTITION_MONTHS_AHEAD', '2'))
+        self.interval_seconds = (interval_hours if interval_hours is not None else
+                                 float(os.getenv('STATE_RETENTION_INTERVAL_HOURS', '24'))) * 3600
+
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._last_run: Optional[float] = None
+        self.last_result: Dict[str, Any] = {}
+
+    def partitions(self, cursor, table: str) -> List[Tuple[str, date]]:
+        """Monthly partitions of a table as (partition name, month start), oldest first"""
+        cursor.execute("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+        """, (table,))
+        monthly = []
+        for (name,) in cursor.fetchall():
+            match = PARTITION_NAME_PATTERN.match(name)
+            if match and match.group("table") == table:
+                monthly.append((name, date(int(match.group("year")), int(match.group("month")), 1)))
+        return sorted(monthly, key=lambda partition: partition[1])
+
+    def ensure_partitions(self, cursor, today: Optional[date] = None) -> List[str]:
+        """Create the current and upcoming monthly partitions of every table"""
+        current_month = (today or datetime.now(timezone.utc).date()).replace(day=1)
+        created = []
+        for table in self.retention_months:
+            for offset in range(self.months_ahead + 1):
+                cursor.execute("SELECT ensure_monthly_partition(%s, %s)",
+                               (table, _add_months(current_month, offset)))
+                created.append(cursor.fetchone()[0])
+        return created
+
+    def expired_partitions(self, cursor, table: str, today: Optional[date] = None) -> List[str]:
+        """Partitions whose whole month falls before the table's retention window"""
+        months = self.retention_months.get(table, 0)
+        if months <= 0:
+            return []
+        current_month = (today or datetime.now(timezone.utc).date()).replace(day=1)
+        cutoff = _add_months(current_month, -months)
+        return [name for name, month_start in self.partitions(cursor, table) if month_start < cutoff]
+
+    def archive_partition(self, cursor, partition: str) -> Optional[str]:
+        """Write a partition to <archive_dir>/<partition>.csv.gz and return the file path"""
+        if not self.archive_dir:
+            return None
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{partition}.csv.gz")
+        partial_path = f"{path}.partial"
+        copy_sql = sql.SQL("COPY {} TO STDOUT WITH CSV HEADER").format(sql.Identifier(partition))
+        with gzip.open(partial_path, "wb") as archive:
+            cursor.copy_expert(copy_sql.as_string(cursor.connection), archive)
+        os.replace(partial_path, path)
+        return path
+
+    def run(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """Create upcoming partitions, then archive and drop expired ones (one transaction per partition)"""
+        result: Dict[str, Any] = {"created": [], "dropped": [], "archived": [], "errors": []}
+
+        with db_manager.get_connection() as conn:
+            with conn.cursor() as cursor:
+                result["created"] = self.ensure_partitions(cursor, today)
+            conn.commit()
+
+            for table in self.retention_months:
+                with conn.cursor() as cursor:
+                    expired = self.expired_partitions(cursor, table, today)
+
+                for partition in expired:
+                    try:
+                        with conn.cursor() as cursor:
+                            archive_path = self.archive_partition(cursor, partition)
+                            cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                                sql.Identifier(table), sql.Identifier(partition)))
+                            cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(partition)))
+                        conn.commit()
+                        result["dropped"].append(partition)
+                        if archive_path:
+                            result["archived"].append(archive_path)
+                        logger.info(f"State retention: dropped {partition}"
+                                    + (f" (archived to {archive_path})" if archive_path else ""))
+                    except Exception as e:
+                        conn.rollback()
+                        logger.error(f"State retention failed for {partition}: {e}")
+                        result["errors"].append(f"{partition}: {e}")
+
+        self.last_result = result
+        return result
+
+    def run_if_due(self) -> bool:
+        """Start a background retention run if the interval has elapsed and none is running"""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return False
+            if self._last_run is not None and time.monotonic() - self._last_run < self.interval_seconds:
+                return False
+            self._last_run = time.monotonic()
+            self._worker = threading.Thread(target=self._run_safely, name="state-retention", daemon=True)
+            self._worker.start()
+            return True
+
+    def _run_safely(self) -> None:
+        try:
+            self.run()
+        except Exception as e:
+            logger.error(f"State retention run failed: {e}")
+
+
+# Global instance
+state_retention_manager = StateRetentionManager()
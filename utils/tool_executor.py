@@ -0,0 +1,179 @@
+"""
+Parallel Tool-Call Executor
+
+Runs the tool calls of a single LLM response on a bounded thread pool:
+- Tools are looked up through a name → tool dict built once per agent
+- Calls are grouped into waves; a call waits for every earlier call of a tool it depends on
+  (e.g. KnowledgeBaseAddTagToArticle after KnowledgeBaseInsertTag / KnowledgeBaseInsertArticle)
+- Calls inside a wave are independent (e.g. tag inserts, or tagging different articles) and run concurrently;
+  article inserts stay sequential because each one picks its parent from the hierarchy its
+  predecessors just extended
+- Results are returned in the original tool-call order
+
+Configure the pool size with TOOL_EXECUTOR_MAX_WORKERS (default 4, 1 disables parallelism).
+
+Knowledge base tools mostly open a fresh psycopg2 connection per operation
+(KnowledgeBaseOperations._get_connection), and up to two at once; only a few reads go through
+db_manager's pool. Every KnowledgeBase* call therefore takes one of TOOL_EXECUTOR_DB_TOOL_SLOTS
+(default 3) process-wide slots. This bounds the PostgreSQL backends a fan-out opens, shared by every
+executor, to 2 per slot, and keeps its pool-backed reads well inside db_manager's 10 connections.
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+# tool name → tools whose earlier calls must finish first
+DEFAULT_DEPENDENCIES: Dict[str, Set[str]] = {
+    "KnowledgeBaseAddTagToArticle": {"KnowledgeBaseInsertTag", "KnowledgeBaseInsertArticle"},
+    "KnowledgeBaseSetArticleTags": {"KnowledgeBaseInsertTag", "KnowledgeBaseInsertArticle"},
+    "KnowledgeBaseRemoveTagFromArticle": {"KnowledgeBaseAddTagToArticle", "KnowledgeBaseSetArticleTags"},
+    # _determine_hierarchical_parent_id matches against categories inserted by earlier calls
+    "KnowledgeBaseInsertArticle": {"KnowledgeBaseInsertArticle"},
+    "KnowledgeBaseUpdateArticle": {"KnowledgeBaseInsertArticle"},
+    "KnowledgeBaseUpdateTag": {"KnowledgeBaseInsertTag"},
+    "KnowledgeBaseDeleteTag": {"KnowledgeBaseInsertTag", "KnowledgeBaseAddTagToArticle", "KnowledgeBaseSetArticleTags"},
+}
+
+# Tools that talk to PostgreSQL through KnowledgeBaseOperations
+DB_BOUND_TOOL_PREFIXES = ("KnowledgeBase",)
+
+
+@dataclass
+class ToolCallResult:
+    """Outcome of one tool call, in the position of the original call"""
+    index: int
+    call_id: str
+    tool_name: str
+    tool_args: Dict[str, Any]
+    result: Any = None
+    success: bool = False
+    error: Optional[str] = None
+    skipped: bool = False
+    wave: int = 0
+
+
+@dataclass
+class ToolExecutionReport:
+    """All results of one execute() run plus whether it was stopped early"""
+    results: List[ToolCallResult] = field(default_factory=list)
+    cancelled: bool = False
+    waves: int = 0
+
+
+class ToolCallExecutor:
+    """Executes LLM tool calls concurrently while keeping dependent calls ordered"""
+
+    def __init__(self, tools: Iterable[Any], max_workers: Optional[int] = None,
+                 dependencies: Optional[Dict[str, Set[str]]] = None):
+        """
+        Args:
+            tools: LangChain tools available to the agent
+            max_workers: Thread pool size (TOOL_EXECUTOR_MAX_WORKERS)
+            dependencies: tool name → tool names that must run before it
+        """
+        self.tools_by_name: Dict[str, Any] = {tool.name: tool for tool in tools}
+        self.max_workers = max(1, max_workers or int(os.getenv('TOOL_EXECUTOR_MAX_WORKERS', '4')))
+        self.dependencies = dependencies if dependencies is not None else DEFAULT_DEPENDENCIES
+
+    def get_tool(self, name: str) -> Optional[Any]:
+        return self.tools_by_name.get(name)
+
+    def plan_waves(self, tool_calls: List[Dict[str, Any]]) -> List[int]:
+        """Wave number per call: one past the latest earlier call of a tool it depends on"""
+        waves: List[int] = []
+        latest_wave_by_tool: Dict[str, int] = {}
+        for tool_call in tool_calls:
+            depends_on = self.dependencies.get(tool_call.get("name"), set())
+            wave = max((latest_wave_by_tool[name] + 1 for name in depends_on if name in latest_wave_by_tool), default=0)
+            waves.append(wave)
+            name = tool_call.get("name")
+            latest_wave_by_tool[name] = max(latest_wave_by_tool.get(name, 0), wave)
+        return waves
+
+    def execute(self, tool_calls: List[Dict[str, Any]],
+                skip: Optional[Callable[[str], bool]] = None,
+                should_stop: Optional[Callable[[], bool]] = None,
+                on_result: Optional[Callable[[ToolCallResult], None]] = None) -> ToolExecutionReport:
+        """
+        Run tool calls wave by wave and return their results in call order.
+
+        Args:
+            tool_calls: LLM tool calls ({"name", "args", "id"})
+            skip: Returns True for call ids that must not run (e.g. completed before a restart)
+            should_stop: Checked before each wave; when True the remaining calls are not started
+            on_result: Called on the caller's thread as each call finishes
+        """
+        waves = self.plan_waves(tool_calls)
+        report = ToolExecutionReport(waves=(max(waves) + 1) if waves else 0)
+        results: List[Optional[ToolCallResult]] = [None] * len(tool_calls)
+
+        for index, tool_call in enumerate(tool_calls):
+            call_id = tool_call.get("id") or f"call_{index}"
+            if skip is not None and skip(call_id):
+                results[index] = ToolCallResult(index, call_id, tool_call.get("name", "unknown"),
+                                                tool_call.get("args", {}), skipped=True, wave=waves[index])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool-call") as pool:
+            for wave in range(report.waves):
+                pending = [index for index, call_wave in enumerate(waves)
+                           if call_wave == wave and results[index] is None]
+                if not pending:
+                    continue
+                if should_stop is not None and should_stop():
+                    report.cancelled = True
+                    break
+
+                futures = {pool.submit(self._run_call, index, tool_calls[index], wave): index for index in pending}
+                for future in as_completed(futures):
+                    result = future.result()
+                    results[result.index] = result
+                    if on_result is not None:
+                        on_result(result)
+
+        report.results = [result for result in results if result is not None]
+        return report
+
+    def _run_call(self, index: int, tool_call: Dict[str, Any], wave: int) -> ToolCallResult:
+        tool_name = tool_call.get("name", "unknown")
+        tool_args = tool_call.get("args", {})
+        result = ToolCallResult(index, tool_call.get("id") or f"call_{index}", tool_name, tool_args, wave=wave)
+
+        tool_instance = self.tools_by_name.get(tool_name)
+        if tool_instance is None:
+            result.error = f"Tool {tool_name} not found in available tools"
+            return result
+
+        try:
+            if tool_name.startswith(DB_BOUND_TOOL_PREFIXES):
+                with _db_tool_semaphore():
+                    result.result = tool_instance.run(tool_args)
+            else:
+                result.result = tool_instance.run(tool_args)
+            result.success = True
+        except Exception as e:
+            logger.warning(f"Tool call {tool_name} failed: {e}")
+            result.result = str(e)
+            result.error = str(e)
+        return result
+
+
+_db_tool_slots: Optional[threading.BoundedSemaphore] = None
+_db_tool_slots_lock = threading.Lock()
+
+
+def _db_tool_semaphore() -> threading.BoundedSemaphore:
+    """Process-wide limit on concurrently running DB-bound tools, shared by every executor"""
+    global _db_tool_slots
+    with _db_tool_slots_lock:
+        if _db_tool_slots is None:
+            slots = max(1, int(os.getenv('TOOL_EXECUTOR_DB_TOOL_SLOTS', '3')))
+            logger.info(f"DB-bound tool calls limited to {slots} concurrent")
+            _db_tool_slots = threading.BoundedSemaphore(slots)
+        return _db_tool_slots
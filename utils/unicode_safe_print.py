@@ -7,6 +7,12 @@ def safe_print(message: str) -> None:
     """
     Print message with Unicode emoji replacement for Windows console compatibility
     """
+    from utils.cycle_profiler import cycle_profiler
+    with cycle_profiler.span("print", "safe_print", trace=False):
+        _print_safe(message)
+
+def _print_safe(message: str) -> None:
+    """Replace emojis on Windows consoles and print"""
     # Define emoji to ASCII replacements for Windows console
     replacements = {
         '🚀': '[START]',
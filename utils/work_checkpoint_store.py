@@ -0,0 +1,288 @@
+"""
+Work Checkpoint Store
+
+Persists progress of in-flight agent work to PostgreSQL so an interrupted swarm can
+resume where it stopped instead of repeating expensive LLM generation:
+- The generated tool calls for a work item (the expensive LLM output)
+- Which of those tool calls already completed
+- Results gathered so far (e.g. articles created)
+
+An in-progress checkpoint is leased to the process running it (lease_owner / lease_expires_at,
+renewed by a heartbeat every third of WORK_CHECKPOINT_LEASE_SECONDS). Another swarm only resumes
+it once it was interrupted or its lease expired, and a shutdown only interrupts this process's work.
+"""
+
+import os
+import socket
+import time
+import uuid
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from psycopg2.extras import Json
+
+from utils.database_manager import db_manager
+from utils.schema_migrations import schema_migrator
+
+logger = logging.getLogger(__name__)
+
+
+class WorkCheckpoint:
+    """In-memory view of one work item's checkpoint; call save() to persist changes"""
+
+    def __init__(self, store: "WorkCheckpointStore", work_key: str, agent_name: str,
+                 status: str = "in_progress", data: Optional[Dict[str, Any]] = None):
+        self.store = store
+        self.work_key = work_key
+        self.agent_name = agent_name
+        self.status = status
+        self.data: Dict[str, Any] = data or {}
+
+    @property
+    def tool_calls(self) -> List[Dict[str, Any]]:
+        """Tool calls generated by the LLM for this work item (empty until generation finishes)"""
+        return self.data.get("tool_calls", [])
+
+    @property
+    def completed_call_ids(self) -> List[str]:
+        """IDs of tool calls that already executed successfully"""
+        return self.data.setdefault("completed_call_ids", [])
+
+    def has_generated_tool_calls(self) -> bool:
+        return bool(self.tool_calls)
+
+    def record_generation(self, tool_calls: List[Dict[str, Any]], model: Optional[str] = None) -> None:
+        """Persist the LLM's tool calls so a restart can skip generation"""
+        self.data["tool_calls"] = [
+            {"name": call.get("name"), "args": call.get("args", {}), "id": call.get("id") or f"call_{index}"}
+            for index, call in enumerate(tool_calls)
+        ]
+        self.data["model"] = model
+        self.save()
+
+    def is_call_completed(self, call_id: str) -> bool:
+        return call_id in self.completed_call_ids
+
+    def record_call_completed(self, call_id: str, result_summary: Optional[Dict[str, Any]] = None) -> None:
+        """Mark a tool call done (and optionally store a small summary of its result)"""
+        if call_id not in self.completed_call_ids:
+            self.completed_call_ids.append(call_id)
+        if result_summary:
+            self.data.setdefault("results", {})[call_id] = result_summary
+        self.save()
+
+    def save(self) -> None:
+        self.store.save(self)
+
+    def complete(self) -> None:
+        """Work finished - the checkpoint is no longer resumable"""
+        self.status = "completed"
+        self.save()
+
+    def mark_failed(self, error: str) -> None:
+        """Work failed outright - a retry should start from scratch rather than replay these calls"""
+        self.status = "failed"
+        self.data["error"] = error
+        self.save()
+
+    def mark_interrupted(self, reason: str) -> None:
+        """Work stopped before finishing - keep it resumable and note why"""
+        self.status = "interrupted"
+        self.data["interrupt_reason"] = reason
+        self.save()
+
+
+class WorkCheckpointStore:
+    """PostgreSQL-backed storage for WorkCheckpoint records"""
+
+    RESUMABLE_STATUSES = ("in_progress", "interrupted")
+
+    def __init__(self, lease_seconds: Optional[float] = None):
+        """
+        Args:
+            lease_seconds: How long an in-progress checkpoint stays leased to this process without a heartbeat
+        """
+        self.lease_seconds = lease_seconds if lease_seconds is not None else float(
+            os.getenv('WORK_CHECKPOINT_LEASE_SECONDS', '120'))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._held: Set[str] = set()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def _ensure_schema(self) -> None:
+        """The checkpoint table is created by schema migration 2 (leases by migration 7)"""
+        schema_migrator.ensure_current()
+
+    @staticmethod
+    def gitlab_issue_key(project_id: Any, issue_iid: Any) -> str:
+        """Checkpoint key for work driven by a GitLab issue"""
+        return f"gitlab:{project_id}:{issue_iid}"
+
+    def load_or_create(self, work_key: str, agent_name: str) -> Optional[WorkCheckpoint]:
+        """
+        Lease the checkpoint for a work item: resume it if it is resumable, otherwise start a new one.
+
+        Returns:
+            The checkpoint, or None if another live process is running this work item
+        """
+        try:
+            self._ensure_schema()
+            with db_manager.get_cursor() as (conn, cursor):
+                cursor.execute("""
+                    INSERT INTO work_checkpoints (work_key, agent_name, status, checkpoint_data, lease_owner, lease_expires_at)
+                    VALUES (%(work_key)s, %(agent_name)s, 'in_progress', '{}'::jsonb, %(owner)s,
+                            CURRENT_TIMESTAMP + make_interval(secs => %(lease)s))
+                    ON CONFLICT (work_key) DO UPDATE
+                    SET agent_name = EXCLUDED.agent_name,
+                        status = 'in_progress',
+                        checkpoint_data = CASE WHEN work_checkpoints.status = ANY(%(resumable)s)
+                                               THEN work_checkpoints.checkpoint_data
+                                               ELSE EXCLUDED.checkpoint_data END,
+                        lease_owner = EXCLUDED.lease_owner,
+                        lease_expires_at = EXCLUDED.lease_expires_at,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE work_checkpoints.status <> 'in_progress'
+                       OR work_checkpoints.lease_owner IS NULL
+                       OR work_checkpoints.lease_owner = %(owner)s
+                       OR work_checkpoints.lease_expires_at < CURRENT_TIMESTAMP
+                    RETURNING work_key, agent_name, status, checkpoint_data
+                """, {"work_key": work_key, "agent_name": agent_name, "owner": self.owner,
+                      "lease": self.lease_seconds, "resumable": list(self.RESUMABLE_STATUSES)})
+                row = cursor.fetchone()
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to lease work checkpoint {work_key}: {e}")
+            # Checkpointing never blocks work; run without a persisted lease
+            return WorkCheckpoint(self, work_key, agent_name)
+
+        if row is None:
+            logger.info(f"Work item {work_key} is being run by another process - not taking it over")
+            return None
+        self._hold(work_key)
+        return WorkCheckpoint(self, row['work_key'], row['agent_name'], row['status'], row['checkpoint_data'])
+
+    def load(self, work_key: str) -> Optional[WorkCheckpoint]:
+        try:
+            self._ensure_schema()
+            with db_manager.get_cursor() as (conn, cursor):
+                cursor.execute("""
+                    SELECT work_key, agent_name, status, checkpoint_data
+                    FROM work_checkpoints WHERE work_key = %s
+                """, (work_key,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                return WorkCheckpoint(self, row['work_key'], row['agent_name'], row['status'], row['checkpoint_data'])
+        except Exception as e:
+            logger.error(f"Failed to load work checkpoint {work_key}: {e}")
+            return None
+
+    def save(self, checkpoint: WorkCheckpoint) -> None:
+        """
+        Upsert a checkpoint this process holds; failures are logged, never raised, so checkpointing
+        cannot break work. Leaving in_progress releases the lease.
+        """
+        in_progress = checkpoint.status == "in_progress"
+        try:
+            self._ensure_schema()
+            with db_manager.get_cursor(dict_cursor=False) as (conn, cursor):
+                cursor.execute("""
+                    INSERT INTO work_checkpoints (work_key, agent_name, status, checkpoint_data, lease_owner, lease_expires_at)
+                    VALUES (%(work_key)s, %(agent_name)s, %(status)s, %(data)s, %(lease_owner)s,
+                            CASE WHEN %(in_progress)s THEN CURRENT_TIMESTAMP + make_interval(secs => %(lease)s) END)
+                    ON CONFLICT (work_key) DO UPDATE
+                    SET agent_name = EXCLUDED.agent_name,
+                        status = EXCLUDED.status,
+                        checkpoint_data = EXCLUDED.checkpoint_data,
+                        lease_owner = EXCLUDED.lease_owner,
+                        lease_expires_at = EXCLUDED.lease_expires_at,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE work_checkpoints.lease_owner IS NULL OR work_checkpoints.lease_owner = %(owner)s
+                """, {"work_key": checkpoint.work_key, "agent_name": checkpoint.agent_name,
+                      "status": checkpoint.status, "data": Json(checkpoint.data),
+                      "lease_owner": self.owner if in_progress else None, "in_progress": in_progress,
+                      "lease": self.lease_seconds, "owner": self.owner})
+                saved = cursor.rowcount > 0
+                conn.commit()
+            if not saved:
+                logger.warning(f"Work checkpoint {checkpoint.work_key} was taken over by another process - not saved")
+        except Exception as e:
+            logger.error(f"Failed to save work checkpoint {checkpoint.work_key}: {e}")
+        if not in_progress:
+            with self._lock:
+                self._held.discard(checkpoint.work_key)
+
+    def get_resumable_work_keys(self, agent_name: str) -> List[str]:
+        """Work keys this agent started but did not finish, excluding work another live process is running"""
+        try:
+            self._ensure_schema()
+            with db_manager.get_cursor() as (conn, cursor):
+                # Interrupted, or in progress without a live lease held by another process
+                cursor.execute("""
+                    SELECT work_key FROM work_checkpoints
+                    WHERE agent_name = %(agent_name)s
+                      AND (status = 'interrupted'
+                           OR (status = 'in_progress'
+                               AND (lease_owner IS NULL OR lease_owner = %(owner)s
+                                    OR lease_expires_at < CURRENT_TIMESTAMP)))
+                    ORDER BY updated_at DESC
+                """, {"agent_name": agent_name, "owner": self.owner})
+                return [row['work_key'] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Failed to list resumable work for {agent_name}: {e}")
+            return []
+
+    def interrupt_all_in_progress(self, reason: str) -> int:
+        """Mark this process's in-progress checkpoints as interrupted and release them (used on shutdown)"""
+        try:
+            self._ensure_schema()
+            with db_manager.get_cursor(dict_cursor=False) as (conn, cursor):
+                cursor.execute("""
+                    UPDATE work_checkpoints
+                    SET status = 'interrupted',
+                        checkpoint_data = checkpoint_data || jsonb_build_object('interrupt_reason', %s::text),
+                        lease_owner = NULL,
+                        lease_expires_at = NULL,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE status = 'in_progress' AND lease_owner = %s
+                """, (reason, self.owner))
+                count = cursor.rowcount
+                conn.commit()
+            with self._lock:
+                self._held.clear()
+            return count
+        except Exception as e:
+            logger.error(f"Failed to mark in-progress checkpoints as interrupted: {e}")
+            return 0
+
+    def _hold(self, work_key: str) -> None:
+        """Track a leased checkpoint and make sure the heartbeat keeps it leased"""
+        with self._lock:
+            self._held.add(work_key)
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._renew_leases, name="work-checkpoint-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def _renew_leases(self) -> None:
+        """Extend the leases of every checkpoint this process is running while it is alive"""
+        while True:
+            time.sleep(max(self.lease_seconds / 3, 1.0))
+            with self._lock:
+                held = list(self._held)
+            if not held:
+                continue
+            try:
+                with db_manager.get_cursor(dict_cursor=False) as (conn, cursor):
+                    cursor.execute("""
+                        UPDATE work_checkpoints
+                        SET lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                        WHERE work_key = ANY(%s) AND lease_owner = %s AND status = 'in_progress'
+                    """, (self.lease_seconds, held, self.owner))
+                    conn.commit()
+            except Exception as e:
+                logger.warning(f"Work checkpoint lease heartbeat failed: {e}")
+
+
+# Global instance
+work_checkpoint_store = WorkCheckpointStore()